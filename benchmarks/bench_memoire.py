@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare la memoire occupee par les clients en dictionnaires (charger_clients) et en modeles.Client
+
+Exemple : python benchmarks/bench_memoire.py --clients 100000 --achats 20
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from synthetique import generer_clients
+from modeles import Client
+
+
+def mesurer(construire):
+    #Memoire encore allouee une fois la structure construite (tracemalloc compte les objets python)
+    gc.collect()
+    tracemalloc.start()
+    donnees = construire()
+    gc.collect()
+    taille, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return donnees, taille, pic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--achats", type=int, default=10, help="achats par client")
+    args = parser.parse_args()
+
+    #Chaque achat a sa propre chaine de date, comme apres un json.load
+    def en_dictionnaires():
+        return list(generer_clients(args.clients, args.achats))
+
+    def en_compacts():
+        return [Client.depuis_dict(c) for c in generer_clients(args.clients, args.achats)]
+
+    dicts, taille_dicts, pic_dicts = mesurer(en_dictionnaires)
+    del dicts
+    compacts, taille_compacts, pic_compacts = mesurer(en_compacts)
+    del compacts
+
+    print(f"{args.clients} clients, {args.achats} achats par client")
+    print(f"{'representation':<16}{'memoire (Mo)':>14}{'pic (Mo)':>12}{'octets/achat':>14}")
+    nb_achats = max(1, args.clients * args.achats)
+    for nom, taille, pic in (("dict + tuples", taille_dicts, pic_dicts), ("Client + array", taille_compacts, pic_compacts)):
+        print(f"{nom:<16}{taille / 1e6:>14.1f}{pic / 1e6:>12.1f}{taille / nb_achats:>14.0f}")
+    print(f"gain : x{taille_dicts / max(1, taille_compacts):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesure les operations de services.py sur des bases fictives de differentes tailles
+
+Pour chaque taille et chaque operation : operations par seconde, latence p50 / p99 et pic de memoire
+alloue pendant un appel. Les resultats sont enregistres en JSON ; --comparer relit un ancien fichier et
+signale les operations devenues plus lentes (code de sortie 1), pour reperer une regression.
+
+Exemples :
+    python benchmarks/bench_services.py --tailles 1000,10000,100000 --sortie avant.json
+    python benchmarks/bench_services.py --tailles 1000,10000,100000 --comparer avant.json
+    python benchmarks/bench_services.py --tailles 1000000 --achats 2 --repetitions 50
+"""
+
+import os
+import gc
+import sys
+import json
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from time import perf_counter
+from datetime import datetime
+
+from synthetique import generer_clients, PRENOMS, NOMS, VILLES, TAGS
+from stockage import choisir_stockage
+from services import (
+    charger_clients, sauvegarder_clients, ajouter_client, ajouter_achat,
+    modifier_client, supprimer_client, rechercher_par_nom, rechercher_par_ville,
+    rechercher_par_tags, trier_par_nom, trier_par_total_achat, top_clients_par_depense
+)
+
+
+def centile(valeurs_triees, p):
+    #Centile au rang le plus proche sur une liste deja triee
+    rang = max(0, min(len(valeurs_triees) - 1, round(p / 100 * len(valeurs_triees)) - 1))
+    return valeurs_triees[rang]
+
+
+def mesurer(operation, repetitions):
+    #operation(i) fait un appel ; on chronometre chaque appel separement pour avoir les centiles,
+    #puis un appel de plus sous tracemalloc (qui ralentit tout) pour le pic de memoire
+    durees = []
+    gc.collect()
+    gc.disable() #Le ramasse miettes fausserait les latences de facon aleatoire
+    try:
+        for i in range(repetitions):
+            debut = perf_counter()
+            operation(i)
+            durees.append(perf_counter() - debut)
+    finally:
+        gc.enable()
+    tracemalloc.start()
+    avant = tracemalloc.get_traced_memory()[0]
+    operation(repetitions)
+    pic = tracemalloc.get_traced_memory()[1] - avant
+    tracemalloc.stop()
+    durees.sort()
+    total = sum(durees)
+    return {
+        "repetitions" : repetitions,
+        "ops_par_seconde" : repetitions / total if total else float("inf"),
+        "p50_ms" : centile(durees, 50) * 1000,
+        "p99_ms" : centile(durees, 99) * 1000,
+        "pic_memoire_ko" : pic / 1024,
+        }
+
+
+def telephone(hasard):
+    return hasard.choice("2367") + "".join(hasard.choice("0123456789") for _ in range(8))
+
+
+def bench_taille(nb_clients, achats, repetitions, dossier, format):
+    hasard = random.Random(nb_clients)
+    extension = ".db" if format == "sqlite" else ".json"
+    path = os.path.join(dossier, f"clients_{nb_clients}{extension}")
+    #Les operations qui parcourent toute la base sont repetees moins souvent sur les grosses tailles
+    lourdes = max(3, min(repetitions, repetitions * 1000 // nb_clients))
+    resultats = {}
+
+    base = list(generer_clients(nb_clients, achats))
+    resultats["sauvegarder_clients"] = mesurer(lambda i, base=base: sauvegarder_clients(base, path, format=format), min(lourdes, 5))
+    del base #Libere la base generee avant de mesurer les chargements
+    #Reference : lecture en simple liste de dictionnaires, comme la version d'origine de charger_clients
+    resultats["charger_liste"] = mesurer(lambda i: choisir_stockage(path, format).lire(path), min(lourdes, 5))
+    resultats["charger_clients"] = mesurer(lambda i: charger_clients(path, format), min(lourdes, 5))
+    resultats["charger_clients_paresseux"] = mesurer(lambda i: charger_clients(path, format, paresseux=True), min(lourdes, 5))
+    #Les index de recherche sont construits a la premiere recherche : on mesure aussi ce premier appel
+    resultats["charger_puis_rechercher"] = mesurer(
+        lambda i: rechercher_par_nom(charger_clients(path, format), "mbar"), min(lourdes, 5))
+
+    clients = charger_clients(path, format)
+    ids = [c["id"] for c in clients]
+    requetes_noms = [hasard.choice(PRENOMS + NOMS)[:4].lower() for _ in range(repetitions + 1)]
+    requetes_villes = [hasard.choice(VILLES)[:3].lower() for _ in range(repetitions + 1)]
+    requetes_tags = [hasard.sample(TAGS, 2) for _ in range(repetitions + 1)]
+
+    resultats["rechercher_par_nom"] = mesurer(lambda i: rechercher_par_nom(clients, requetes_noms[i]), repetitions)
+    resultats["rechercher_par_ville"] = mesurer(lambda i: rechercher_par_ville(clients, requetes_villes[i]), lourdes)
+    resultats["rechercher_par_tags"] = mesurer(lambda i: rechercher_par_tags(clients, tous=requetes_tags[i][:1], sauf=requetes_tags[i][1:]), lourdes)
+    resultats["trier_par_nom"] = mesurer(lambda i: trier_par_nom(clients), lourdes)
+    resultats["trier_par_total_achat"] = mesurer(lambda i: trier_par_total_achat(clients), lourdes)
+    resultats["top_clients_par_depense"] = mesurer(lambda i: top_clients_par_depense(clients, 10), lourdes)
+
+    resultats["ajouter_client"] = mesurer(
+        lambda i: ajouter_client(clients, f"Bench {i}", hasard.choice(VILLES), telephone(hasard), ["bench"]), repetitions)
+    resultats["ajouter_achat"] = mesurer(
+        lambda i: ajouter_achat(clients, hasard.choice(ids), "2026-01-15", 1000), repetitions)
+    resultats["modifier_client"] = mesurer(
+        lambda i: modifier_client(clients, hasard.choice(ids), ville=hasard.choice(VILLES)), repetitions)
+    a_supprimer = hasard.sample(ids, min(len(ids), repetitions + 1))
+    resultats["supprimer_client"] = mesurer(lambda i: supprimer_client(clients, a_supprimer[i]), len(a_supprimer) - 1)
+
+    #Sauvegarde incrementale : seulement les quelques clients touches depuis la derniere sauvegarde
+    sauvegarder_clients(clients, path, format=format)
+    supprimes = set(a_supprimer)
+    autres = [i for i in ids if i not in supprimes]
+
+    def sauvegarde_journal(i):
+        ajouter_achat(clients, autres[i % len(autres)], "2026-01-16", 500)
+        sauvegarder_clients(clients, path, journal=True, format=format)
+    resultats["sauvegarder_clients_journal"] = mesurer(sauvegarde_journal, repetitions)
+    return resultats
+
+
+def comparer(anciens, nouveaux, seuil):
+    #Compare les latences p50 ; renvoie le nombre d'operations plus lentes que l'ancien run au dela du seuil
+    regressions = 0
+    print(f"\n{'taille':>9} {'operation':<28}{'avant (ms)':>12}{'apres (ms)':>12}{'ratio':>8}")
+    for taille, operations in nouveaux["resultats"].items():
+        for nom, mesure in operations.items():
+            ancienne = anciens.get("resultats", {}).get(taille, {}).get(nom)
+            if ancienne is None:
+                continue
+            ratio = mesure["p50_ms"] / ancienne["p50_ms"] if ancienne["p50_ms"] else float("inf")
+            alerte = ""
+            if ratio > 1 + seuil:
+                alerte = "  ⚠️ plus lent"
+                regressions += 1
+            print(f"{taille:>9} {nom:<28}{ancienne['p50_ms']:>12.3f}{mesure['p50_ms']:>12.3f}{ratio:>8.2f}{alerte}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tailles", default="1000,10000,100000", help="nombres de clients separes par des virgules (jusqu'a 1000000)")
+    parser.add_argument("--achats", type=int, default=5, help="achats par client")
+    parser.add_argument("--repetitions", type=int, default=200, help="appels mesures par operation rapide")
+    parser.add_argument("--stockage", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--sortie", help="fichier JSON des resultats (par defaut bench_<date>.json)")
+    parser.add_argument("--comparer", help="ancien fichier de resultats a comparer")
+    parser.add_argument("--seuil", type=float, default=0.2, help="ralentissement tolere avant alerte (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    rapport = {
+        "date" : datetime.now().isoformat(timespec="seconds"),
+        "python" : platform.python_version(),
+        "plateforme" : platform.platform(),
+        "parametres" : {"achats" : args.achats, "repetitions" : args.repetitions, "stockage" : args.stockage},
+        "resultats" : {},
+        }
+    with tempfile.TemporaryDirectory() as dossier:
+        for taille in (int(t) for t in args.tailles.split(",")):
+            print(f"\n{taille} clients, {args.achats} achats par client")
+            resultats = bench_taille(taille, args.achats, args.repetitions, dossier, args.stockage)
+            rapport["resultats"][str(taille)] = resultats
+            print(f"{'operation':<28}{'ops/s':>12}{'p50 (ms)':>11}{'p99 (ms)':>11}{'pic (Ko)':>11}")
+            for nom, m in resultats.items():
+                print(f"{nom:<28}{m['ops_par_seconde']:>12.1f}{m['p50_ms']:>11.3f}{m['p99_ms']:>11.3f}{m['pic_memoire_ko']:>11.0f}")
+            reference = resultats["charger_liste"]["p50_ms"]
+            for nom in ("charger_clients", "charger_clients_paresseux"):
+                print(f"{nom} : {resultats[nom]['p50_ms'] / reference:.2f} fois la lecture en simple liste")
+
+    sortie = args.sortie or f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print(f"\nResultats enregistres dans {sortie}")
+
+    if args.comparer:
+        with open(args.comparer, "r", encoding="utf-8") as f:
+            regressions = comparer(json.load(f), rapport, args.seuil)
+        print(f"{regressions} operation(s) plus lente(s) de plus de {args.seuil:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
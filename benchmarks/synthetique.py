@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generation de clients fictifs (meme forme que charger_clients) pour les benchmarks
+"""
+
+import os
+import sys
+import random
+from datetime import date, timedelta
+
+#Les benchmarks se lancent depuis la racine du projet : on rend les modules de src/ importables
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+PRENOMS = ["Jean", "Marie", "Paul", "Amina", "Steve", "Loic", "Fayol", "Aïcha", "Éric", "Brice"]
+NOMS = ["Mbarga", "Ngo", "Tchouassi", "Diallo", "Fotso", "Ekambi", "Nkoulou", "Abena", "Kamga", "Biya"]
+VILLES = ["Yaoundé", "Douala", "Garoua", "Bafoussam", "Maroua", "Bamenda", "Ngaoundéré", "Bertoua", "Ébolowa", "Kribi"]
+TAGS = ["vip", "whatsapp", "fidèle", "nouveau", "entreprise", "particulier", "recommande", "facebook"]
+DEBUT = date(2024, 1, 1)
+
+
+def generer_clients(nb_clients, achats_par_client=5, graine=0):
+    #Generateur : on peut produire un million de clients sans les garder tous en memoire
+    hasard = random.Random(graine)
+    for client_id in range(1, nb_clients + 1):
+        achats = [
+            ((DEBUT + timedelta(days=hasard.randrange(900))).isoformat(), hasard.randrange(500, 200000, 500))
+            for _ in range(achats_par_client)
+            ]
+        yield {
+            "id" : client_id,
+            "nom" : f"{hasard.choice(PRENOMS)} {hasard.choice(NOMS)}",
+            "ville" : hasard.choice(VILLES),
+            "telephone" : hasard.choice("2367") + "".join(hasard.choice("0123456789") for _ in range(8)),
+            "tags" : hasard.sample(TAGS, hasard.randrange(4)),
+            "historique_achats" : achats
+            }
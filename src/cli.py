@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Commandes non interactives du gestionnaire de clients (pour les scripts et les taches planifiees)
+
+Chaque commande charge le fichier de donnees une seule fois, fait son travail et s'arrete.
+Les commandes de lecture parcourent le fichier client par client (iter_clients) sans construire la base
+en memoire ; les commandes d'ecriture sauvegardent en mode journal (seuls les clients touches sont ecrits).
+L'option --json donne une sortie exploitable par un autre programme.
+
+Exemples (depuis le dossier src) :
+    python main.py lister --json
+    python main.py chercher --ville douala
+    python main.py chercher --un-de vip,fidèle --sauf inactif
+    python main.py ajouter "Jean Mbarga" Yaoundé 677123456 --tags vip,fidèle
+    python main.py achat 3 15000 --date 2026-02-01
+    python main.py trier depenses --limite 10
+    python main.py importer ../imports/clients_du_jour.csv
+    python cli.py --data ../data/clients.db exporter --format jsonl --sortie clients.jsonl
+    python main.py extraire achats --debut 2026-02-01 --sortie ../exports/achats.csv --repere ../exports/achats.repere
+"""
+
+import os
+import sys
+import json
+import heapq
+import argparse
+from datetime import datetime
+
+from importation import importer_clients
+from exportation import extraire, TABLES, FORMATS
+from parallele import valider_parallele, totaux_paralleles, rechercher_par_nom_parallele, rechercher_par_ville_parallele
+from services import (
+    iter_clients, charger_clients, sauvegarder_clients, ajouter_client,
+    modifier_client, supprimer_client, ajouter_achat, rechercher_par_nom,
+    rechercher_par_ville, rechercher_par_tags, rechercher_par_nom_approx, rechercher_par_ville_approx, trier_par_nom,
+    trier_par_total_achat, top_clients_par_depense, total_depense_client,
+    rechercher_par_telephone, doublons_telephone, telephone_valide, date_valide, ConflitVersion, TelephoneDejaUtilise,
+    ClientRenumerote
+)
+from stockage import client_vers_json
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(BASE_DIR, "..", "data", "clients.json")
+
+
+def _liste_tags(texte):
+    return [t.strip() for t in texte.split(",") if t.strip()] if texte else []
+
+
+def _erreur(message):
+    print(f"❌ {message}", file=sys.stderr)
+    return 1
+
+
+def _afficher_clients(clients, args):
+    if args.json:
+        sortie = []
+        for c in clients:
+            ligne = client_vers_json(c)
+            ligne["total_depense"] = total_depense_client(c)
+            sortie.append(ligne)
+        json.dump(sortie, sys.stdout, ensure_ascii=False)
+        print()
+        return
+    #Import tardif : main.py n'est utile ici que pour son affichage d'un client
+    from main import afficher_un_client
+    nb = 0
+    for c in clients:
+        afficher_un_client(c, details=args.details)
+        nb += 1
+    print(f"{nb} client(s)")
+
+
+def _afficher_client_modifie(client, message, args):
+    if args.json:
+        json.dump(client_vers_json(client), sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        print(f"✅ {message} (ID: {client['id']})")
+
+
+def _modifier_et_sauvegarder(args, operation):
+    #Charge la base sans les historiques d'achats (lus seulement pour le client touche),
+    #applique l'operation puis sauvegarde uniquement ce qui a change
+    clients = charger_clients(args.data, args.stockage, paresseux=True)
+    try:
+        resultat = operation(clients)
+    except KeyError:
+        return None, _erreur("Client non trouvé")
+    except (ConflitVersion, TelephoneDejaUtilise) as e:
+        return None, _erreur(e)
+    conflits = sauvegarder_clients(clients, args.data, journal=True, format=args.stockage)
+    for renumerote in (c for c in conflits if isinstance(c, ClientRenumerote)):
+        print(f"⚠️  ID {renumerote.ancien_id} pris entre temps par un autre programme : client enregistré "
+              f"sous l'ID {renumerote.nouvel_id}", file=sys.stderr)
+    abandonnes = [c for c in conflits if not isinstance(c, ClientRenumerote)]
+    if abandonnes:
+        return None, _erreur(f"Clients modifiés entre temps par un autre programme, non enregistrés : {abandonnes}")
+    return resultat, 0
+
+
+def commande_lister(args):
+    clients = iter_clients(args.data, args.stockage)
+    if args.limite:
+        clients = (c for _, c in zip(range(args.limite), clients))
+    _afficher_clients(clients, args)
+    return 0
+
+
+def commande_chercher(args):
+    #--tags, --un-de et --sauf cherchent seuls ou filtrent le resultat de --nom, --ville ou --telephone
+    etiquettes = (_liste_tags(args.tags), _liste_tags(args.un_de), _liste_tags(args.sauf))
+    if args.nom is None and args.ville is None and args.telephone is None and not any(etiquettes):
+        return _erreur("Indiquez au moins un critère : --nom, --ville, --telephone, --tags, --un-de ou --sauf")
+    clients = iter_clients(args.data, args.stockage)
+    if args.approx and args.nom is not None:
+        resultats = rechercher_par_nom_approx(clients, args.nom, args.limite)
+    elif args.approx and args.ville is not None:
+        resultats = rechercher_par_ville_approx(clients, args.ville, args.limite)
+    elif args.telephone is not None:
+        client = rechercher_par_telephone(clients, args.telephone)
+        resultats = [client] if client is not None else []
+    elif args.nom is not None and args.workers:
+        resultats = rechercher_par_nom_parallele(clients, args.nom, args.workers)
+    elif args.ville is not None and args.workers:
+        resultats = rechercher_par_ville_parallele(clients, args.ville, args.workers)
+    elif args.nom is not None:
+        resultats = rechercher_par_nom(clients, args.nom)
+    elif args.ville is not None:
+        resultats = rechercher_par_ville(clients, args.ville)
+    else:
+        resultats = clients
+    if any(etiquettes):
+        resultats = rechercher_par_tags(resultats, *etiquettes)
+    _afficher_clients(resultats, args)
+    return 0
+
+
+def commande_trier(args):
+    clients = iter_clients(args.data, args.stockage)
+    if args.critere == "nom":
+        tries = trier_par_nom(clients)
+        if args.limite:
+            tries = tries[:args.limite]
+    elif args.workers:
+        #Totaux calcules par plusieurs processus, puis meme ordre que top_clients_par_depense / trier_par_total_achat
+        clients = list(clients)
+        totaux, _ = totaux_paralleles(clients, args.workers)
+        if args.limite:
+            tries = heapq.nlargest(args.limite, clients, key=lambda c: totaux[c["id"]])
+        else:
+            tries = sorted(clients, key=lambda c: totaux[c["id"]], reverse=True)
+    elif args.limite:
+        tries = top_clients_par_depense(clients, args.limite) #Tas de taille k, pas de tri complet
+    else:
+        tries = trier_par_total_achat(clients)
+    _afficher_clients(tries, args)
+    return 0
+
+
+def commande_ajouter(args):
+    if not telephone_valide(args.telephone):
+        return _erreur("Numéro de téléphone invalide (doit avoir 9 chiffres et commencer par 2,3,6 ou 7)")
+    client, code = _modifier_et_sauvegarder(
+        args, lambda clients: ajouter_client(clients, args.nom, args.ville, args.telephone, _liste_tags(args.tags), args.unique))
+    if client is not None:
+        _afficher_client_modifie(client, "Client ajouté", args)
+    return code
+
+
+def commande_modifier(args):
+    if args.telephone is not None and not telephone_valide(args.telephone):
+        return _erreur("Numéro de téléphone invalide (doit avoir 9 chiffres et commencer par 2,3,6 ou 7)")
+    tags = _liste_tags(args.tags) if args.tags is not None else None
+    client, code = _modifier_et_sauvegarder(
+        args, lambda clients: modifier_client(clients, args.id, args.nom, args.ville, args.telephone, tags, args.si_version, args.unique))
+    if client is not None:
+        _afficher_client_modifie(client, "Client modifié", args)
+    return code
+
+
+def commande_supprimer(args):
+    _, code = _modifier_et_sauvegarder(args, lambda clients: supprimer_client(clients, args.id, args.si_version))
+    if code == 0:
+        print(json.dumps({"supprime" : args.id}) if args.json else f"✅ Client {args.id} supprimé")
+    return code
+
+
+def commande_achat(args):
+    date_achat = args.date or datetime.now().strftime("%Y-%m-%d")
+    if not date_valide(date_achat):
+        return _erreur("Format de date invalide (utilisez YYYY-MM-DD)")
+    if args.montant < 0:
+        return _erreur("Montant invalide")
+    client, code = _modifier_et_sauvegarder(
+        args, lambda clients: ajouter_achat(clients, args.id, date_achat, args.montant))
+    if client is not None:
+        _afficher_client_modifie(client, f"Achat de {args.montant} FCFA ajouté le {date_achat}", args)
+    return code
+
+
+def commande_stats(args):
+    from statistiques import TableAchats #NumPy n'est charge que pour cette commande
+    try:
+        table = TableAchats(iter_clients(args.data, args.stockage))
+    except ImportError as e:
+        return _erreur(e)
+    groupes = {
+        "par_ville" : table.par_ville(args.debut, args.fin),
+        "par_tag" : table.par_tag(args.debut, args.fin),
+        "par_mois" : table.par_mois(args.debut, args.fin),
+        }
+    resume = table.resume(args.debut, args.fin)
+    if args.json:
+        sortie = dict(resume)
+        for nom, lignes in groupes.items():
+            sortie[nom] = [{"cle" : cle, "somme" : somme, "nombre" : nombre, "moyenne" : moyenne}
+                           for cle, somme, nombre, moyenne in lignes]
+        json.dump(sortie, sys.stdout, ensure_ascii=False)
+        print()
+        return 0
+    for cle, valeur in resume.items():
+        print(f"{cle}: {valeur:.0f}" if isinstance(valeur, float) else f"{cle}: {valeur}")
+    for nom, lignes in groupes.items():
+        print(f"\n{nom}:")
+        for cle, somme, nombre, moyenne in lignes:
+            print(f"   {cle:12} {somme:>12} FCFA | {nombre:>6} achats | moyenne {moyenne:.0f} FCFA")
+    return 0
+
+
+def commande_exporter(args):
+    #Une ligne par client au fil de la lecture (jsonl), ou un tableau JSON compact
+    sortie = open(args.sortie, "w", encoding="utf-8") if args.sortie else sys.stdout
+    try:
+        if args.format == "json":
+            sortie.write("[")
+        for i, c in enumerate(iter_clients(args.data, args.stockage)):
+            if args.format == "json" and i:
+                sortie.write(",")
+            sortie.write(json.dumps(client_vers_json(c), ensure_ascii=False))
+            if args.format == "jsonl":
+                sortie.write("\n")
+        if args.format == "json":
+            sortie.write("]\n")
+    finally:
+        if args.sortie:
+            sortie.close()
+    return 0
+
+
+def commande_extraire(args):
+    for date_limite in (args.debut, args.fin):
+        if date_limite and not date_valide(date_limite):
+            return _erreur("Format de date invalide (utilisez YYYY-MM-DD)")
+    try:
+        rapport = extraire(args.data, args.sortie, args.table, args.format, _liste_tags(args.ville), _liste_tags(args.tags),
+                           args.debut, args.fin, args.repere, args.stockage, flux=None if args.sortie else sys.stdout.buffer)
+    except ValueError as e:
+        return _erreur(e)
+    #Sans --sortie l'extrait part sur la sortie standard : le compte rendu va alors sur la sortie d'erreur
+    compte_rendu = sys.stdout if args.sortie else sys.stderr
+    if args.json:
+        print(json.dumps(rapport, ensure_ascii=False), file=compte_rendu)
+    else:
+        print(f"✅ {rapport['lignes']} ligne(s) {args.table} exportée(s) en {rapport['duree']:.2f} s", file=compte_rendu)
+        if args.repere:
+            depuis = rapport["depuis"] or "le début"
+            print(f"   Changements depuis {depuis} ; {rapport['supprimes']} client(s) supprimé(s) depuis", file=compte_rendu)
+    return 0
+
+
+def commande_importer(args):
+    rapport = importer_clients(args.source, args.data, args.format, args.stockage)
+    if args.json:
+        json.dump(rapport, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        print(f"{rapport['lignes']} lignes lues en {rapport['duree']:.2f} s ({rapport['lignes_par_seconde']:.0f} lignes/s)")
+        print(f"{rapport['clients_ajoutes']} clients ajoutés, {rapport['achats_ajoutes']} achats ajoutés")
+        print(f"{len(rapport['rejets'])} lignes rejetées")
+        for numero, raison in rapport["rejets"]:
+            print(f"   ligne {numero}: {raison}", file=sys.stderr)
+    return 1 if rapport["rejets"] else 0
+
+
+def commande_doublons(args):
+    doublons = doublons_telephone(iter_clients(args.data, args.stockage))
+    if args.json:
+        json.dump({numero : [c["id"] for c in clients] for numero, clients in doublons.items()}, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        for numero, clients in doublons.items():
+            print(f"{numero} : " + ", ".join(f"ID:{c['id']} {c['nom']}" for c in clients))
+        print(f"{len(doublons)} numéro(s) partagé(s) par plusieurs clients")
+    return 0
+
+
+def commande_valider(args):
+    invalides = valider_parallele(list(iter_clients(args.data, args.stockage)), workers=args.workers)
+    if args.json:
+        json.dump([{"id" : client_id, "erreurs" : erreurs} for client_id, erreurs in invalides], sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        for client_id, erreurs in invalides:
+            print(f"ID:{client_id} | " + " ; ".join(erreurs))
+        print(f"{len(invalides)} client(s) invalide(s)")
+    return 1 if invalides else 0
+
+
+def commande_serveur(args):
+    from serveur import lancer_serveur
+    lancer_serveur(args.data, args.hote, args.port, args.stockage)
+    return 0
+
+
+def creer_parser():
+    parser = argparse.ArgumentParser(prog="gestionnaire_clients", description="Gestionnaire de clients en ligne de commande")
+    parser.add_argument("--data", default=DATA_FILE, help="fichier de données (.json, .db, .sqlite)")
+    parser.add_argument("--stockage", choices=["json", "sqlite"], help="format du fichier de données si l'extension ne suffit pas")
+    sous_commandes = parser.add_subparsers(dest="commande", required=True)
+
+    #Options communes a toutes les commandes
+    commun = argparse.ArgumentParser(add_help=False)
+    commun.add_argument("--json", action="store_true", help="sortie JSON")
+
+    def commande(nom, alias, fonction, aide):
+        #Chaque commande a un nom francais et un alias anglais (lister / list ...)
+        sous_parser = sous_commandes.add_parser(nom, aliases=[alias], parents=[commun], help=aide)
+        sous_parser.set_defaults(fonction=fonction)
+        return sous_parser
+
+    lister = commande("lister", "list", commande_lister, "affiche les clients")
+    lister.add_argument("--limite", type=int, help="nombre maximum de clients")
+    lister.add_argument("--details", action="store_true", help="affiche aussi les derniers achats")
+
+    chercher = commande("chercher", "search", commande_chercher, "recherche par nom, ville ou tags")
+    critere = chercher.add_mutually_exclusive_group()
+    critere.add_argument("--nom")
+    critere.add_argument("--ville")
+    critere.add_argument("--telephone", help="numéro exact (espaces, tirets et +237 ignorés)")
+    chercher.add_argument("--tags", help="tous ces tags (ET), séparés par des virgules")
+    chercher.add_argument("--un-de", help="au moins un de ces tags (OU), séparés par des virgules")
+    chercher.add_argument("--sauf", help="aucun de ces tags (SAUF), séparés par des virgules")
+    chercher.add_argument("--details", action="store_true", help="affiche aussi les derniers achats")
+    chercher.add_argument("--approx", action="store_true", help="recherche approchée sur --nom ou --ville (accents et fautes tolérés)")
+    chercher.add_argument("--limite", type=int, default=10, help="nombre de résultats de la recherche approchée")
+    chercher.add_argument("--workers", type=int, help="recherche sur --nom ou --ville répartie sur ce nombre de processus")
+
+    trier = commande("trier", "sort", commande_trier, "trie par nom ou par dépenses")
+    trier.add_argument("critere", choices=["nom", "depenses"])
+    trier.add_argument("--limite", type=int, help="garde seulement les N premiers")
+    trier.add_argument("--details", action="store_true", help="affiche aussi les derniers achats")
+    trier.add_argument("--workers", type=int, help="totaux des dépenses calculés par ce nombre de processus")
+
+    ajouter = commande("ajouter", "add", commande_ajouter, "ajoute un client")
+    ajouter.add_argument("nom")
+    ajouter.add_argument("ville")
+    ajouter.add_argument("telephone")
+    ajouter.add_argument("--tags", help="tags séparés par des virgules")
+    ajouter.add_argument("--unique", action="store_true", help="refuse un numéro déjà utilisé par un autre client")
+
+    modifier = commande("modifier", "update", commande_modifier, "modifie un client")
+    modifier.add_argument("id", type=int)
+    modifier.add_argument("--nom")
+    modifier.add_argument("--ville")
+    modifier.add_argument("--telephone")
+    modifier.add_argument("--tags", help="nouveaux tags séparés par des virgules")
+    modifier.add_argument("--si-version", type=int, help="refuse la modification si le client n'a plus cette version")
+    modifier.add_argument("--unique", action="store_true", help="refuse un numéro déjà utilisé par un autre client")
+
+    supprimer = commande("supprimer", "delete", commande_supprimer, "supprime un client")
+    supprimer.add_argument("id", type=int)
+    supprimer.add_argument("--si-version", type=int, help="refuse la suppression si le client n'a plus cette version")
+
+    achat = commande("achat", "add-purchase", commande_achat, "ajoute un achat à un client")
+    achat.add_argument("id", type=int)
+    achat.add_argument("montant", type=int, help="montant en FCFA")
+    achat.add_argument("--date", help="YYYY-MM-DD (par défaut aujourd'hui)")
+
+    stats = commande("stats", "statistics", commande_stats, "statistiques d'achats (nécessite numpy)")
+    stats.add_argument("--debut", help="YYYY-MM-DD")
+    stats.add_argument("--fin", help="YYYY-MM-DD")
+
+    exporter = commande("exporter", "export", commande_exporter, "exporte les clients en JSON ou JSONL")
+    exporter.add_argument("--format", choices=["json", "jsonl"], default="jsonl")
+    exporter.add_argument("--sortie", help="fichier de sortie (par défaut la sortie standard)")
+
+    extrait = commande("extraire", "extract", commande_extraire, "extrait clients ou achats à plat en CSV, JSONL ou colonnes")
+    extrait.add_argument("table", choices=list(TABLES), help="clients : une ligne par client ; achats : une ligne par achat")
+    extrait.add_argument("--format", choices=list(FORMATS), help="format de l'extrait (sinon d'après l'extension, CSV par défaut)")
+    extrait.add_argument("--sortie", help="fichier de sortie (par défaut la sortie standard)")
+    extrait.add_argument("--ville", help="villes séparées par des virgules")
+    extrait.add_argument("--tags", help="tags exigés, séparés par des virgules")
+    extrait.add_argument("--debut", help="achats à partir de cette date (YYYY-MM-DD)")
+    extrait.add_argument("--fin", help="achats jusqu'à cette date incluse (YYYY-MM-DD)")
+    extrait.add_argument("--repere", help="fichier repère : n'exporte que ce qui a changé depuis le dernier export")
+
+    importer = commande("importer", "import", commande_importer, "importe des clients et achats depuis un CSV ou un JSONL")
+    importer.add_argument("source", help="fichier à importer")
+    importer.add_argument("--format", choices=["csv", "jsonl"], help="format du fichier (sinon d'après l'extension)")
+
+    valider = commande("valider", "validate", commande_valider, "vérifie téléphones, dates et montants de toute la base")
+    valider.add_argument("--workers", type=int, help="nombre de processus (par défaut : nombre de processeurs)")
+
+    commande("doublons", "duplicates", commande_doublons, "numéros de téléphone partagés par plusieurs clients")
+
+    serveur = commande("serveur", "serve", commande_serveur, "lance l'API HTTP/JSON partagée (voir serveur.py)")
+    serveur.add_argument("--hote", default="127.0.0.1", help="adresse d'écoute (par défaut seulement cette machine)")
+    serveur.add_argument("--port", type=int, default=8080)
+    return parser
+
+
+def main(argv=None):
+    args = creer_parser().parse_args(argv)
+    return args.fonction(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
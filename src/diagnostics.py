@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Mesures de performance optionnelles : nombre d'appels, temps cumule et par appel, taille de la base
+
+Desactive par defaut (aucun cout) ; on l'active sans toucher au code avec des variables d'environnement :
+    GESTIONNAIRE_DIAGNOSTICS=1 python main.py              compteurs et temps des fonctions de services.py
+    GESTIONNAIRE_PROFIL=session.prof python main.py        profil cProfile de toute la session, ecrit en quittant
+Le menu "Diagnostics" (option 11) affiche les mesures de la session en cours.
+Le profil se relit avec : python -m pstats session.prof
+"""
+
+import os
+import io
+import sys
+import atexit
+import cProfile
+import pstats
+import functools
+from time import perf_counter
+
+ACTIF = os.environ.get("GESTIONNAIRE_DIAGNOSTICS", "").strip().lower() not in ("", "0", "non", "false")
+FICHIER_PROFIL = os.environ.get("GESTIONNAIRE_PROFIL") or None
+
+#nom -> [appels, temps cumule (s), appel le plus long (s), taille de la base au dernier appel]
+_mesures = {}
+_profileur = None
+
+
+def _noter(nom, duree, taille):
+    m = _mesures.get(nom)
+    if m is None:
+        m = _mesures[nom] = [0, 0.0, 0.0, None]
+    m[0] += 1
+    m[1] += duree
+    if duree > m[2]:
+        m[2] = duree
+    if taille is not None:
+        m[3] = taille
+
+
+def _taille(args, resultat):
+    #Nombre de clients concernes : la liste passee en premier argument, ou celle renvoyee (charger_clients)
+    for valeur in (args[0] if args else None, resultat):
+        if valeur is not None and not isinstance(valeur, (str, dict)) and hasattr(valeur, "__len__"):
+            return len(valeur)
+    return None
+
+
+def instrumente(fonction):
+    #Decorateur : sans GESTIONNAIRE_DIAGNOSTICS la fonction est rendue telle quelle, donc aucun surcout
+    if not ACTIF:
+        return fonction
+
+    @functools.wraps(fonction)
+    def enveloppe(*args, **kwargs):
+        debut = perf_counter()
+        try:
+            resultat = fonction(*args, **kwargs)
+        except BaseException:
+            _noter(fonction.__name__, perf_counter() - debut, None)
+            raise
+        _noter(fonction.__name__, perf_counter() - debut, _taille(args, resultat))
+        return resultat
+    return enveloppe
+
+
+def statistiques():
+    #[(nom, appels, cumul ms, moyenne ms, max ms, taille)] de la fonction la plus couteuse a la moins couteuse
+    lignes = [(nom, appels, cumul * 1000, cumul * 1000 / appels, maximum * 1000, taille)
+              for nom, (appels, cumul, maximum, taille) in _mesures.items()]
+    return sorted(lignes, key=lambda ligne: ligne[2], reverse=True)
+
+
+def demarrer_profil():
+    global _profileur
+    if _profileur is None:
+        _profileur = cProfile.Profile()
+        _profileur.enable()
+
+
+def _texte_profil(profileur, nombre):
+    sortie = io.StringIO()
+    pstats.Stats(profileur, stream=sortie).sort_stats("cumulative").print_stats(nombre)
+    return sortie.getvalue()
+
+
+def arreter_profil(chemin=None, nombre=15):
+    #Arrete le profil et l'ecrit dans chemin (format pstats) ; renvoie le texte des fonctions les plus couteuses
+    global _profileur
+    if _profileur is None:
+        return ""
+    _profileur.disable()
+    if chemin:
+        _profileur.dump_stats(chemin)
+    texte = _texte_profil(_profileur, nombre)
+    _profileur = None
+    return texte
+
+
+def resume_profil(nombre=15):
+    #Fonctions les plus couteuses depuis le debut du profil, qui continue ensuite
+    if _profileur is None:
+        return ""
+    _profileur.disable() #On ne profile pas la mise en forme du rapport
+    try:
+        return _texte_profil(_profileur, nombre)
+    finally:
+        _profileur.enable()
+
+
+def profil_actif():
+    return _profileur is not None
+
+
+if FICHIER_PROFIL:
+    demarrer_profil()
+    _pid = os.getpid()
+
+    @atexit.register
+    def _ecrire_profil():
+        if os.getpid() != _pid: #Processus fils (parallele.py) : seul le programme principal ecrit le profil
+            return
+        arreter_profil(FICHIER_PROFIL)
+        print(f"Profil cProfile écrit dans {FICHIER_PROFIL} (python -m pstats {FICHIER_PROFIL})", file=sys.stderr)
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraits de la base pour la comptabilite : clients ou achats a plat, en CSV, JSONL ou format en colonnes
+
+La base est lue client par client (iter_clients) et chaque ligne est ecrite des qu'elle est prete : la memoire
+utilisee ne depend pas de la taille de la base (un groupe de lignes au plus pour le format en colonnes).
+
+Tables :  clients : id,nom,ville,telephone,tags,version,nb_achats,total_depense
+          achats  : client_id,nom,ville,telephone,date,montant   (une ligne par achat)
+Filtres : villes et tags (sans accents ni casse, un client doit avoir tous les tags demandes), periode debut/fin
+          sur la date des achats (la table clients ne garde alors que les clients ayant achete dans la periode,
+          avec leur nombre et total d'achats sur la periode)
+
+Mode incremental : un fichier repere (par ex. ../exports/achats.repere) garde ce qui a deja ete exporte, par
+client reconnu par son id et sa date de creation ("cree") : un nouveau client qui reprend l'id d'un client supprime
+n'est pas pris pour lui. Pour la table clients, la version de chaque client : seuls les clients nouveaux ou modifies depuis sont exportes.
+Pour la table achats, le nombre d'achats exportes par client et par date : seuls les achats ajoutes depuis sont
+exportes. Le repere n'est mis a jour qu'une fois l'extrait entierement ecrit ; un export interrompu sera refait.
+
+Format "colonnes" : fichier gzip de lignes JSON. La premiere decrit la table, chaque ligne suivante est un groupe
+d'au plus TAILLE_GROUPE lignes range par colonne ; une colonne de textes qui se repetent (villes, dates) est
+ecrite comme un dictionnaire de valeurs + les numeros de ces valeurs. Relecture avec lire_colonnes().
+"""
+
+import io
+import os
+import csv
+import gzip
+import json
+import time
+import tempfile
+from collections import Counter
+from datetime import datetime
+
+from indexation import normaliser_texte
+from services import iter_clients
+from stockage import copier_mode
+
+TABLES = {
+    "clients" : ("id", "nom", "ville", "telephone", "tags", "version", "nb_achats", "total_depense"),
+    "achats" : ("client_id", "nom", "ville", "telephone", "date", "montant"),
+    }
+FORMATS = ("csv", "jsonl", "colonnes")
+EXTENSIONS = {".csv" : "csv", ".jsonl" : "jsonl", ".ndjson" : "jsonl", ".colonnes" : "colonnes", ".gz" : "colonnes"}
+
+#Nombre de lignes par groupe dans le format en colonnes (memoire utilisee pendant l'ecriture)
+TAILLE_GROUPE = 10000
+
+
+def _filtre_client(villes, tags):
+    #Predicat sur un client : ville parmi celles demandees et tous les tags demandes
+    villes = {normaliser_texte(v) for v in villes}
+    tags = {normaliser_texte(t) for t in tags}
+    def garder(c):
+        if villes and normaliser_texte(c["ville"]) not in villes:
+            return False
+        return not tags or tags <= {normaliser_texte(t) for t in c.get("tags", [])}
+    return garder
+
+
+def _achats_periode(c, debut, fin):
+    #Les dates sont au format YYYY-MM-DD : l'ordre des chaines est celui des dates
+    return [(d, m) for d, m in c.get("historique_achats", [])
+            if (debut is None or d >= debut) and (fin is None or d <= fin)]
+
+
+def _cle(c):
+    #Un id peut revenir apres une suppression, pas le couple (id, date de creation)
+    return (c["id"], c.get("cree"))
+
+
+class Repere:
+    #Ce qui a deja ete exporte, par client : sa version (table clients) ou {date: nombre d'achats} (table achats)
+    def __init__(self, chemin, table):
+        self.chemin = chemin
+        self.table = table
+        self.precedent = {}
+        self.date_precedente = None
+        if os.path.exists(chemin):
+            with open(chemin, "r", encoding="utf-8") as f:
+                entete = json.loads(f.readline() or "{}")
+                if entete.get("table") != table:
+                    raise ValueError(f"Le repère {chemin} concerne la table {entete.get('table')!r}, pas {table!r}")
+                self.date_precedente = entete.get("date")
+                for ligne in f:
+                    client_id, etat, *cree = json.loads(ligne) #Ancien repere : pas de date de creation
+                    self.precedent[(client_id, cree[0] if cree else None)] = etat
+        self.etat = {}
+
+    def client_modifie(self, c):
+        return self.precedent.get(_cle(c)) != c.get("version")
+
+    def nouveaux_achats(self, c, achats):
+        #Achats pas encore exportes : a date egale, un nouvel achat est range apres les anciens (ajouter_achat),
+        #donc pour chaque date on garde les derniers au dela du nombre deja exporte
+        deja = self.precedent.get(_cle(c)) or {}
+        par_date = {}
+        for achat in achats:
+            par_date.setdefault(achat[0], []).append(achat)
+        nouveaux = []
+        for d, liste in par_date.items():
+            nouveaux.extend(liste[deja.get(d, 0):])
+        nouveaux.sort(key=lambda achat: achat[0])
+        return nouveaux
+
+    def reporter(self, c):
+        #Client rencontre pendant l'export : on garde ce qui etait deja exporte
+        cle = _cle(c)
+        if cle in self.precedent:
+            self.etat[cle] = self.precedent[cle]
+
+    def noter_client(self, c):
+        self.etat[_cle(c)] = c.get("version")
+
+    def noter_achats(self, c, achats):
+        compte = Counter(self.etat.get(_cle(c)) or {})
+        compte.update(d for d, _ in achats)
+        self.etat[_cle(c)] = dict(compte)
+
+    def supprimes(self):
+        #Clients du repere qui ne sont plus dans la base
+        return len(self.precedent.keys() - self.etat.keys())
+
+    def enregistrer(self):
+        dossier = os.path.dirname(self.chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        fd, temporaire = tempfile.mkstemp(dir=dossier or ".", prefix=os.path.basename(self.chemin) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"table" : self.table, "date" : datetime.now().isoformat(timespec="seconds")}) + "\n")
+                for (client_id, cree), etat in self.etat.items():
+                    f.write(json.dumps([client_id, etat, cree], ensure_ascii=False, separators=(",", ":")) + "\n")
+            copier_mode(temporaire, self.chemin)
+        except BaseException:
+            os.remove(temporaire)
+            raise
+        os.replace(temporaire, self.chemin)
+
+
+def lignes_export(clients, table="clients", villes=(), tags=(), debut=None, fin=None, repere=None):
+    #Generateur des lignes (tuples dans l'ordre de TABLES[table]) ; clients peut etre un iterateur
+    if table not in TABLES:
+        raise ValueError(f"Table d'export inconnue : {table}")
+    garder = _filtre_client(villes, tags)
+    periode = debut is not None or fin is not None
+    for c in clients:
+        if repere is not None:
+            repere.reporter(c)
+        if not garder(c):
+            continue
+        achats = _achats_periode(c, debut, fin) if periode else c.get("historique_achats", [])
+        tags_client = ",".join(c.get("tags", []))
+        if table == "clients":
+            if periode and not achats:
+                continue
+            if repere is not None:
+                if not repere.client_modifie(c):
+                    continue
+                repere.noter_client(c)
+            yield (c["id"], c["nom"], c["ville"], c["telephone"], tags_client, c.get("version"),
+                   len(achats), sum(m for _, m in achats))
+        else:
+            if repere is not None:
+                achats = repere.nouveaux_achats(c, achats)
+                repere.noter_achats(c, achats)
+            for date_achat, montant in achats:
+                yield (c["id"], c["nom"], c["ville"], c["telephone"], date_achat, montant)
+
+
+class EcrivainCSV:
+    def __init__(self, flux, table):
+        self.flux = io.TextIOWrapper(flux, encoding="utf-8", newline="")
+        self.csv = csv.writer(self.flux)
+        self.csv.writerow(TABLES[table])
+
+    def ecrire(self, ligne):
+        self.csv.writerow(ligne)
+
+    def fermer(self):
+        self.flux.flush()
+        self.flux.detach()
+
+
+class EcrivainJSONL:
+    def __init__(self, flux, table):
+        self.flux = io.TextIOWrapper(flux, encoding="utf-8", newline="\n")
+        self.colonnes = TABLES[table]
+
+    def ecrire(self, ligne):
+        self.flux.write(json.dumps(dict(zip(self.colonnes, ligne)), ensure_ascii=False) + "\n")
+
+    def fermer(self):
+        self.flux.flush()
+        self.flux.detach()
+
+
+def _encoder_colonne(valeurs):
+    #Textes qui se repetent : dictionnaire des valeurs distinctes + numero de la valeur pour chaque ligne
+    if all(isinstance(v, str) for v in valeurs):
+        numeros = {}
+        codes = [numeros.setdefault(v, len(numeros)) for v in valeurs]
+        if len(numeros) * 2 <= len(valeurs):
+            return {"valeurs" : list(numeros), "codes" : codes}
+    return valeurs
+
+
+def _decoder_colonne(colonne):
+    if isinstance(colonne, dict):
+        valeurs = colonne["valeurs"]
+        return [valeurs[code] for code in colonne["codes"]]
+    return colonne
+
+
+class EcrivainColonnes:
+    def __init__(self, flux, table):
+        #mtime=0 : deux exports identiques donnent le meme fichier
+        self.gzip = gzip.GzipFile(fileobj=flux, mode="wb", mtime=0)
+        self.flux = io.TextIOWrapper(self.gzip, encoding="utf-8", newline="\n")
+        self.colonnes = TABLES[table]
+        self.groupe = [[] for _ in self.colonnes]
+        self.flux.write(json.dumps({"format" : "colonnes", "table" : table, "colonnes" : self.colonnes}) + "\n")
+
+    def ecrire(self, ligne):
+        for colonne, valeur in zip(self.groupe, ligne):
+            colonne.append(valeur)
+        if len(self.groupe[0]) >= TAILLE_GROUPE:
+            self._vider()
+
+    def _vider(self):
+        groupe = {"lignes" : len(self.groupe[0]),
+                  "colonnes" : {nom : _encoder_colonne(valeurs) for nom, valeurs in zip(self.colonnes, self.groupe)}}
+        self.flux.write(json.dumps(groupe, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.groupe = [[] for _ in self.colonnes]
+
+    def fermer(self):
+        if self.groupe[0]:
+            self._vider()
+        self.flux.flush()
+        self.flux.detach()
+        self.gzip.close() #Ecrit la fin du flux gzip sans fermer le fichier de sortie
+
+
+ECRIVAINS = {"csv" : EcrivainCSV, "jsonl" : EcrivainJSONL, "colonnes" : EcrivainColonnes}
+
+
+def lire_colonnes(chemin, colonnes=None):
+    #Generateur de dicts (une ligne a la fois) depuis un fichier au format colonnes ; colonnes limite les champs lus
+    with gzip.open(chemin, "rt", encoding="utf-8") as f:
+        entete = json.loads(f.readline())
+        noms = [n for n in entete["colonnes"] if colonnes is None or n in colonnes]
+        for ligne in f:
+            groupe = json.loads(ligne)["colonnes"]
+            valeurs = [_decoder_colonne(groupe[nom]) for nom in noms]
+            for ligne_valeurs in zip(*valeurs):
+                yield dict(zip(noms, ligne_valeurs))
+
+
+def format_sortie(sortie):
+    #Format deduit de l'extension du fichier de sortie, CSV par defaut
+    if sortie:
+        return EXTENSIONS.get(os.path.splitext(sortie)[1].lower(), "csv")
+    return "csv"
+
+
+def extraire(path, sortie=None, table="clients", format=None, villes=(), tags=(), debut=None, fin=None,
+             repere=None, format_stockage=None, flux=None):
+    #Ecrit l'extrait dans le fichier sortie (remplace d'un coup a la fin) ou dans flux (binaire, par ex. la sortie
+    #standard). repere : chemin du fichier repere pour le mode incremental. Renvoie le rapport d'export
+    format = format or format_sortie(sortie)
+    if format not in ECRIVAINS:
+        raise ValueError(f"Format d'export inconnu : {format}")
+    if table not in TABLES:
+        raise ValueError(f"Table d'export inconnue : {table}")
+    debut_export = time.perf_counter()
+    reperes = Repere(repere, table) if repere else None
+    temporaire = None
+    if sortie:
+        dossier = os.path.dirname(sortie)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        fd, temporaire = tempfile.mkstemp(dir=dossier or ".", prefix=os.path.basename(sortie) + ".", suffix=".tmp")
+        flux = os.fdopen(fd, "wb")
+    rapport = {"table" : table, "format" : format, "lignes" : 0}
+    try:
+        ecrivain = ECRIVAINS[format](flux, table)
+        lignes = lignes_export(iter_clients(path, format_stockage), table, villes, tags, debut, fin, reperes)
+        for ligne in lignes:
+            ecrivain.ecrire(ligne)
+            rapport["lignes"] += 1
+        ecrivain.fermer()
+        if temporaire:
+            flux.close()
+            copier_mode(temporaire, sortie)
+    except BaseException:
+        if temporaire:
+            flux.close()
+            os.remove(temporaire)
+        raise
+    if temporaire:
+        os.replace(temporaire, sortie)
+    else:
+        flux.flush()
+    if reperes is not None:
+        #Le repere n'avance qu'apres l'ecriture complete de l'extrait
+        reperes.enregistrer()
+        rapport["depuis"] = reperes.date_precedente
+        rapport["supprimes"] = reperes.supprimes()
+    rapport["duree"] = time.perf_counter() - debut_export
+    return rapport
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Import en lot de clients et d'achats depuis un fichier CSV ou JSONL
+
+Chaque ligne decrit un client (nom, ville, telephone, tags) et/ou un achat (telephone, date, montant).
+Le telephone identifie le client : une ligne dont le numero existe deja (dans la base ou plus haut dans
+le fichier) n'ajoute pas de doublon, ses achats sont rattaches au client existant. Les numeros sont compares
+sans espaces ni indicatif : "677 12 34 56" et "+237677123456" designent le meme client.
+Une ligne invalide (telephone, achat, champ du mauvais type) est rejetee et signalee, l'import continue.
+
+CSV :   nom,ville,telephone,tags,date,montant
+        Jean Mbarga,Yaoundé,677123456,"vip,fidèle",2026-02-01,15000
+        ,,677123456,,2026-02-03,5000
+JSONL : {"nom": "Jean Mbarga", "ville": "Yaoundé", "telephone": "677123456", "tags": ["vip"],
+         "historique_achats": [["2026-02-01", 15000]]}
+"""
+
+import os
+import csv
+import json
+import time
+from datetime import datetime
+
+from indexation import normaliser_telephone
+from services import (
+    charger_clients, sauvegarder_clients, ajouter_client, ajouter_achat,
+    telephone_valide, date_valide
+)
+
+
+def lire_lignes(source, format=None):
+    #Generateur de (numero de ligne, dict) : le fichier n'est jamais charge en entier
+    if format is None:
+        format = "jsonl" if os.path.splitext(source)[1].lower() in (".jsonl", ".ndjson") else "csv"
+    with open(source, "r", encoding="utf-8", newline="") as f:
+        if format == "csv":
+            lecteur = csv.DictReader(f)
+            for ligne in lecteur:
+                yield lecteur.line_num, ligne
+        elif format == "jsonl":
+            for numero, ligne in enumerate(f, start=1):
+                if ligne.strip():
+                    try:
+                        yield numero, json.loads(ligne)
+                    except json.JSONDecodeError:
+                        yield numero, None
+        else:
+            raise ValueError(f"Format d'import inconnu : {format}")
+
+
+def _achats(ligne):
+    #Achats d'une ligne : colonnes date/montant (CSV) ou liste historique_achats (JSONL). None si la liste est invalide
+    historique = ligne.get("historique_achats") or []
+    if not isinstance(historique, list):
+        return None
+    achats = list(historique)
+    if ligne.get("montant") not in (None, ""):
+        achats.append((ligne.get("date") or "", ligne["montant"]))
+    return achats
+
+
+def _tags(valeur):
+    #None si la valeur n'est ni une liste de textes ni un texte "vip,fidèle"
+    if isinstance(valeur, list):
+        return valeur if all(isinstance(t, str) for t in valeur) else None
+    if valeur is not None and not isinstance(valeur, str):
+        return None
+    return [t for t in (valeur or "").split(",") if t.strip()]
+
+
+def importer_dans(clients, lignes):
+    #Importe dans la liste en memoire, sans sauvegarder. Renvoie le rapport d'import
+    rapport = {"lignes" : 0, "clients_ajoutes" : 0, "achats_ajoutes" : 0, "rejets" : []}
+    #Index telephone normalise -> id construit une seule fois pour detecter les doublons en O(1) :
+    #"677 00 00 01", "+237677000001" et "677000001" sont le meme client (le premier s'il y a deja des doublons)
+    par_telephone = {}
+    for c in clients:
+        par_telephone.setdefault(normaliser_telephone(c["telephone"]), c["id"])
+    aujourd_hui = datetime.now().strftime("%Y-%m-%d")
+    for numero, ligne in lignes:
+        rapport["lignes"] += 1
+        if not isinstance(ligne, dict):
+            rapport["rejets"].append((numero, "ligne illisible"))
+            continue
+        brut = str(ligne.get("telephone") or "").strip()
+        tel = normaliser_telephone(brut)
+        if not telephone_valide(tel):
+            rapport["rejets"].append((numero, f"telephone invalide : {brut!r}"))
+            continue
+        #On valide tous les achats avant de toucher a la base : une ligne est acceptee ou rejetee en entier
+        achats = []
+        lus = _achats(ligne)
+        invalide = lus is None
+        for achat in lus or []:
+            if not isinstance(achat, (list, tuple)) or len(achat) != 2:
+                invalide = True
+                break
+            date_achat = str(achat[0]).strip() or aujourd_hui
+            montant = str(achat[1]).strip()
+            if not montant.isdigit() or not date_valide(date_achat):
+                invalide = True
+                break
+            achats.append((date_achat, int(montant)))
+        if invalide:
+            rapport["rejets"].append((numero, "achat invalide (date YYYY-MM-DD et montant entier attendus)"))
+            continue
+        client_id = par_telephone.get(tel)
+        if client_id is None:
+            nom, ville, tags = ligne.get("nom") or "", ligne.get("ville") or "", _tags(ligne.get("tags"))
+            if not isinstance(nom, str) or not isinstance(ville, str) or tags is None:
+                rapport["rejets"].append((numero, "nom et ville en texte, tags en liste ou texte attendus"))
+                continue
+            if not nom.strip() or not ville.strip():
+                rapport["rejets"].append((numero, "nouveau client sans nom ou sans ville"))
+                continue
+            client_id = ajouter_client(clients, nom, ville, tel, tags)["id"]
+            par_telephone[tel] = client_id
+            rapport["clients_ajoutes"] += 1
+        for date_achat, montant in achats:
+            ajouter_achat(clients, client_id, date_achat, montant)
+        rapport["achats_ajoutes"] += len(achats)
+    return rapport
+
+
+def importer_clients(source, path, format=None, format_stockage=None):
+    #Charge la base une fois, importe tout le fichier puis sauvegarde une seule fois a la fin
+    debut = time.perf_counter()
+    clients = charger_clients(path, format_stockage)
+    rapport = importer_dans(clients, lire_lignes(source, format))
+    sauvegarder_clients(clients, path, journal=True, format=format_stockage)
+    rapport["duree"] = time.perf_counter() - debut
+    rapport["lignes_par_seconde"] = rapport["lignes"] / rapport["duree"] if rapport["duree"] else 0.0
+    return rapport
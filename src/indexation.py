@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index en memoire utilises par ClientStore (services.py)
+"""
+
+import bisect
+import heapq
+import unicodedata
+from collections import Counter
+from datetime import date
+
+
+#On enleve les accents (decomposition NFKD puis suppression des signes combinants) et on ignore la casse
+#"Yaoundé" => "yaounde". La transformation se fait caractere par caractere, donc si a est contenu dans b
+#alors normaliser_texte(a) est contenu dans normaliser_texte(b) : c'est ce qui rend l'index fiable
+def normaliser_texte(texte):
+    if texte.isascii(): #Cas le plus courant (noms et villes sans accents) : rien a decomposer
+        return texte.lower()
+    decompose = unicodedata.normalize("NFKD", texte)
+    return "".join(ch for ch in decompose if not unicodedata.combining(ch)).casefold()
+
+
+def ngrammes(texte, n=3):
+    #"mbarga" => {"mba", "bar", "arg", "rga"}
+    return {texte[i:i + n] for i in range(len(texte) - n + 1)}
+
+
+#Distance d'edition (insertions, suppressions, remplacements, deux lettres voisines inversees) entre motif et
+#le morceau de texte qui lui ressemble le plus (algorithme de Sellers) : "mbrga" dans "jean mbarga" => 1
+#(il manque un a), "jaen" dans "jean" => 1 (inversion). Le debut du morceau est libre (premiere ligne a 0)
+#et on garde le meilleur score sur toutes les fins possibles
+def distance_dans(motif, texte):
+    avant_precedente = None
+    precedente = list(range(len(motif) + 1))
+    meilleure = precedente[-1]
+    caractere_precedent = None
+    for caractere in texte:
+        courante = [0]
+        for i, m in enumerate(motif, 1):
+            cout = min(precedente[i - 1] + (m != caractere), precedente[i] + 1, courante[i - 1] + 1)
+            if i > 1 and avant_precedente is not None and m == caractere_precedent and motif[i - 2] == caractere:
+                cout = min(cout, avant_precedente[i - 2] + 1) #Inversion des deux dernieres lettres
+            courante.append(cout)
+        if courante[-1] < meilleure:
+            meilleure = courante[-1]
+        avant_precedente, precedente = precedente, courante
+        caractere_precedent = caractere
+    return meilleure
+
+
+def distance_max(motif):
+    #Fautes tolerees selon la longueur de la requete : aucune sous 3 lettres (une faute sur "a" ou "mb"
+    #accepterait n'importe quoi), 1 jusqu'a 5 lettres, 2 jusqu'a 8, puis 3...
+    if len(motif) < 3:
+        return 0
+    return max(1, len(motif) // 3)
+
+
+#Nombre de candidats gardes apres le filtre par n-grammes, avant le calcul (plus couteux) des distances
+NB_CANDIDATS_APPROX = 300
+#Sans aucun n-gramme en commun, on ne compare a toutes les valeurs que si la base reste petite
+SEUIL_PARCOURS_APPROX = 20000
+
+
+#Classe de base : un index est prevenu quand un client entre ou sort du ClientStore.
+#Pour une modification le store appelle retirer() avant puis ajouter() apres, seulement si
+#un des champs surveilles (champs) a change ; achat() est appele pour chaque nouvel achat
+class Index:
+    champs = ()
+
+    def ajouter(self, client):
+        pass
+
+    def retirer(self, client):
+        pass
+
+    def achat(self, client, date_achat, montant):
+        pass
+
+
+#Index inverse n-gramme -> ensemble d'ids sur un champ texte (nom ou ville).
+#Pour une recherche "contient", chaque n-gramme de la requete doit apparaitre dans la valeur,
+#on croise donc les ensembles des n-grammes de la requete puis on verifie les candidats restants
+class IndexTrigrammes(Index):
+
+    def __init__(self, champ, n=3):
+        self.champ = champ
+        self.champs = (champ,)
+        self.n = n
+        self._postings = {} #n-gramme -> set d'ids
+        self._valeurs = {} #id -> valeur en minuscules, comparee comme dans la recherche d'origine
+
+    def ajouter(self, client):
+        valeur = client[self.champ].lower()
+        self._valeurs[client["id"]] = valeur
+        for g in ngrammes(normaliser_texte(valeur), self.n):
+            self._postings.setdefault(g, set()).add(client["id"])
+
+    def retirer(self, client):
+        #On utilise la valeur memorisee : le dictionnaire client a peut etre deja ete modifie
+        valeur = self._valeurs.pop(client["id"])
+        for g in ngrammes(normaliser_texte(valeur), self.n):
+            ids = self._postings[g]
+            ids.discard(client["id"])
+            if not ids:
+                del self._postings[g]
+
+    def valeur(self, client_id):
+        return self._valeurs[client_id]
+
+    def rechercher(self, requete):
+        #Renvoie l'ensemble des ids dont la valeur contient requete (deja en minuscules),
+        #ou None si la requete est trop courte pour l'index : l'appelant fait alors un parcours
+        grammes = ngrammes(normaliser_texte(requete), self.n)
+        if not grammes:
+            return None
+        #On commence par le plus petit ensemble pour que l'intersection reste petite
+        listes = sorted((self._postings.get(g, set()) for g in grammes), key=len)
+        candidats = set(listes[0])
+        for ids in listes[1:]:
+            candidats &= ids
+            if not candidats:
+                break
+        return {i for i in candidats if requete in self._valeurs[i]}
+
+    def rechercher_approx(self, requete, limite=10):
+        #Recherche tolerante aux fautes et aux accents : [(distance, id)] des meilleures correspondances.
+        #1) les ids qui partagent le plus de n-grammes avec la requete (compte dans les listes de l'index)
+        #2) distance d'edition calculee seulement pour ces candidats, on garde ceux sous distance_max
+        motif = normaliser_texte(requete.strip())
+        if not motif:
+            return []
+        borne = distance_max(motif)
+        communs = Counter()
+        if len(motif) < self.n:
+            #Requete plus courte qu'un n-gramme : les valeurs qui la contiennent ont un n-gramme qui la contient
+            for g, ids in self._postings.items():
+                if motif in g:
+                    communs.update(ids)
+        for g in ngrammes(motif, self.n):
+            communs.update(self._postings.get(g, ()))
+        if communs:
+            candidats = heapq.nlargest(NB_CANDIDATS_APPROX, communs.items(), key=lambda item: item[1])
+        elif len(self._valeurs) <= SEUIL_PARCOURS_APPROX:
+            #Requete trop courte ou aucun n-gramme en commun ("jaen" / "jean") : on compare a toutes les valeurs
+            candidats = [(i, 0) for i in self._valeurs]
+        else:
+            return []
+        resultats = []
+        for client_id, nb_communs in candidats:
+            distance = distance_dans(motif, normaliser_texte(self._valeurs[client_id]))
+            if distance <= borne:
+                resultats.append((distance, -nb_communs, client_id))
+        resultats.sort()
+        return [(distance, client_id) for distance, _, client_id in resultats[:limite]]
+
+
+#Index inverse tag -> ensemble d'ids. Les tags sont compares sans accents ni majuscules ("Fidèle" = "fidele")
+class IndexTags(Index):
+    champs = ("tags",)
+
+    def __init__(self):
+        self._par_tag = {}
+        self._tags = {} #id -> tags normalises du client, pour pouvoir le retirer meme apres modification
+
+    def ajouter(self, client):
+        tags = {normaliser_texte(t) for t in client.get("tags", [])}
+        self._tags[client["id"]] = tags
+        for t in tags:
+            self._par_tag.setdefault(t, set()).add(client["id"])
+
+    def retirer(self, client):
+        for t in self._tags.pop(client["id"]):
+            ids = self._par_tag[t]
+            ids.discard(client["id"])
+            if not ids:
+                del self._par_tag[t]
+
+    def ids(self, tag):
+        return self._par_tag.get(normaliser_texte(tag.strip()), set())
+
+    def tags(self):
+        return list(self._par_tag)
+
+    def rechercher(self, tous=(), un_de=(), sauf=(), tous_les_ids=None):
+        #ET : intersection des ensembles, OU : union, SAUF : difference
+        resultat = None
+        for tag in sorted(tous, key=lambda t: len(self.ids(t))): #Du tag le plus rare au plus frequent
+            resultat = set(self.ids(tag)) if resultat is None else resultat & self.ids(tag)
+        if un_de:
+            union = set().union(*(self.ids(t) for t in un_de))
+            resultat = union if resultat is None else resultat & union
+        if resultat is None:
+            #Seulement des tags a exclure : on part de tous les clients
+            resultat = set(tous_les_ids)
+        for tag in sauf:
+            resultat -= self.ids(tag)
+        return resultat
+
+
+def normaliser_telephone(telephone):
+    #"+237 677 12 34 56" => "677123456" : on garde les chiffres et on retire l'indicatif du Cameroun
+    telephone = str(telephone)
+    if telephone.isascii() and telephone.isdigit(): #Deja au bon format (cas courant)
+        chiffres = telephone
+    else:
+        chiffres = "".join(ch for ch in telephone if ch.isdigit())
+    if len(chiffres) == 12 and chiffres.startswith("237"):
+        chiffres = chiffres[3:]
+    return chiffres
+
+
+#Table de hachage telephone normalise -> ids des clients qui ont ce numero (plusieurs en cas de doublon
+#dans un ancien fichier) : retrouver un client par son numero coute O(1) au lieu d'un parcours
+class IndexTelephones(Index):
+    champs = ("telephone",)
+
+    def __init__(self):
+        self._par_numero = {}
+        self._numeros = {} #id -> numero normalise, pour retirer le client meme apres modification
+
+    def ajouter(self, client):
+        numero = normaliser_telephone(client["telephone"])
+        self._numeros[client["id"]] = numero
+        self._par_numero.setdefault(numero, set()).add(client["id"])
+
+    def retirer(self, client):
+        numero = self._numeros.pop(client["id"])
+        ids = self._par_numero[numero]
+        ids.discard(client["id"])
+        if not ids:
+            del self._par_numero[numero]
+
+    def ids(self, telephone):
+        return self._par_numero.get(normaliser_telephone(telephone), set())
+
+    def doublons(self):
+        #{numero: ids} pour les numeros partages par plusieurs clients
+        return {numero : ids for numero, ids in self._par_numero.items() if len(ids) > 1}
+
+
+def jour(date_achat):
+    #"2026-02-01" => 739468 : la date est analysee une seule fois, ensuite on compare des entiers
+    return date.fromisoformat(date_achat).toordinal()
+
+
+#Index de tous les achats de tous les clients tries par date : liste de (jour, id client, montant).
+#Une periode correspond a une tranche contigue de la liste, trouvee par dichotomie (bisect) en O(log n).
+#Les achats ajoutes sont mis de cote puis fusionnes au moment d'une requete (un seul tri pour un chargement).
+#Chaque client garde ses propres entrees : le retirer ne touche que les siennes. Une entree deja fusionnee est
+#retrouvee par dichotomie et enlevee sur place ; une entree pas encore fusionnee est notee et sautee a la fusion
+class IndexDates(Index):
+    champs = ("historique_achats",)
+
+    def __init__(self):
+        self._achats = []
+        self._nouveaux = []
+        self._par_client = {} #id -> entrees indexees pour ce client, copiees a l'ajout
+        self._retires = Counter() #Entrees retirees alors qu'elles attendaient encore dans _nouveaux
+        self._differes = {} #id -> client charge sans son historique, indexe seulement a la premiere recherche
+
+    @staticmethod
+    def _entree(client, date_achat, montant):
+        #Une date mal formee dans un vieux fichier ne doit pas empecher le chargement : l'achat n'est pas indexe
+        try:
+            return (jour(date_achat), client["id"], montant)
+        except (TypeError, ValueError):
+            return None
+
+    def _indexer(self, client):
+        entrees = (self._entree(client, d, m) for d, m in client.get("historique_achats", []))
+        entrees = [e for e in entrees if e is not None]
+        self._par_client[client["id"]] = entrees
+        self._nouveaux.extend(entrees)
+
+    def ajouter(self, client):
+        if not getattr(client, "historique_lu", True): #Chargement paresseux (stockage.ClientParesseux)
+            self._differes[client["id"]] = client
+            return
+        self._indexer(client)
+
+    def achat(self, client, date_achat, montant):
+        if client["id"] in self._differes:
+            return #Tout son historique, cet achat compris, sera indexe d'un coup
+        entree = self._entree(client, date_achat, montant)
+        if entree is not None:
+            self._par_client.setdefault(client["id"], []).append(entree)
+            self._nouveaux.append(entree)
+
+    def retirer(self, client):
+        #Une dichotomie par achat du client : on retire les entrees memorisees, meme si l'historique a change depuis.
+        #Deux entrees egales (meme jour, client et montant) sont interchangeables : on retire n'importe laquelle
+        if self._differes.pop(client["id"], None) is not None:
+            return
+        for entree in self._par_client.pop(client["id"], ()):
+            position = bisect.bisect_left(self._achats, entree)
+            if position < len(self._achats) and self._achats[position] == entree:
+                del self._achats[position]
+            else:
+                self._retires[entree] += 1
+
+    def _fusionner(self):
+        if self._nouveaux:
+            if self._retires:
+                nouveaux = []
+                for entree in self._nouveaux:
+                    if self._retires[entree]:
+                        self._retires[entree] -= 1
+                    else:
+                        nouveaux.append(entree)
+                self._nouveaux = nouveaux
+                self._retires.clear()
+            #Timsort profite des deux morceaux deja tries : quasi lineaire
+            self._nouveaux.sort()
+            self._achats.extend(self._nouveaux)
+            self._achats.sort()
+            self._nouveaux = []
+
+    def entre(self, debut, fin):
+        #Achats dont le jour est dans [debut, fin] (ordinaux, bornes incluses), dans l'ordre chronologique
+        differes, self._differes = self._differes, {}
+        for client in differes.values():
+            self._indexer(client)
+        self._fusionner()
+        gauche = bisect.bisect_left(self._achats, (debut,))
+        droite = bisect.bisect_left(self._achats, (fin + 1,))
+        return self._achats[gauche:droite]
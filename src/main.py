@@ -14,8 +14,14 @@ from services import (
     charger_clients, sauvegarder_clients, ajouter_client,
     modifier_client, supprimer_client, rechercher_par_nom,
     rechercher_par_ville, trier_par_nom, trier_par_total_achat,
-    total_depense_client
+    total_depense_client, trouver_client, ajouter_achat,
+    total_general_depenses, top_clients_par_depense, telephone_valide,
+    date_valide, rechercher_par_tags, rafraichir_clients, rechercher_par_nom_approx,
+    rechercher_par_telephone, TelephoneDejaUtilise, charger_historiques,
+    transaction, annuler_operation, refaire_operation, ClientRenumerote
 )
+from statistiques import TableAchats
+import diagnostics
 
 # CONCEPT IMPORTANT : Chemins relatifs/absolus
 # Je définis le chemin vers le fichier de données en utilisant os.path.join 
@@ -23,34 +29,62 @@ from services import (
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE = os.path.join(BASE_DIR, "..", "data", "clients.json")
 
+# Nombre de clients proposé par défaut pour le tri par dépenses (0 = tous)
+LIMITE_TOP_CLIENTS = 10
+
+# Nombre de résultats de la recherche approchée (les plus ressemblants d'abord)
+LIMITE_RECHERCHE_APPROX = 10
+
+# Au-delà de ce nombre de clients, la liste est affichée page par page
+TAILLE_PAGE = 50
+
 # Gestion du fichier : création du dossier s'il n'existe pas
 # CONCEPT : Gestion des erreurs de système de fichiers
 if not os.path.exists(os.path.dirname(DATA_FILE)):
     os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
 
 
-def afficher_un_client(client, details=False):
-    """Affiche un client de manière lisible"""
+def formater_client(client, details=False, clients=None):
+    """Texte d'un client (une ligne, plus ses derniers achats si details)"""
     # CONCEPT : Fonction qui calcule une valeur (dépense totale)
-    total = total_depense_client(client)
-    
-    # CONCEPT : Formatage de chaînes avec f-strings et alignement
-    ligne = f"ID:{client['id']} | {client['nom']:15} | {client['ville']:10}"
-    ligne += f" | Tél: {client['telephone']}"
+    # Avec la liste des clients, le total vient du cache au lieu d'être recalculé
+    total = total_depense_client(client, clients)
     
     # CONCEPT : Méthode get() avec valeur par défaut pour éviter KeyError
-    if client.get('tags'):
-        # CONCEPT : Transformation de liste en chaîne avec join()
-        ligne += f" | Tags: {','.join(client['tags'])}"
+    # CONCEPT : Transformation de liste en chaîne avec join()
+    tags = f" | Tags: {','.join(client['tags'])}" if client.get('tags') else ""
     
-    ligne += f" | Total: {total} FCFA"
-    print(ligne)
+    # CONCEPT : Formatage de chaînes avec f-strings et alignement (une seule chaîne construite)
+    texte = (f"ID:{client['id']} | {client['nom']:15} | {client['ville']:10}"
+             f" | Tél: {client['telephone']}{tags} | Total: {total} FCFA")
     
     # CONCEPT : Slicing de liste pour afficher seulement les N derniers éléments
+    # (l'historique est trié par date : ce sont bien les 3 achats les plus récents)
     if details and client.get('historique_achats'):
-        print("   Achats:")
-        for date, montant in client['historique_achats'][-3:]:  # 3 derniers seulement
-            print(f"     - {date}: {montant} FCFA")
+        achats = "".join(f"\n     - {date}: {montant} FCFA" for date, montant in client['historique_achats'][-3:])
+        texte += "\n   Achats:" + achats
+    return texte
+
+
+def afficher_un_client(client, details=False, clients=None):
+    """Affiche un client de manière lisible"""
+    print(formater_client(client, details, clients))
+
+
+def lignes_page(liste, curseur=0, taille=TAILLE_PAGE, clients=None, details=False):
+    """Générateur : formate seulement les clients de la page demandée (à partir de la position curseur).
+    clients = la base complète, pour lire les totaux déjà calculés (par défaut la liste elle-même)"""
+    clients = liste if clients is None else clients
+    # CONCEPT : Slicing, seule la page est parcourue et mise en forme
+    for client in liste[curseur:curseur + taille]:
+        yield formater_client(client, details, clients)
+
+
+def ecrire_lignes(lignes):
+    """Un seul write pour tout un bloc de lignes au lieu d'un print par ligne"""
+    texte = "\n".join(lignes)
+    if texte:
+        sys.stdout.write(texte + "\n")
 
 
 def afficher_tous(clients):
@@ -64,24 +98,121 @@ def afficher_tous(clients):
         print("Aucun client enregistré pour le moment.")
         return
     
-    for client in clients:
-        afficher_un_client(client)
+    afficher_liste(clients)
     
-    # CONCEPT : Compréhension de liste et fonction sum() pour calculs
-    total_general = sum(total_depense_client(c) for c in clients)
+    # CONCEPT : Total général maintenu à chaque achat, lu en O(1)
+    total_general = total_general_depenses(clients)
     print(f"\nTotal général des dépenses: {total_general} FCFA")
     # CONCEPT : Opérateur ternaire implicite pour éviter la division par zéro
     print(f"Moyenne par client: {total_general//len(clients) if clients else 0} FCFA")
 
 
-def demo_automatique():
-    """Une démo automatique pour montrer que tout fonctionne"""
+def afficher_liste(liste, clients=None, details=False):
+    """Affiche une liste de clients d'un bloc si elle est courte, sinon page par page"""
+    if len(liste) <= TAILLE_PAGE:
+        ecrire_lignes(lignes_page(liste, 0, len(liste), clients, details))
+    else:
+        parcourir_pages(liste, clients, details)
+
+
+def parcourir_pages(liste, clients=None, details=False, taille=TAILLE_PAGE):
+    """Affichage page par page : Entrée = suivante, p = précédente, un numéro = aller à la page, q = arrêter"""
+    nb_pages = (len(liste) + taille - 1) // taille
+    page = 0
+    while True:
+        ecrire_lignes(lignes_page(liste, page * taille, taille, clients, details))
+        print(f"--- Page {page + 1}/{nb_pages} ---")
+        if nb_pages == 1:
+            return
+        reponse = input("[Entrée] suivante, p précédente, n° de page, q quitter: ").strip().lower()
+        if reponse == "q":
+            return
+        if reponse == "p":
+            page = max(0, page - 1)
+        elif reponse.isdigit():
+            page = min(max(int(reponse), 1), nb_pages) - 1
+        elif page + 1 < nb_pages:
+            page += 1
+        else:
+            return
+
+
+def choisir_client(clients, question):
+    """Demande un ID, un numéro de téléphone, ou un nom à rechercher pour retrouver l'ID,
+    sans afficher toute la liste. Renvoie le client choisi ou None"""
+    reponse = input(f"\n{question} (ID, téléphone, ou nom à rechercher): ").strip()
+    if not reponse:
+        return None
+    # Un ID n'a jamais 9 chiffres ou plus : c'est un numéro de téléphone
+    chiffres = "".join(ch for ch in reponse if ch.isdigit())
+    if len(chiffres) >= 9 and not any(ch.isalpha() for ch in reponse):
+        client = rechercher_par_telephone(clients, reponse)
+        if client is None:
+            print("❌ Aucun client avec ce numéro")
+        return client
+    if not reponse.isdigit():
+        trouves = rechercher_par_nom(clients, reponse)
+        if not trouves:
+            print("❌ Aucun client trouvé")
+            return None
+        ecrire_lignes(lignes_page(trouves, 0, TAILLE_PAGE, clients))
+        if len(trouves) > TAILLE_PAGE:
+            print(f"... {len(trouves) - TAILLE_PAGE} autres, précisez la recherche")
+        if len(trouves) == 1:
+            return trouves[0]
+        reponse = input("ID du client: ").strip()
+        if not reponse.isdigit():
+            print("❌ ID invalide")
+            return None
+    # CONCEPT : Recherche par clé dans un dictionnaire (index id -> client)
+    client = trouver_client(clients, int(reponse))
+    if client is None:
+        print("❌ Client non trouvé")
+    return client
+
+
+def afficher_statistiques(clients):
+    """Affiche les statistiques d'achats (module statistiques, NumPy)"""
+    print("\n--- STATISTIQUES ---")
+    debut = input("Depuis le (YYYY-MM-DD, vide = début): ").strip() or None
+    fin = input("Jusqu'au (YYYY-MM-DD, vide = fin): ").strip() or None
+    try:
+        # CONCEPT : Mise à plat des achats en colonnes, une seule fois pour tous les calculs
+        # (avec le chargement paresseux, tous les historiques sont d'abord lus en un seul passage)
+        charger_historiques(clients)
+        table = TableAchats(clients)
+        resume = table.resume(debut, fin)
+    except ImportError as e:
+        print(f"❌ {e}")
+        return
+    except ValueError:
+        print("❌ Format de date invalide (utilisez YYYY-MM-DD)")
+        return
+    
+    print(f"\nChiffre d'affaires: {resume['chiffre_affaires']} FCFA ({resume['nb_achats']} achats)")
+    print(f"Panier moyen: {resume['panier_moyen']:.0f} FCFA")
+    print(f"Clients actifs: {resume['clients_actifs']}/{resume['nb_clients']}")
+    print(f"Valeur vie client moyenne: {resume['valeur_vie_client']:.0f} FCFA")
+    
+    # CONCEPT : Boucle sur des tuples (titre, lignes) pour éviter de répéter le même affichage
+    for titre, lignes in (("Par ville", table.par_ville(debut, fin)),
+                          ("Par tag", table.par_tag(debut, fin)),
+                          ("Par mois", table.par_mois(debut, fin))):
+        print(f"\n{titre}:")
+        for libelle, somme, nombre, moyenne in lignes:
+            print(f"   {libelle:12} {somme:>12} FCFA | {nombre:>6} achats | moyenne {moyenne:.0f} FCFA")
+
+
+def demo_automatique(clients=None):
+    """Une démo automatique pour montrer que tout fonctionne.
+    clients = base déjà chargée (sinon elle est lue depuis DATA_FILE). Renvoie la base après la démo"""
     print("\n" + "*"*60)
     print("DÉMONSTRATION AUTOMATIQUE DES FONCTIONNALITÉS")
     print("*"*60)
     
     # CONCEPT : Persistance des données - chargement depuis un fichier JSON
-    clients = charger_clients(DATA_FILE)
+    if clients is None:
+        clients = charger_clients(DATA_FILE, paresseux=True)
     print(f"1. Chargement: {len(clients)} clients trouvés")
     
     # CONCEPT : Initialisation des données si fichier vide (premier lancement)
@@ -97,12 +228,13 @@ def demo_automatique():
             "677123456",
             ["fidèle", "vip", "entreprise"]
         )
-        # CONCEPT : Modification directe d'un dictionnaire (historique d'achats)
-        c1["historique_achats"] = [
+        # CONCEPT : Ajout d'achats (tuples date, montant) dans l'historique du client
+        for date, montant in [
             ("2025-11-10", 75000),
             ("2025-12-15", 120000),
             ("2026-01-05", 85000)
-        ]
+        ]:
+            ajouter_achat(clients, c1["id"], date, montant)
         
         # Client 2 - Un client récent
         c2 = ajouter_client(
@@ -112,10 +244,8 @@ def demo_automatique():
             "699887766",
             ["nouveau", "whatsapp", "particulier"]
         )
-        c2["historique_achats"] = [
-            ("2026-02-01", 45000),
-            ("2026-02-03", 35000)
-        ]
+        ajouter_achat(clients, c2["id"], "2026-02-01", 45000)
+        ajouter_achat(clients, c2["id"], "2026-02-03", 35000)
         
         # Client 3 - Un client sans tags
         c3 = ajouter_client(
@@ -125,9 +255,7 @@ def demo_automatique():
             "623456789",
             []  # CONCEPT : Liste vide pour les tags
         )
-        c3["historique_achats"] = [
-            ("2026-01-20", 125000)
-        ]
+        ajouter_achat(clients, c3["id"], "2026-01-20", 125000)
         
         print(f"   {len(clients)} clients  créés")
     
@@ -139,7 +267,7 @@ def demo_automatique():
     resultats = rechercher_par_nom(clients, "jean")
     if resultats:
         for client in resultats:
-            afficher_un_client(client, details=True)
+            afficher_un_client(client, details=True, clients=clients)
     else:
         print("   Aucun résultat")
     
@@ -148,7 +276,7 @@ def demo_automatique():
     resultats = rechercher_par_ville(clients, "yaoundé")
     if resultats:
         for client in resultats:
-            afficher_un_client(client)
+            afficher_un_client(client, clients=clients)
     else:
         print("   Aucun résultat")
     
@@ -162,7 +290,7 @@ def demo_automatique():
     print("\n6. Tri par montant total dépensé (du plus grand au plus petit)")
     tries = trier_par_total_achat(clients)
     for client in tries:
-        total = total_depense_client(client)
+        total = total_depense_client(client, clients)
         print(f"   - {client['nom']}: {total} FCFA")
     
     # CONCEPT : CRUD - Update (modification d'un client)
@@ -198,7 +326,7 @@ def demo_automatique():
         "655432109",
         ["nouveau", "recommande"]
     )
-    c4["historique_achats"] = [("2026-02-05", 60000)]
+    ajouter_achat(clients, c4["id"], "2026-02-05", 60000)
     print(f"   Nouveau client ajouté: {c4['nom']} (ID: {c4['id']})")
     
     # Affichage final après toutes les opérations CRUD
@@ -218,12 +346,59 @@ def demo_automatique():
     print("✓ UPDATE: Modification de la ville d'un client")
     print("✓ DELETE: Suppression d'un client existant")
     print("*"*60)
+    return clients
+
 
+def afficher_diagnostics():
+    """Temps passé dans les fonctions de services.py depuis le début de la session"""
+    print("\n--- DIAGNOSTICS ---")
+    if not diagnostics.ACTIF and not diagnostics.profil_actif():
+        print("Mesures désactivées. Pour les activer, relancez avec :")
+        print("   GESTIONNAIRE_DIAGNOSTICS=1 python main.py")
+        print("   GESTIONNAIRE_PROFIL=session.prof python main.py   (profil cProfile complet)")
+        return
+    lignes = diagnostics.statistiques()
+    if diagnostics.ACTIF:
+        print(f"{'fonction':<26}{'appels':>8}{'cumul ms':>11}{'moy. ms':>10}{'max ms':>10}{'clients':>10}")
+        for nom, appels, cumul, moyenne, maximum, taille in lignes:
+            print(f"{nom:<26}{appels:>8}{cumul:>11.1f}{moyenne:>10.3f}{maximum:>10.1f}{'' if taille is None else taille:>10}")
+        if not lignes:
+            print("Aucun appel mesuré pour l'instant")
+    if diagnostics.profil_actif():
+        print(f"\nProfil cProfile en cours (écrit dans {diagnostics.FICHIER_PROFIL} en quittant) :")
+        print(diagnostics.resume_profil())
 
-def menu_interactif():
-    """Un petit menu interactif pour tester manuellement"""
+
+# Libellés des opérations notées pour annuler / refaire
+NOMS_OPERATIONS = {"ajout": "ajout", "modif": "modification", "suppr": "suppression", "achat": "achat"}
+
+
+def afficher_operations(operations, verbe, si_vide):
+    """Opérations annulées ou refaites par les options 12 et 13"""
+    if not operations:
+        print(si_vide)
+        return
+    for operation, client_id in operations:
+        print(f"↩️  {verbe.capitalize()} : {NOMS_OPERATIONS[operation]} du client {client_id}")
+
+
+def afficher_conflits(conflits):
+    """Clients modifiés ailleurs en même temps : leur version la plus récente a été gardée.
+    Clients ajoutés dont l'ID a été pris ailleurs : ils sont enregistrés sous un nouvel ID"""
+    for renumerote in (c for c in conflits if isinstance(c, ClientRenumerote)):
+        print(f"⚠️  L'ID {renumerote.ancien_id} a été pris par un autre programme : "
+              f"votre nouveau client a maintenant l'ID {renumerote.nouvel_id}")
+    abandonnes = [c for c in conflits if not isinstance(c, ClientRenumerote)]
+    if abandonnes:
+        print(f"⚠️  {len(abandonnes)} client(s) modifié(s) entre temps par un autre programme, "
+              f"vos changements sur ces clients n'ont pas été appliqués (IDs: {', '.join(map(str, abandonnes))})")
+
+
+def menu_interactif(clients=None):
+    """Un petit menu interactif pour tester manuellement (clients = base déjà chargée par main)"""
     # CONCEPT : Chargement initial des données
-    clients = charger_clients(DATA_FILE)
+    if clients is None:
+        clients = charger_clients(DATA_FILE, paresseux=True)
     
     # CONCEPT : Boucle infinie pour un menu interactif
     while True:
@@ -238,10 +413,14 @@ def menu_interactif():
         print("6. Supprimer un client")
         print("7. Ajouter un achat à un client")
         print("8. Lancer la démo automatique")
+        print("10. Statistiques")
+        print("11. Diagnostics")
+        print("12. Annuler la dernière opération")
+        print("13. Refaire l'opération annulée")
         print("9. Sauvegarder et quitter")
         print("-"*40)
         
-        choix = input("Votre choix (1-9): ").strip()
+        choix = input("Votre choix (1-13): ").strip()
         
         if choix == "1":
             afficher_tous(clients)
@@ -260,29 +439,43 @@ def menu_interactif():
                 continue
             
             # Validation du numéro de téléphone s'il s'agit d'un camerounais
-            if not (tel.isdigit() and len(tel) == 9 and tel[0] in "2367"):
+            if not telephone_valide(tel):
                 print("Erreur: Numéro de téléphone invalide (doit avoir 9 chiffres et commencer par 2,3,6 ou 7)")
                 continue
                 
+            # Même numéro qu'un client existant : sans doute un doublon, on demande confirmation
+            existant = rechercher_par_telephone(clients, tel)
+            if existant is not None:
+                print(f"⚠️ Ce numéro est déjà celui de {existant['nom']} (ID: {existant['id']})")
+                if input("Ajouter quand même? (o/n): ").strip().lower() != 'o':
+                    continue
+
             # CONCEPT : Transformation d'une chaîne en liste
             tags_liste = [t.strip() for t in tags.split(",")] if tags else []
-            nouveau = ajouter_client(clients, nom, ville, tel, tags_liste)
-            print(f"✅ Client ajouté avec ID: {nouveau['id']}")
-            
-            # CONCEPT : Ajout conditionnel d'éléments à une liste
-            ajouter_achat = input("Ajouter un achat maintenant? (o/n): ").strip().lower()
-            if ajouter_achat == 'o':
-                montant = input("Montant de l'achat (FCFA): ").strip()
-                if montant.isdigit():  # CONCEPT : Validation numérique
-                    # CONCEPT : Utilisation du module datetime pour la date actuelle
-                    date = datetime.now().strftime("%Y-%m-%d")
-                    nouveau['historique_achats'].append((date, int(montant)))
-                    print("✅ Achat ajouté!")
+            # CONCEPT : Transaction, le client et son premier achat forment une seule opération
+            # (une seule annulation avec l'option 12)
+            with transaction(clients):
+                nouveau = ajouter_client(clients, nom, ville, tel, tags_liste)
+                print(f"✅ Client ajouté avec ID: {nouveau['id']}")
+                
+                # CONCEPT : Ajout conditionnel d'éléments à une liste
+                # (variable nommée autrement que la fonction ajouter_achat, utilisée aussi par l'option 7)
+                achat_maintenant = input("Ajouter un achat maintenant? (o/n): ").strip().lower()
+                if achat_maintenant == 'o':
+                    montant = input("Montant de l'achat (FCFA): ").strip()
+                    if montant.isdigit():  # CONCEPT : Validation numérique
+                        # CONCEPT : Utilisation du module datetime pour la date actuelle
+                        date = datetime.now().strftime("%Y-%m-%d")
+                        ajouter_achat(clients, nouveau['id'], date, int(montant))
+                        print("✅ Achat ajouté!")
             
         elif choix == "3":
             print("\n--- RECHERCHE ---")
             print("1. Par nom")
             print("2. Par ville")
+            print("3. Par tags")
+            print("4. Par nom approché (sans accents, fautes tolérées)")
+            print("5. Par téléphone")
             sous_choix = input("Votre choix: ").strip()
             
             # CONCEPT : Structure conditionnelle pour sous-menu
@@ -292,15 +485,34 @@ def menu_interactif():
             elif sous_choix == "2":
                 ville = input("Ville à rechercher: ").strip()
                 resultats = rechercher_par_ville(clients, ville)
+            elif sous_choix == "3":
+                # CONCEPT : Opérations sur les ensembles (ET = intersection, OU = union, SAUF = différence)
+                print("Tags séparés par des virgules, laissez vide pour ignorer")
+                tous = [t for t in input("Tous ces tags (ET): ").split(",") if t.strip()]
+                un_de = [t for t in input("Au moins un de ces tags (OU): ").split(",") if t.strip()]
+                sauf = [t for t in input("Aucun de ces tags (SAUF): ").split(",") if t.strip()]
+                resultats = rechercher_par_tags(clients, tous, un_de, sauf)
+            elif sous_choix == "4":
+                nom = input("Nom à rechercher: ").strip()
+                resultats = rechercher_par_nom_approx(clients, nom, LIMITE_RECHERCHE_APPROX)
+            elif sous_choix == "5":
+                # CONCEPT : Dictionnaire numéro -> clients, accès direct sans parcourir la liste
+                client = rechercher_par_telephone(clients, input("Téléphone: ").strip())
+                resultats = [client] if client is not None else []
             else:
                 print("❌ Choix invalide")
                 continue
+            
+            # Rien d'exact : on propose les noms les plus proches
+            if not resultats and sous_choix == "1":
+                resultats = rechercher_par_nom_approx(clients, nom, LIMITE_RECHERCHE_APPROX)
+                if resultats:
+                    print("Aucun nom ne contient exactement cette recherche, noms approchants :")
                 
             # CONCEPT : Affichage conditionnel selon résultats
             if resultats:
                 print(f"\n{len(resultats)} client(s) trouvé(s):")
-                for client in resultats:
-                    afficher_un_client(client, details=True)
+                afficher_liste(resultats, clients, details=True)
             else:
                 print("Aucun client trouvé")
                 
@@ -314,25 +526,30 @@ def menu_interactif():
                 tries = trier_par_nom(clients)
                 titre = "Clients triés par nom"
             elif sous_choix == "2":
-                tries = trier_par_total_achat(clients)
-                titre = "Clients triés par dépenses"
+                limite = input(f"Nombre de clients à afficher (Entrée = {LIMITE_TOP_CLIENTS}, 0 = tous): ").strip()
+                limite = int(limite) if limite.isdigit() else LIMITE_TOP_CLIENTS
+                # CONCEPT : Tas (heapq) pour garder les k meilleurs sans trier toute la liste
+                if limite:
+                    tries = top_clients_par_depense(clients, limite)
+                    titre = f"Top {limite} des clients par dépenses"
+                else:
+                    tries = trier_par_total_achat(clients)
+                    titre = "Clients triés par dépenses"
             else:
                 print("❌ Choix invalide")
                 continue
                 
             print(f"\n{titre}:")
-            for client in tries:
-                afficher_un_client(client)
+            afficher_liste(tries, clients)
                 
         elif choix == "5":
             # CONCEPT : CRUD - Update avec interface utilisateur
-            afficher_tous(clients)
-            try:
-                # CONCEPT : Conversion de type avec gestion d'erreur
-                id_client = int(input("\nID du client à modifier: ").strip())
-            except ValueError:
-                print("❌ ID invalide")
+            # Pas de liste complète : on retrouve le client par son ID ou par une recherche
+            client_trouve = choisir_client(clients, "Client à modifier")
+            if not client_trouve:
                 continue
+            id_client = client_trouve["id"]
+            afficher_un_client(client_trouve, clients=clients)
                 
             print("Laissez vide pour ne pas modifier")
             nom = input("Nouveau nom: ").strip()
@@ -353,21 +570,21 @@ def menu_interactif():
             
             # CONCEPT : Appel de fonction avec déballage de dictionnaire (**kwargs)
             try:
-                modifier_client(clients, id_client, **params)
+                modifier_client(clients, id_client, unique=True, **params)
                 print("✅ Client modifié avec succès!")
             except KeyError:
                 print("❌ Erreur: Client non trouvé")
+            except TelephoneDejaUtilise as e:
+                print(f"❌ Erreur: {e}")
                 
         elif choix == "6":
             # CONCEPT : CRUD - Delete avec confirmation
-            afficher_tous(clients)
-            try:
-                id_client = int(input("\nID du client à supprimer: ").strip())
-            except ValueError:
-                print("❌ ID invalide")
+            client_trouve = choisir_client(clients, "Client à supprimer")
+            if not client_trouve:
                 continue
+            id_client = client_trouve["id"]
                 
-            confirmer = input(f"Êtes-vous sûr de supprimer le client {id_client}? (o/n): ").strip().lower()
+            confirmer = input(f"Êtes-vous sûr de supprimer le client {id_client} ({client_trouve['nom']})? (o/n): ").strip().lower()
             if confirmer == 'o':
                 try:
                     supprimer_client(clients, id_client)
@@ -379,23 +596,10 @@ def menu_interactif():
                 
         elif choix == "7":
             print("\n--- AJOUT D'UN ACHAT ---")
-            afficher_tous(clients)
-            try:
-                id_client = int(input("\nID du client: ").strip())
-            except ValueError:
-                print("❌ ID invalide")
-                continue
-                
-            # Recherche du client
-            client_trouve = None
-            for c in clients:
-                if c["id"] == id_client:
-                    client_trouve = c
-                    break
-                    
+            client_trouve = choisir_client(clients, "Client")
             if not client_trouve:
-                print("❌ Client non trouvé")
                 continue
+            id_client = client_trouve["id"]
                 
             print(f"Client: {client_trouve['nom']}")
             montant = input("Montant de l'achat (FCFA): ").strip()
@@ -409,25 +613,40 @@ def menu_interactif():
                 date_achat = datetime.now().strftime("%Y-%m-%d")
             else:
                 # Validation basique de la date
-                try:
-                    datetime.strptime(date_achat, "%Y-%m-%d")
-                except ValueError:
+                if not date_valide(date_achat):
                     print("❌ Format de date invalide (utilisez YYYY-MM-DD)")
                     continue
             
-            # CONCEPT : Ajout d'un tuple à une liste
-            client_trouve.setdefault("historique_achats", []).append((date_achat, int(montant)))
+            # CONCEPT : Ajout d'un tuple à une liste (le total du client est mis à jour au passage)
+            ajouter_achat(clients, id_client, date_achat, int(montant))
             print(f"✅ Achat de {montant} FCFA ajouté le {date_achat}")
             
         elif choix == "8":
             demo_automatique()
-            # CONCEPT : Rechargement des données après modifications externes
-            clients = charger_clients(DATA_FILE)
+            # CONCEPT : On reprend les changements de la démo sans perdre ceux de la session en cours
+            conflits = rafraichir_clients(clients, DATA_FILE)
+            afficher_conflits(conflits)
+            
+        elif choix == "10":
+            afficher_statistiques(clients)
+            
+        elif choix == "11":
+            afficher_diagnostics()
+            
+        elif choix == "12":
+            # CONCEPT : Pile d'opérations inverses (dernière faite = première défaite)
+            afficher_operations(annuler_operation(clients), "annulé", "Rien à annuler depuis la dernière sauvegarde")
+            
+        elif choix == "13":
+            afficher_operations(refaire_operation(clients), "refait", "Rien à refaire")
             
         elif choix == "9":
             # CONCEPT : Sauvegarde finale avant fermeture
+            # Mode journal : seuls les clients modifiés pendant la session sont écrits
             print("\nSauvegarde avant de quitter...")
-            sauvegarder_clients(clients, DATA_FILE)
+            # Les changements faits entre temps par un autre programme sur le même fichier sont conservés
+            conflits = sauvegarder_clients(clients, DATA_FILE, journal=True)
+            afficher_conflits(conflits)
             print(f"✅ Données sauvegardées dans {DATA_FILE}")
             print("Au revoir!")
             break  # CONCEPT : Sortie de boucle infinie
@@ -451,7 +670,9 @@ def main():
     print("="*60)
     
     # CONCEPT : Vérification du chargement initial des données
-    clients = charger_clients(DATA_FILE)
+    # Chargement paresseux : les historiques d'achats sont lus seulement quand on en a besoin,
+    # et la base chargée ici sert ensuite à la démo ou au menu (pas de deuxième lecture)
+    clients = charger_clients(DATA_FILE, paresseux=True)
     print(f"\n📊 Statut: {len(clients)} clients chargés depuis {DATA_FILE}")
     
     # Menu simple pour choisir le mode d'exécution
@@ -463,17 +684,17 @@ def main():
     choix = input("\nVotre choix (1-3): ").strip()
     
     if choix == "1":
-        demo_automatique()
+        clients = demo_automatique(clients)
         
         # CONCEPT : Option post-exécution pour inspection des données
         print("\nVoulez-vous voir les données sauvegardées?")
         voir = input("Afficher les données finales? (o/n): ").strip().lower()
         if voir == 'o':
-            clients = charger_clients(DATA_FILE)
+            # CONCEPT : La démo vient de sauvegarder cette même base, inutile de relire le fichier
             afficher_tous(clients)
             
     elif choix == "2":
-        menu_interactif()
+        menu_interactif(clients)
         
     elif choix == "3":
         print("\nAu revoir!")
@@ -497,6 +718,10 @@ def main():
 # Le bloc __name__ == "__main__" permet de définir ce qui s'exécute
 # quand le fichier est lancé directement (pas importé comme module)
 if __name__ == "__main__":
+    # Avec des arguments (python main.py importer fichier.csv ...) on passe en mode ligne de commande
+    if len(sys.argv) > 1:
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversion de la base clients d'un format de stockage a l'autre
+
+Exemples (depuis le dossier src) :
+    python migrer.py ../data/clients.json ../data/clients.db
+    python migrer.py ../data/clients.db ../data/clients.json
+"""
+
+import argparse
+
+from services import migrer_clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convertit les clients entre JSON et SQLite")
+    parser.add_argument("source", help="fichier a lire (.json, .db, .sqlite)")
+    parser.add_argument("destination", help="fichier a ecrire (.json, .db, .sqlite)")
+    parser.add_argument("--format-source", choices=["json", "sqlite"], help="format si l'extension ne suffit pas")
+    parser.add_argument("--format-destination", choices=["json", "sqlite"], help="format si l'extension ne suffit pas")
+    args = parser.parse_args()
+    nb = migrer_clients(args.source, args.destination, args.format_source, args.format_destination)
+    print(f"{nb} clients copiés de {args.source} vers {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Representation compacte d'un client pour les tres grosses bases
+"""
+
+import sys
+from array import array
+from datetime import date
+
+
+#Historique d'achats range dans deux tableaux paralleles de nombres (array) au lieu d'une liste de tuples :
+#un achat coute 4 + 8 octets au lieu d'un tuple, une chaine de date et un entier python (~150 octets)
+class HistoriqueAchats:
+    __slots__ = ("jours", "montants")
+
+    def __init__(self, achats=()):
+        self.jours = array("i") #date en nombre de jours (date.toordinal), "2026-02-01" => 739468
+        self.montants = array("q") #montant en FCFA, entier 64 bits
+        for date_achat, montant in achats:
+            self.ajouter(date_achat, montant)
+
+    def ajouter(self, date_achat, montant):
+        self.jours.append(date.fromisoformat(date_achat).toordinal())
+        self.montants.append(montant)
+
+    def __len__(self):
+        return len(self.jours)
+
+    def __iter__(self):
+        #On redonne la forme d'origine (date, montant) pour que le reste du code marche sans changement
+        for jour, montant in zip(self.jours, self.montants):
+            yield (date.fromordinal(jour).isoformat(), montant)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return list(self)[position]
+        return (date.fromordinal(self.jours[position]).isoformat(), self.montants[position])
+
+    #insert, del et sort comme sur la liste de tuples : services.py range les achats par date avec bisect
+    def insert(self, position, achat):
+        date_achat, montant = achat
+        self.jours.insert(position, date.fromisoformat(date_achat).toordinal())
+        self.montants.insert(position, montant)
+
+    def __delitem__(self, position):
+        del self.jours[position]
+        del self.montants[position]
+
+    def sort(self, key=None):
+        achats = sorted(self, key=key)
+        self.jours = array("i", (date.fromisoformat(date_achat).toordinal() for date_achat, _ in achats))
+        self.montants = array("q", (montant for _, montant in achats))
+
+    def total(self):
+        return sum(self.montants)
+
+    def vers_tuples(self):
+        return list(self)
+
+
+#Client avec __slots__ : pas de dictionnaire par objet. Les villes et tags reviennent tres souvent,
+#on les "interne" pour que tous les clients partagent la meme chaine en memoire.
+#c["nom"], c.get("tags"), setdefault et update marchent comme pour un dictionnaire : les fonctions de services.py
+#(recherche, tri, total, sauvegarde, mais aussi ajouter_achat, modifier_client, ClientStore et transaction)
+#acceptent donc aussi une liste de Client
+class Client:
+    __slots__ = ("id", "nom", "ville", "telephone", "tags", "historique_achats", "version", "cree")
+
+    def __init__(self, id, nom, ville, telephone, tags=(), historique_achats=(), version=1, cree=None):
+        self.id = id
+        self.nom = nom
+        self.ville = sys.intern(ville)
+        self.telephone = telephone
+        self.tags = tuple(sys.intern(t) for t in tags)
+        self.historique_achats = historique_achats if isinstance(historique_achats, HistoriqueAchats) else HistoriqueAchats(historique_achats)
+        self.version = version
+        self.cree = cree
+
+    def __getitem__(self, cle):
+        if cle not in Client.__slots__:
+            raise KeyError(cle)
+        return getattr(self, cle)
+
+    def __setitem__(self, cle, valeur):
+        if cle not in Client.__slots__:
+            raise KeyError(cle)
+        #Une valeur venue d'un dictionnaire (liste de tags, liste d'achats) reprend la forme compacte
+        if cle == "ville":
+            valeur = sys.intern(valeur)
+        elif cle == "tags":
+            valeur = tuple(sys.intern(t) for t in valeur)
+        elif cle == "historique_achats" and not isinstance(valeur, HistoriqueAchats):
+            valeur = HistoriqueAchats(valeur)
+        setattr(self, cle, valeur)
+
+    def __contains__(self, cle):
+        return cle in Client.__slots__
+
+    def get(self, cle, defaut=None):
+        try:
+            return self[cle]
+        except KeyError:
+            return defaut
+
+    def setdefault(self, cle, defaut=None):
+        #Tous les champs existent toujours : on renvoie la valeur actuelle
+        return self[cle]
+
+    def keys(self):
+        return Client.__slots__
+
+    def items(self):
+        return [(cle, getattr(self, cle)) for cle in Client.__slots__]
+
+    def update(self, valeurs=(), **autres):
+        for cle, valeur in dict(valeurs, **autres).items():
+            self[cle] = valeur
+
+    def __repr__(self):
+        return f"Client({self.vers_dict()!r})"
+
+    @classmethod
+    def depuis_dict(cls, c):
+        return cls(c["id"], c["nom"], c["ville"], c["telephone"], c.get("tags", []), c.get("historique_achats", []), c.get("version", 1), c.get("cree"))
+
+    def vers_dict(self):
+        #Meme forme que les clients de charger_clients
+        c = {
+            "id" : self.id,
+            "nom" : self.nom,
+            "ville" : self.ville,
+            "telephone" : self.telephone,
+            "tags" : list(self.tags),
+            "historique_achats" : self.historique_achats.vers_tuples(),
+            "version" : self.version
+            }
+        if self.cree is not None:
+            c["cree"] = self.cree
+        return c
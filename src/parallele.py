@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Validation, totaux et recherche repartis sur plusieurs processus pour les tres grosses bases
+
+La liste est decoupee en blocs consecutifs, chaque bloc est traite par un processus du pool et les
+resultats sont recolles dans l'ordre des blocs : on obtient exactement le resultat des fonctions
+sequentielles de services.py. Seules les donnees utiles sont envoyees aux processus (pas les clients entiers).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from services import valider_client
+
+#En dessous de ce nombre de clients, lancer des processus coute plus cher que le calcul lui meme
+SEUIL_PARALLELE = 20000
+TAILLE_BLOC = 5000
+
+
+#Fonctions executees dans les processus : elles doivent etre definies au niveau du module
+def _valider_bloc(bloc):
+    return [(c["id"], erreurs) for c in bloc for erreurs in [valider_client(c)] if erreurs]
+
+
+def _totaux_bloc(montants):
+    return [sum(m) for m in montants]
+
+
+def _rechercher_bloc(args):
+    requete, valeurs = args
+    return [i for i, valeur in enumerate(valeurs) if requete in valeur.lower()]
+
+
+def _blocs(elements, taille):
+    return [elements[i:i + taille] for i in range(0, len(elements), taille)]
+
+
+def _executer(fonction, blocs, nb_elements, workers):
+    #Resultats dans l'ordre des blocs (map garde l'ordre), en parallele seulement si ca vaut le coup
+    workers = workers or os.cpu_count()
+    if workers == 1 or nb_elements < SEUIL_PARALLELE:
+        return [fonction(b) for b in blocs]
+    with ProcessPoolExecutor(max_workers=workers) as executeur:
+        return list(executeur.map(fonction, blocs))
+
+
+def valider_parallele(clients, workers=None, taille_bloc=TAILLE_BLOC):
+    #[(id, [erreurs])] pour les clients invalides, dans l'ordre de la liste
+    bloc_clients = [{"id" : c["id"], "telephone" : c["telephone"], "historique_achats" : c.get("historique_achats", [])} for c in clients]
+    resultats = _executer(_valider_bloc, _blocs(bloc_clients, taille_bloc), len(bloc_clients), workers)
+    return [ligne for bloc in resultats for ligne in bloc]
+
+
+def totaux_paralleles(clients, workers=None, taille_bloc=TAILLE_BLOC):
+    #{id: total des achats} comme total_depense_client, plus le total general.
+    #Les processus ne recoivent que les montants : les dates ne servent pas a la somme
+    clients = list(clients)
+    montants = [[m for _, m in c.get("historique_achats", [])] for c in clients]
+    resultats = _executer(_totaux_bloc, _blocs(montants, taille_bloc), len(montants), workers)
+    totaux = dict(zip((c["id"] for c in clients), (t for bloc in resultats for t in bloc)))
+    return totaux, sum(totaux.values())
+
+
+def _rechercher(clients, champ, requete, workers, taille_bloc):
+    clients = list(clients)
+    requete = requete.strip().lower()
+    blocs = _blocs([c[champ] for c in clients], taille_bloc) #Seulement le champ cherche, pas les clients
+    resultats = _executer(_rechercher_bloc, [(requete, b) for b in blocs], len(clients), workers)
+    #Les processus renvoient des positions : on rend les clients d'origine, pas des copies
+    return [clients[n * taille_bloc + i] for n, positions in enumerate(resultats) for i in positions]
+
+
+def rechercher_par_nom_parallele(clients, nomRechercher, workers=None, taille_bloc=TAILLE_BLOC):
+    return _rechercher(clients, "nom", nomRechercher, workers, taille_bloc)
+
+
+def rechercher_par_ville_parallele(clients, villeRechercher, workers=None, taille_bloc=TAILLE_BLOC):
+    return _rechercher(clients, "ville", villeRechercher, workers, taille_bloc)
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Petit serveur HTTP/JSON (asyncio, bibliotheque standard uniquement) pour partager la base entre plusieurs guichets
+
+La base est chargee une seule fois en memoire (ClientStore). Les lectures (liste, recherche, tri) sont servies
+directement depuis la boucle asyncio ; toutes les ecritures passent par une file unique videe par une seule
+tache "ecrivain", qui les applique une par une puis sauvegarde en mode journal quand plus rien n'arrive
+pendant DELAI_SAUVEGARDE secondes (ou tous les TAILLE_MAX_LOT changements) : une seule ecriture disque
+pour une rafale de modifications. L'ecriture du fichier se fait dans un thread, les lectures continuent d'etre
+servies pendant ce temps ; une sauvegarde qui echoue (disque plein, verrou) est signalee puis retentee.
+
+    GET    /clients?limite=50&debut=0     liste
+    GET    /clients/3                     un client
+    POST   /clients                       {"nom", "ville", "telephone", "tags", "unique"?}
+    PATCH  /clients/3                     {"nom"?, "ville"?, "telephone"?, "tags"?, "version"?, "unique"?}
+    DELETE /clients/3?version=4
+    POST   /clients/3/achats              {"date"?, "montant"}
+    GET    /recherche?nom=mba | ?ville=dou | ?telephone=677123456 | ?tags=vip&un_de=a,b&sauf=c
+    GET    /recherche?nom=mbrga&approx=1&limite=10   recherche approchee (accents et fautes toleres)
+    GET    /tri?critere=nom|depenses&limite=10
+    GET    /doublons                      numeros de telephone partages par plusieurs clients
+
+"version" (facultatif) est le numero lu avec le client : si quelqu'un l'a modifie depuis, la reponse est 409.
+"unique": true refuse (409) un numero de telephone deja utilise par un autre client.
+
+Lancement (depuis le dossier src) : python main.py serveur --port 8080
+"""
+
+import json
+import asyncio
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+
+from services import (
+    charger_clients, sauvegarder_clients, rafraichir_clients, ajouter_client, modifier_client,
+    supprimer_client, ajouter_achat, trouver_client, rechercher_par_nom, ConflitVersion, TelephoneDejaUtilise, ClientRenumerote,
+    rechercher_par_ville, rechercher_par_tags, trier_par_nom, rechercher_par_nom_approx, rechercher_par_ville_approx,
+    trier_par_total_achat, top_clients_par_depense, rechercher_par_telephone, doublons_telephone,
+    telephone_valide, date_valide
+)
+from stockage import client_vers_json
+
+DELAI_SAUVEGARDE = 1.0 #secondes sans nouvelle ecriture avant de sauvegarder
+TAILLE_MAX_LOT = 500 #on sauvegarde quand meme apres ce nombre d'ecritures, meme si elles continuent d'arriver
+TAILLE_MAX_CORPS = 1024 * 1024
+
+MESSAGES = {200 : "OK", 201 : "Created", 400 : "Bad Request", 404 : "Not Found",
+            405 : "Method Not Allowed", 409 : "Conflict", 413 : "Payload Too Large", 500 : "Internal Server Error"}
+
+
+class ErreurHTTP(Exception):
+
+    def __init__(self, statut, message):
+        super().__init__(message)
+        self.statut = statut
+        self.message = message
+
+
+def _liste_tags(valeur):
+    if isinstance(valeur, list):
+        return [str(t).strip() for t in valeur if str(t).strip()]
+    return [t.strip() for t in (valeur or "").split(",") if t.strip()]
+
+
+def _texte(donnees, nom):
+    #Champ texte facultatif du corps JSON : None s'il est absent, 400 s'il n'est pas une chaine
+    valeur = donnees.get(nom)
+    if valeur is not None and not isinstance(valeur, str):
+        raise ErreurHTTP(400, f"{nom} doit etre une chaine de caracteres")
+    return valeur
+
+
+def _tags(donnees):
+    valeur = donnees.get("tags")
+    if valeur is not None and not isinstance(valeur, (str, list)):
+        raise ErreurHTTP(400, "tags doit etre une liste ou une chaine separee par des virgules")
+    return valeur
+
+
+def _entier(valeur, nom):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ErreurHTTP(400, f"{nom} doit etre un entier")
+
+
+class ServeurClients:
+
+    def __init__(self, path, format=None):
+        self.path = path
+        self.format = format
+        self.clients = charger_clients(path, format)
+        self._file = None #File des ecritures (creee dans la boucle asyncio)
+        self._ecrivain = None
+        self._serveur = None
+        self.nb_sauvegardes = 0
+
+    #--- cycle de vie ---
+
+    async def demarrer(self, hote="127.0.0.1", port=8080):
+        self._file = asyncio.Queue()
+        self._ecrivain = asyncio.create_task(self._boucle_ecrivain())
+        self._serveur = await asyncio.start_server(self._connexion, hote, port)
+        return self._serveur.sockets[0].getsockname()[1] #port reel (utile avec port=0 pour les essais)
+
+    async def arreter(self):
+        #On ferme l'ecoute, puis l'ecrivain termine la file et fait sa derniere sauvegarde
+        self._serveur.close()
+        await self._serveur.wait_closed()
+        await self._file.put(None)
+        await self._ecrivain
+
+    async def servir(self, hote="127.0.0.1", port=8080):
+        port = await self.demarrer(hote, port)
+        print(f"Serveur en écoute sur http://{hote}:{port} ({len(self.clients)} clients)")
+        try:
+            await self._serveur.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.arreter()
+
+    #--- ecritures : une seule tache les applique et sauvegarde par lots ---
+
+    async def ecrire(self, operation):
+        #Envoie l'operation a l'ecrivain et attend son resultat (ou son exception)
+        futur = asyncio.get_running_loop().create_future()
+        await self._file.put((operation, futur))
+        return await futur
+
+    async def _boucle_ecrivain(self):
+        en_attente = 0 #ecritures appliquees mais pas encore sauvegardees
+        while True:
+            if en_attente:
+                #Des changements non sauvegardes : on attend la suite au plus DELAI_SAUVEGARDE secondes
+                try:
+                    element = await asyncio.wait_for(self._file.get(), DELAI_SAUVEGARDE)
+                except asyncio.TimeoutError:
+                    if await self._sauvegarder():
+                        en_attente = 0
+                    continue #Sinon le lot reste en attente et on reessaie apres DELAI_SAUVEGARDE
+            else:
+                element = await self._file.get()
+            if element is None: #Arret demande
+                if en_attente:
+                    await self._sauvegarder()
+                return
+            operation, futur = element
+            try:
+                resultat = operation(self.clients)
+            except Exception as e:
+                futur.set_exception(e)
+                continue
+            futur.set_result(resultat)
+            en_attente += 1
+            if en_attente >= TAILLE_MAX_LOT and await self._sauvegarder():
+                en_attente = 0
+
+    async def _sauvegarder(self):
+        #Renvoie False si la sauvegarde a echoue : les changements restent en attente pour la suivante.
+        #Si un autre programme a ecrit dans le fichier, on reprend ses changements dans le store depuis la boucle
+        #(jamais pendant qu'on sert une lecture) ; l'ecriture elle-meme ne touche pas au store et part dans un
+        #thread. L'ecrivain attend sa fin, aucune ecriture n'est donc appliquee pendant ce temps
+        boucle = asyncio.get_running_loop()
+        try:
+            conflits = []
+            while True:
+                conflits += rafraichir_clients(self.clients, self.path, self.format)
+                resultat = await boucle.run_in_executor(
+                    None, lambda: sauvegarder_clients(self.clients, self.path, True, self.format, fusionner=False))
+                if resultat is not None: #None : le fichier a encore change entre temps, on recommence
+                    break
+        except Exception as e:
+            print(f"Echec de la sauvegarde ({type(e).__name__}: {e}), nouvel essai dans {DELAI_SAUVEGARDE} s")
+            return False
+        for renumerote in (c for c in conflits if isinstance(c, ClientRenumerote)):
+            print(f"ID {renumerote.ancien_id} pris par un autre programme : client enregistre sous l'ID {renumerote.nouvel_id}")
+        abandonnes = [c for c in conflits if not isinstance(c, ClientRenumerote)]
+        if abandonnes:
+            print(f"Conflits a la sauvegarde, version du fichier gardee pour les clients {abandonnes}")
+        self.nb_sauvegardes += 1
+        return True
+
+    #--- HTTP ---
+
+    async def _connexion(self, lecteur, ecrivain):
+        try:
+            while True:
+                requete = await self._lire_requete(lecteur)
+                if requete is None:
+                    break
+                methode, cible, entetes, corps = requete
+                try:
+                    statut, reponse = await self._router(methode, cible, corps)
+                except ErreurHTTP as e:
+                    statut, reponse = e.statut, {"erreur" : e.message}
+                except ConflitVersion as e:
+                    statut, reponse = 409, {"erreur" : str(e), "version" : e.actuelle}
+                except TelephoneDejaUtilise as e:
+                    statut, reponse = 409, {"erreur" : str(e), "client_id" : e.client_id}
+                except KeyError:
+                    statut, reponse = 404, {"erreur" : "Client non trouvé"}
+                except Exception as e:
+                    statut, reponse = 500, {"erreur" : str(e)}
+                garder = entetes.get("connection", "").lower() != "close"
+                self._envoyer(ecrivain, statut, reponse, garder)
+                await ecrivain.drain()
+                if not garder:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ErreurHTTP as e:
+            self._envoyer(ecrivain, e.statut, {"erreur" : e.message}, False)
+        finally:
+            ecrivain.close()
+
+    @staticmethod
+    async def _lire_requete(lecteur):
+        ligne = await lecteur.readline()
+        if not ligne.strip():
+            return None
+        try:
+            methode, cible, _ = ligne.decode("latin-1").split()
+        except ValueError:
+            raise ErreurHTTP(400, "Requete mal formee")
+        entetes = {}
+        while True:
+            ligne = await lecteur.readline()
+            if ligne in (b"\r\n", b"\n", b""):
+                break
+            cle, _, valeur = ligne.decode("latin-1").partition(":")
+            entetes[cle.strip().lower()] = valeur.strip()
+        taille = _entier(entetes.get("content-length", 0), "Content-Length")
+        if taille > TAILLE_MAX_CORPS:
+            raise ErreurHTTP(413, "Corps de requete trop gros")
+        corps = await lecteur.readexactly(taille) if taille else b""
+        return methode.upper(), cible, entetes, corps
+
+    @staticmethod
+    def _envoyer(ecrivain, statut, reponse, garder):
+        donnees = json.dumps(reponse, ensure_ascii=False).encode("utf-8")
+        entetes = (f"HTTP/1.1 {statut} {MESSAGES.get(statut, '')}\r\n"
+                   "Content-Type: application/json; charset=utf-8\r\n"
+                   f"Content-Length: {len(donnees)}\r\n"
+                   f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n")
+        ecrivain.write(entetes.encode("latin-1") + donnees)
+
+    def _json(self, client):
+        ligne = client_vers_json(client)
+        ligne["total_depense"] = self.clients.total(client["id"])
+        return ligne
+
+    async def _router(self, methode, cible, corps):
+        url = urlsplit(cible)
+        morceaux = [m for m in url.path.split("/") if m]
+        params = {cle : valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+        donnees = {}
+        if corps:
+            try:
+                donnees = json.loads(corps)
+            except json.JSONDecodeError:
+                raise ErreurHTTP(400, "Corps JSON invalide")
+            if not isinstance(donnees, dict):
+                raise ErreurHTTP(400, "Un objet JSON est attendu")
+
+        if morceaux == ["clients"]:
+            if methode == "GET":
+                debut = _entier(params.get("debut", 0), "debut")
+                limite = _entier(params.get("limite", 100), "limite")
+                return 200, {"total" : len(self.clients),
+                             "clients" : [self._json(c) for c in self.clients[debut:debut + limite]]}
+            if methode == "POST":
+                return 201, await self._ajouter(donnees)
+        elif len(morceaux) >= 2 and morceaux[0] == "clients":
+            client_id = _entier(morceaux[1], "id")
+            if len(morceaux) == 2:
+                if methode == "GET":
+                    client = trouver_client(self.clients, client_id)
+                    if client is None:
+                        raise KeyError(client_id)
+                    return 200, self._json(client)
+                if methode in ("PATCH", "PUT"):
+                    return 200, await self._modifier(client_id, donnees)
+                if methode == "DELETE":
+                    version = _entier(params["version"], "version") if "version" in params else None
+                    await self.ecrire(lambda clients: supprimer_client(clients, client_id, version))
+                    return 200, {"supprime" : client_id}
+            elif morceaux[2:] == ["achats"] and methode == "POST":
+                return 201, await self._achat(client_id, donnees)
+        elif morceaux == ["recherche"] and methode == "GET":
+            approx = params.get("approx", "") not in ("", "0")
+            limite = _entier(params.get("limite", 10), "limite")
+            if "nom" in params:
+                resultats = (rechercher_par_nom_approx(self.clients, params["nom"], limite) if approx
+                             else rechercher_par_nom(self.clients, params["nom"]))
+            elif "telephone" in params:
+                client = rechercher_par_telephone(self.clients, params["telephone"])
+                resultats = [client] if client is not None else []
+            elif "ville" in params:
+                resultats = (rechercher_par_ville_approx(self.clients, params["ville"], limite) if approx
+                             else rechercher_par_ville(self.clients, params["ville"]))
+            elif params.keys() & {"tags", "un_de", "sauf"}:
+                resultats = rechercher_par_tags(self.clients, _liste_tags(params.get("tags")),
+                                                _liste_tags(params.get("un_de")), _liste_tags(params.get("sauf")))
+            else:
+                raise ErreurHTTP(400, "Parametre nom, ville, telephone ou tags attendu")
+            return 200, {"clients" : [self._json(c) for c in resultats]}
+        elif morceaux == ["tri"] and methode == "GET":
+            critere = params.get("critere", "nom")
+            limite = _entier(params["limite"], "limite") if "limite" in params else None
+            if critere == "nom":
+                tries = trier_par_nom(self.clients)[:limite]
+            elif critere == "depenses":
+                tries = top_clients_par_depense(self.clients, limite) if limite else trier_par_total_achat(self.clients)
+            else:
+                raise ErreurHTTP(400, "critere doit valoir nom ou depenses")
+            return 200, {"clients" : [self._json(c) for c in tries]}
+        elif morceaux == ["doublons"] and methode == "GET":
+            return 200, {numero : [c["id"] for c in clients] for numero, clients in doublons_telephone(self.clients).items()}
+        else:
+            raise ErreurHTTP(404, "Ressource inconnue")
+        raise ErreurHTTP(405, "Methode non autorisee")
+
+    #La validation se fait avant de passer la main a l'ecrivain : une requete invalide ne touche pas la file
+
+    async def _ajouter(self, donnees):
+        nom = (_texte(donnees, "nom") or "").strip()
+        ville = (_texte(donnees, "ville") or "").strip()
+        telephone = (_texte(donnees, "telephone") or "").strip()
+        if not nom or not ville:
+            raise ErreurHTTP(400, "nom et ville sont obligatoires")
+        if not telephone_valide(telephone):
+            raise ErreurHTTP(400, "Numéro de téléphone invalide")
+        tags = _liste_tags(_tags(donnees))
+        unique = bool(donnees.get("unique"))
+        client = await self.ecrire(lambda clients: ajouter_client(clients, nom, ville, telephone, tags, unique))
+        return self._json(client)
+
+    async def _modifier(self, client_id, donnees):
+        nom, ville, telephone = _texte(donnees, "nom"), _texte(donnees, "ville"), _texte(donnees, "telephone")
+        if telephone is not None and not telephone_valide(telephone):
+            raise ErreurHTTP(400, "Numéro de téléphone invalide")
+        tags = _liste_tags(_tags(donnees)) if donnees.get("tags") is not None else None
+        version = _entier(donnees["version"], "version") if donnees.get("version") is not None else None
+        unique = bool(donnees.get("unique"))
+        client = await self.ecrire(lambda clients: modifier_client(
+            clients, client_id, nom, ville, telephone, tags, version, unique))
+        return self._json(client)
+
+    async def _achat(self, client_id, donnees):
+        date_achat = _texte(donnees, "date") or datetime.now().strftime("%Y-%m-%d")
+        montant = donnees.get("montant")
+        if not date_valide(date_achat):
+            raise ErreurHTTP(400, "Format de date invalide (utilisez YYYY-MM-DD)")
+        if not isinstance(montant, int) or isinstance(montant, bool) or montant < 0:
+            raise ErreurHTTP(400, "montant doit etre un entier positif")
+        client = await self.ecrire(lambda clients: ajouter_achat(clients, client_id, date_achat, montant))
+        return self._json(client)
+
+
+def lancer_serveur(path, hote="127.0.0.1", port=8080, format=None):
+    serveur = ServeurClients(path, format)
+    try:
+        asyncio.run(serveur.servir(hote, port))
+    except KeyboardInterrupt:
+        pass
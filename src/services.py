@@ -7,130 +7,995 @@ Created on Tue Feb  3 12:46:26 2026
 """
 
 import os #Ce module permet d'interagir avec le systeme
-import json
+import copy
+import heapq
+import math
+import bisect
+from datetime import datetime, date, timedelta
+from contextlib import contextmanager
+
+from diagnostics import instrumente
+from indexation import (
+    IndexTrigrammes, IndexTags, IndexDates, IndexTelephones, normaliser_texte, normaliser_telephone,
+    jour, distance_dans, distance_max
+)
+from modeles import Client, HistoriqueAchats
+from stockage import choisir_stockage, client_vers_json, iter_clients, verrou
+
+
+#Nombre d'etapes gardees pour annuler (menu : annuler / refaire)
+LIMITE_ANNULATIONS = 100
+
+
+#Le client a ete modifie (ou supprime) par quelqu'un d'autre depuis qu'on l'a lu
+class ConflitVersion(ValueError):
+
+    def __init__(self, client_id, attendue, actuelle):
+        super().__init__(f"Client {client_id} modifie entre temps (version {actuelle}, {attendue} attendue)")
+        self.client_id = client_id
+        self.attendue = attendue
+        self.actuelle = actuelle
+
+
+#Le numero de telephone appartient deja a un autre client (seulement si on demande unique=True)
+class TelephoneDejaUtilise(ValueError):
+
+    def __init__(self, telephone, client_id):
+        super().__init__(f"Le numero {telephone} est deja utilise par le client {client_id}")
+        self.telephone = telephone
+        self.client_id = client_id
+
+#Element de la liste renvoyee par sauvegarder_clients et rafraichir_clients pour un client que nous avions ajoute
+#et dont l'id a ete pris entre temps par un autre programme : il est enregistre sous un nouvel id
+class ClientRenumerote:
+
+    def __init__(self, ancien_id, nouvel_id):
+        self.ancien_id = ancien_id
+        self.nouvel_id = nouvel_id
+
+    def __eq__(self, autre):
+        return (isinstance(autre, ClientRenumerote)
+                and (self.ancien_id, self.nouvel_id) == (autre.ancien_id, autre.nouvel_id))
+
+    def __repr__(self):
+        return f"ClientRenumerote({self.ancien_id}, {self.nouvel_id})"
+
+    def __str__(self):
+        return f"{self.ancien_id} -> {self.nouvel_id}"
+
 
 #Importer les donnees en JSON 
 #Cette fonction permet de recuperer les donnees clients depuis le fichier json pour vers python au demarrage du programme ceci permet aussi de retrouver les clients ajouter apres avoir fermer le programme
-def charger_clients(path):
-    #On verifie si le chemin n'existe pas si c'est le cas on renvoie une liste vide
-    if not os.path.exists(path):
-        return []
-    try:
-        with open(path,"r", encoding="utf-8") as f:
-            data = json.load(f)#On lit data/clients.json, data ici est la liste de clients
-            
-            #Or avec json on ne peut avoir que des listes et non des tuples, il convient de transforme cela
-            #pour avoir [date, montant] => (date, montant)
-            for c in data:
-                hist = c.get("historique_achats", []) #[] permet de recuperer un historique vide ceci permet de ne pas casser la conversion avec le  None
-                c["historique_achats"] = [ tuple(item) for item in hist ] 
-            return data
-    #Si le fichier client.json est vide ou malforme , le programme consider qu'il est vide
-    except json.JSONDecodeError:
-            return []
+#Le format (JSON ou SQLite) est deduit de l'extension du fichier (.json, .db, .sqlite) ou donne par format=
+#paresseux=True : seuls les en-tetes des clients (tout sauf l'historique, plus le total des achats) sont lus ;
+#l'historique d'un client est lu a la demande, quand on l'affiche en detail ou qu'on le modifie
+@instrumente
+def charger_clients(path, format=None, paresseux=False):
+    #On lit data/clients.json, data ici est la liste de clients (liste vide si aucun fichier n'existe encore).
+    #Les historiques sont deja convertis en tuples pendant la lecture (json ne connait que les listes)
+    stockage = choisir_stockage(path, format)
+    with verrou(path, exclusif=False): #Un autre programme ne peut pas sauvegarder pendant qu'on lit
+        signature = stockage.signature(path)
+        data = stockage.lire_entetes(path) if paresseux else None
+        if data is None: #Pas d'en-tetes a jour (ancien fichier) : on lit tout
+            data = stockage.lire(path)
+        prochain_id = stockage.prochain_id(path)
+    #On range les clients dans un ClientStore pour avoir l'acces par id en O(1)
+    clients = ClientStore(data)
+    clients._prochain_id = max(clients._prochain_id, prochain_id) #Les ids des clients supprimes restent pris
+    clients._source = os.path.abspath(path)
+    clients._signature = signature
+    return clients
  
         
 #Exporter les donnees
 #Cette fonction permet d'ecrire ce qu'on a modifie en memoire dans le fichier JSON c'est a dire de client(en memoire) => JSON(sur disque)
-def sauvegarder_clients(clients, path):
-    #On cree le dossier client s'il n'existe pas
-    dossier = os.path.dirname(path)
-    #On evite les potentiels conflits si le dossiers existe deja
-    if dossier:
-        os.makedirs(dossier, exist_ok=True)
-        
-    #Etand donnee que json ne lit pas les tuples , il faut qu'on cree une version compatible pour pouvoir sauvergarder
-    serializable = []
-    for c in clients:
-        hist = c.get("historique_achats", [])
-        #On convertir les tuples en liste pour les rendre compatibles avec JSON
-        hist_json = [list(item) for item in hist]
-        serializable.append({
-            "id" : c["id"],
-            "nom" : c["nom"],
-            "ville" : c["ville"],
-            "telephone" : c["telephone"],
-            "tags" : c.get("tags", []),
-            "historique_achats" : hist_json
-            })
-    #On ecris dans le fichier en format lisible
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(serializable, f, ensure_ascii=False, indent=2)
-        
+#Pour un ClientStore charge depuis ce fichier, seuls les clients modifies depuis la derniere sauvegarde sont ecrits
+#quand le format le permet : lignes ajoutees au journal (JSON avec journal=True) ou mises a jour ligne par ligne (SQLite)
+#Si un autre programme a sauvegarde dans le meme fichier entre temps, ses changements sont d'abord repris
+#(voir _fusionner_disque) : personne n'ecrase le travail de l'autre. Renvoie les ids des clients dont
+#notre modification a ete abandonnee parce que l'autre programme avait modifie le meme client avant nous,
+#et un ClientRenumerote pour chaque client ajoute qui a du changer d'id.
+#fusionner=False : la sauvegarde ne modifie jamais les clients en memoire (elle peut alors tourner dans un autre
+#thread) ; si le fichier a change depuis notre lecture, rien n'est ecrit et on renvoie None : l'appelant reprend
+#les changements avec rafraichir_clients puis recommence
+@instrumente
+def sauvegarder_clients(clients, path, journal=False, format=None, fusionner=True):
+    stockage = choisir_stockage(path, format)
+    est_store = isinstance(clients, ClientStore)
+    conflits = []
+    with verrou(path): #Une seule sauvegarde a la fois, et personne ne lit un etat a moitie ecrit
+        if est_store and clients._source == os.path.abspath(path):
+            if stockage.signature(path) != clients._signature:
+                if not fusionner:
+                    return None
+                conflits = _fusionner_disque(clients, stockage, path)
+            if stockage.ecrire_operations(list(clients._operations_en_attente()), path, journal):
+                clients._marquer_sauvegarde(path, stockage.signature(path))
+                return conflits
+        charger_historiques(clients) #Reecriture complete : tous les historiques sont lus d'un seul parcours
+        stockage.ecrire(clients, path)
+        if est_store:
+            clients._marquer_sauvegarde(path, stockage.signature(path))
+    return conflits
 
-def total_depense_client(client) : 
+
+#Reprend dans le ClientStore ce que d'autres programmes ont sauvegarde depuis notre lecture, sans perdre
+#nos modifications pas encore sauvegardees (par exemple apres la demo lancee depuis le menu)
+@instrumente
+def rafraichir_clients(clients, path, format=None):
+    stockage = choisir_stockage(path, format)
+    with verrou(path, exclusif=False):
+        signature = stockage.signature(path)
+        if signature == clients._signature:
+            return []
+        conflits = _fusionner_disque(clients, stockage, path)
+    clients._signature = signature
+    return conflits
+
+
+#Fusion entre l'etat du fichier et nos changements en attente. Chaque client porte un numero de version,
+#augmente a chaque modification ; on compare la version du fichier a celle sur laquelle on a travaille :
+# - meme version : personne d'autre n'y a touche, notre changement s'applique tel quel
+# - nouveaux achats seulement : on les ajoute a la version du fichier (deux guichets peuvent encaisser le meme client)
+# - sinon (nom, ville, tags modifies ou client supprime des deux cotes) : la version du fichier gagne, conflit signale
+#Un nouveau client dont l'id a ete donne ailleurs entre temps (meme a un client supprime depuis) recoit un autre id
+#(ClientRenumerote dans la liste)
+def _fusionner_disque(clients, stockage, path):
+    #Nos etapes d'annulation ne savent pas defaire les changements des autres : on les oublie
+    clients._oublier_etapes()
+    disque = {c["id"] : c for c in stockage.iterer(path)}
+    #Ids deja donnes par le fichier, y compris ceux de clients supprimes depuis
+    prochain_disque = max(stockage.prochain_id(path), max(disque, default=0) + 1)
+    clients._prochain_id = max(clients._prochain_id, prochain_disque)
+    conflits = []
+    for client_id, op in list(clients._en_attente.items()):
+        sur_disque = disque.get(client_id)
+        if op == "ajout":
+            if client_id < prochain_disque:
+                c = clients._oublier(client_id)
+                del clients._en_attente[client_id]
+                clients._achats_en_attente.pop(client_id, None)
+                c["id"] = clients._prochain_id
+                clients.append(c)
+                conflits.append(ClientRenumerote(client_id, c["id"]))
+            continue
+        base = clients._base.get(client_id)
+        version = None if sur_disque is None else sur_disque.get("version", 1)
+        if version == base or (op == "suppr" and sur_disque is None):
+            continue
+        if op == "achat" and sur_disque is not None:
+            for date_achat, montant in clients._achats_en_attente.get(client_id, []):
+                _inserer_achat(sur_disque, date_achat, montant)
+            clients._remplacer(sur_disque)
+            clients._en_attente[client_id] = "achat"
+            clients._base[client_id] = version
+            continue
+        conflits.append(client_id)
+        del clients._en_attente[client_id]
+        clients._achats_en_attente.pop(client_id, None)
+        if sur_disque is not None:
+            clients._remplacer(sur_disque)
+        elif client_id in clients._par_id:
+            clients._oublier(client_id)
+    #Clients que nous n'avons pas touches : on prend simplement l'etat du fichier
+    for client_id in [i for i in clients._par_id if i not in disque and i not in clients._en_attente]:
+        clients._oublier(client_id)
+    for client_id, c in disque.items():
+        local = clients.get(client_id)
+        if client_id not in clients._en_attente and (local is None or local.get("version", 1) != c.get("version", 1)):
+            clients._remplacer(c)
+    return conflits
+
+
+#Chargement en representation compacte (modeles.Client) : les clients sont convertis au fil de la lecture,
+#sans jamais construire toute la liste de dictionnaires. sauvegarder_clients accepte directement cette liste
+@instrumente
+def charger_clients_compacts(path, format=None):
+    return [Client.depuis_dict(c) for c in iter_clients(path, format)]
+
+
+#Replie le journal dans un nouvel instantane (aussi fait automatiquement par sauvegarder_clients)
+@instrumente
+def compacter_journal(path):
+    sauvegarder_clients(charger_clients(path), path)
+
+
+#Conversion d'un format a l'autre, par exemple data/clients.json -> data/clients.db et inversement
+@instrumente
+def migrer_clients(source, destination, format_source=None, format_destination=None):
+    clients = charger_clients(source, format_source)
+    sauvegarder_clients(clients, destination, format=format_destination)
+    return len(clients)
+
+
+#Si on passe aussi le ClientStore, on lit le total tenu a jour par le store au lieu de re-sommer l'historique
+def total_depense_client(client, clients=None) : 
+        if isinstance(clients, ClientStore):
+            return clients.total(client["id"])
+        hist = client.get("historique_achats", []) #client.get(["historique_achats"], []) recupere la valeur associe a la cle historique_achats si la cle n'existe pas renvoie une liste vide
+        if isinstance(hist, HistoriqueAchats):
+            return hist.total() #Historique compact : somme directe du tableau des montants
         total = 0
-        for date, montant in client.get("historique_achats", []): #client.get(["historique_achats"], []) recupere la valeur associe a la cle historique_achats si la cle n'existe pas renvoie une liste vide
+        for date_achat, montant in hist:
             total += montant
         return total
     
     
-def ajouter_client(clients, nom, ville, telephone, tags):
-    #On calcule le nouvel id
-    if len(clients) == 0:
-        new_id = 1
-    else:
-        new_id = max(c["id"] for c in clients) + 1
-    #On cree le dictionnaire client
-    client = {
+#Numero camerounais : 9 chiffres commencant par 2, 3, 6 ou 7 (meme regle que le menu interactif)
+def telephone_valide(tel):
+    return tel.isdigit() and len(tel) == 9 and tel[0] in "2367"
+
+
+def date_valide(date_achat):
+    try:
+        datetime.strptime(date_achat, "%Y-%m-%d")
+    except ValueError:
+        return False
+    return True
+
+
+#Liste des problemes d'un client (vide si tout est correct) : telephone, dates et montants des achats
+def valider_client(client):
+    erreurs = []
+    if not telephone_valide(client["telephone"]):
+        erreurs.append(f"telephone invalide : {client['telephone']}")
+    for date_achat, montant in client.get("historique_achats", []):
+        if not date_valide(date_achat):
+            erreurs.append(f"date d'achat invalide : {date_achat}")
+        if not isinstance(montant, int) or montant < 0:
+            erreurs.append(f"montant invalide : {montant}")
+    return erreurs
+
+
+def _inserer_achat(client, date_achat, montant):
+    #On insere a sa place dans l'historique trie par date (apres les achats du meme jour) par dichotomie
+    hist = client.setdefault("historique_achats", [])
+    hist.insert(bisect.bisect_right(hist, (date_achat, math.inf)), (date_achat, montant))
+    client["version"] = client.get("version", 1) + 1
+
+
+def _verifier_version(client, version):
+    #version = numero lu par l'appelant avant de demander la modification (None : pas de verification)
+    if version is not None and client.get("version", 1) != version:
+        raise ConflitVersion(client["id"], version, client.get("version", 1))
+
+
+def _nouveau_client(new_id, nom, ville, telephone, tags):
+    #On cree le dictionnaire client. "cree" (date et heure de creation) ne change jamais, meme si le client
+    #change d'id : avec l'id il distingue ce client d'un ancien client supprime qui aurait porte le meme id
+    return {
         "id" : new_id,
         "nom" : nom.strip(),
         "ville" : ville.strip(),
         "telephone" : telephone.strip(),
         "tags" : [t.strip() for t in tags],
-        "historique_achats" : []
+        "historique_achats" : [],
+        "version" : 1,
+        "cree" : datetime.now().isoformat(timespec="microseconds")
         }
+
+
+def _appliquer_modifications(c, nom, ville, telephone, tags):
+    if nom is not None:#Ceci se fais si l'utilisateur a fourni une nouvelle valeur pour le nom, sinon on laisse le nom actuel
+        c["nom"] = nom.strip()
+    if ville is not None:
+        c["ville"] = ville.strip()
+    if telephone is not None:
+        c["telephone"] = telephone.strip()
+    if tags is not None:
+        c["tags"] = [t.strip() for t in tags]
+    c["version"] = c.get("version", 1) + 1
+    return c
+
+
+#Conteneur de clients qui se comporte comme l'ancienne liste de dictionnaires (len, for, [i], append)
+#mais qui garde en plus un index id -> client (dict python = table de hachage) et un compteur d'id.
+#Ainsi retrouver, modifier, supprimer ou ajouter un client coute O(1) au lieu de parcourir toute la liste
+class ClientStore:
+
+    def __init__(self, clients=()):
+        self._par_id = {} #Un dict garde l'ordre d'insertion, il remplace donc la liste
+        #Le compteur ne redescend jamais, un id supprime n'est pas reutilise : il est sauvegarde avec les clients
+        #et repris par charger_clients (voir stockage.lire_prochain_id)
+        self._prochain_id = 1
+        self._liste = None #Copie en liste construite seulement si on accede par position (clients[0])
+        self._rang = {} #id -> ordre d'insertion, pour rendre les resultats de recherche dans l'ordre de la liste
+        self._compteur_rang = 0
+        #Chaque index n'est construit qu'a la premiere requete qui en a besoin (index_nom, index_tags ...) :
+        #le chargement ne fait que ranger les clients, et une commande qui charge la base pour ajouter un client
+        #ne paie aucune construction. _index contient les index deja construits, les seuls tenus a jour
+        self._index_nom = IndexTrigrammes("nom")
+        self._index_ville = IndexTrigrammes("ville")
+        self._index_tags = IndexTags()
+        self._index_dates = IndexDates()
+        self._index_telephone = IndexTelephones()
+        self._index = []
+        self._totaux = {} #id -> total des achats, mis a jour a chaque achat (evite de re-sommer l'historique)
+        self._total_general = 0
+        self._source = None #Fichier d'ou viennent les donnees, le journal n'a de sens que pour ce fichier
+        self._en_attente = {} #id -> derniere operation ("ajout", "modif", "achat", "suppr") non encore sauvegardee
+        self._base = {} #id -> version du client avant notre premiere modification non sauvegardee
+        self._achats_en_attente = {} #id -> achats ajoutes depuis la derniere sauvegarde
+        self._signature = None #Etat du fichier quand on l'a lu ou ecrit pour la derniere fois
+        self._etapes = [] #Pile des etapes a annuler (voir annuler)
+        self._a_refaire = [] #Etapes annulees, qu'on peut refaire tant qu'aucune nouvelle operation n'arrive
+        self._transaction = None #Changements de la transaction en cours
+        for c in clients:
+            self.append(c)
+        self._en_attente = {}
+
+    def __len__(self):
+        return len(self._par_id)
+
+    def __iter__(self):
+        return iter(self._par_id.values())
+
+    def __getitem__(self, position):
+        if self._liste is None:
+            self._liste = list(self._par_id.values())
+        return self._liste[position]
+
+    def __contains__(self, client):
+        return self._par_id.get(client.get("id")) == client
+
+    def __repr__(self):
+        return f"ClientStore({list(self._par_id.values())!r})"
+
+    def append(self, client):
+        #On ajoute un client deja construit (par exemple lu depuis le JSON) en gardant son id
+        client_id = client["id"]
+        if client_id in self._par_id:
+            raise ValueError(f"Identifiant de client deja utilise : {client_id}")
+        self._inserer(client, self._compteur_rang)
+        self._compteur_rang += 1
+        self._en_attente[client_id] = "ajout"
+
+    def _inserer(self, client, rang):
+        #Met le client a sa place (rang) dans l'ordre de la liste, avec son total et dans les index
+        client_id = client["id"]
+        self._par_id[client_id] = client
+        self._liste = None
+        self._rang[client_id] = rang
+        if rang < self._compteur_rang - 1:
+            #Client supprime puis remis (annulation) : on retrie l'ordre, cas rare
+            self._par_id = dict(sorted(self._par_id.items(), key=lambda item: self._rang[item[0]]))
+        if client_id >= self._prochain_id:
+            self._prochain_id = client_id + 1
+        if getattr(client, "historique_lu", True):
+            #L'historique est garde trie par date ("YYYY-MM-DD" se trie comme les dates), tri stable pour les ex aequo
+            client.setdefault("historique_achats", []).sort(key=lambda achat: achat[0])
+            total = total_depense_client(client) #Seule fois ou on parcourt l'historique de ce client
+        else:
+            total = client.total #Chargement paresseux : total lu dans les en-tetes, historique lu plus tard
+        self._totaux[client_id] = total
+        self._total_general += total
+        for idx in self._index:
+            idx.ajouter(client)
+
+    @property
+    def prochain_id(self):
+        return self._prochain_id
+
+    def _construire(self, idx):
+        #Premier usage d'un index : on le remplit avec tous les clients, ensuite il suit les modifications
+        if idx not in self._index:
+            for c in self._par_id.values():
+                idx.ajouter(c)
+            self._index.append(idx)
+        return idx
+
+    @property
+    def index_nom(self):
+        return self._construire(self._index_nom)
+
+    @property
+    def index_ville(self):
+        return self._construire(self._index_ville)
+
+    @property
+    def index_tags(self):
+        return self._construire(self._index_tags)
+
+    @property
+    def index_dates(self):
+        return self._construire(self._index_dates)
+
+    @property
+    def index_telephone(self):
+        return self._construire(self._index_telephone)
+
+    def extend(self, clients):
+        for c in clients:
+            self.append(c)
+
+    def get(self, client_id):
+        #Renvoie le client ou None s'il n'existe pas
+        return self._par_id.get(client_id)
+
+    def ajouter(self, nom, ville, telephone, tags, unique=False):
+        if unique:
+            self._verifier_telephone_libre(telephone)
+        client = _nouveau_client(self._prochain_id, nom, ville, telephone, tags)
+        suivi = self._suivi(client["id"])
+        self.append(client)
+        self._noter("ajout", client["id"], None, (client, self._rang[client["id"]]), suivi)
+        return client
+
+    def modifier(self, client_id, nom=None, ville=None, telephone=None, tags=None, version=None, unique=False):
+        c = self._par_id.get(client_id)
+        if c is None:
+            raise KeyError("Client introuvable")
+        _verifier_version(c, version)
+        if unique and telephone is not None:
+            self._verifier_telephone_libre(telephone, client_id)
+        suivi = self._suivi(client_id)
+        self._noter_base(c)
+        #On ne remet a jour que les index qui portent sur un champ modifie
+        changes = [champ for champ, valeur in (("nom", nom), ("ville", ville), ("telephone", telephone), ("tags", tags)) if valeur is not None]
+        avant = ({champ : c[champ] for champ in changes}, c.get("version", 1))
+        concernes = [idx for idx in self._index if set(changes).intersection(idx.champs)]
+        for idx in concernes:
+            idx.retirer(c)
+        _appliquer_modifications(c, nom, ville, telephone, tags)
+        for idx in concernes:
+            idx.ajouter(c)
+        if self._en_attente.get(client_id) != "ajout": #Un client pas encore sauvegarde reste un ajout
+            self._en_attente[client_id] = "modif"
+        self._noter("modif", client_id, avant, ({champ : c[champ] for champ in changes}, c["version"]), suivi)
+        return c
+
+    def supprimer(self, client_id, version=None):
+        c = self._par_id.get(client_id)
+        if c is None:
+            raise KeyError("Client introuvable")
+        _verifier_version(c, version)
+        suivi = self._suivi(client_id)
+        rang = self._rang[client_id]
+        self._noter_base(c)
+        self._oublier(client_id)
+        if self._en_attente.get(client_id) == "ajout":
+            del self._en_attente[client_id] #Jamais sauvegarde : il n'y a rien a supprimer du fichier
+        else:
+            self._en_attente[client_id] = "suppr"
+        self._achats_en_attente.pop(client_id, None)
+        self._noter("suppr", client_id, (c, rang), None, suivi)
+
+    def _noter_base(self, c):
+        #Version du fichier sur laquelle portent nos changements, pour detecter ceux des autres a la sauvegarde
+        self._base.setdefault(c["id"], c.get("version", 1))
+
+    def _oublier(self, client_id):
+        #Retire le client de la memoire (ordre, totaux, index) sans rien noter pour la sauvegarde
+        c = self._par_id.pop(client_id)
+        self._liste = None
+        del self._rang[client_id]
+        self._total_general -= self._totaux.pop(client_id)
+        for idx in self._index:
+            idx.retirer(c)
+        return c
+
+    def _remplacer(self, client):
+        #Met un client lu dans le fichier a la place du notre (meme position), sans le noter pour la sauvegarde
+        client_id = client["id"]
+        ancien = self._par_id.get(client_id)
+        if ancien is None:
+            self.append(client)
+        else:
+            for idx in self._index:
+                idx.retirer(ancien)
+            client.setdefault("historique_achats", []).sort(key=lambda achat: achat[0])
+            self._par_id[client_id] = client
+            self._liste = None
+            total = total_depense_client(client)
+            self._total_general += total - self._totaux[client_id]
+            self._totaux[client_id] = total
+            for idx in self._index:
+                idx.ajouter(client)
+        self._en_attente.pop(client_id, None)
+        self._base.pop(client_id, None)
+
+    def ajouter_achat(self, client_id, date, montant):
+        #Les achats doivent passer par ici (et non par historique_achats.append) pour garder les totaux justes
+        c = self._par_id.get(client_id)
+        if c is None:
+            raise KeyError("Client introuvable")
+        suivi = self._suivi(client_id)
+        version = c.get("version", 1)
+        self._noter_base(c)
+        self._poser_achat(c, date, montant)
+        self._en_attente.setdefault(client_id, "achat") #"ajout" et "modif" restent : ils comptent plus qu'un achat
+        self._achats_en_attente.setdefault(client_id, []).append((date, montant))
+        self._noter("achat", client_id, version, (date, montant, c["version"]), suivi)
+        return c
+
+    def _poser_achat(self, c, date, montant):
+        _inserer_achat(c, date, montant)
+        self._totaux[c["id"]] += montant
+        self._total_general += montant
+        for idx in self._index:
+            idx.achat(c, date, montant)
+
+    def par_telephone(self, telephone):
+        #Le client qui a ce numero (le premier de la liste s'il y a des doublons), ou None
+        ids = self.index_telephone.ids(telephone)
+        return self._par_id[min(ids, key=self._rang.__getitem__)] if ids else None
+
+    def _verifier_telephone_libre(self, telephone, sauf=None):
+        autres = self.index_telephone.ids(telephone) - {sauf}
+        if autres:
+            raise TelephoneDejaUtilise(telephone, min(autres, key=self._rang.__getitem__))
+
+    def doublons_telephone(self):
+        return {numero : self._dans_l_ordre(ids) for numero, ids in self.index_telephone.doublons().items()}
+
+    def charger_historiques(self):
+        #Lit d'un coup les historiques pas encore lus (chargement paresseux), avant de parcourir tous les achats
+        a_lire = {}
+        for c in self._par_id.values():
+            if not getattr(c, "historique_lu", True):
+                a_lire.setdefault(c.lecteur, []).append(c)
+        for lecteur, clients in a_lire.items():
+            lecteur.lire_tous(clients)
+
+    def total(self, client_id):
+        return self._totaux[client_id]
+
+    def total_general(self):
+        return self._total_general
+
+    def _operations_en_attente(self):
+        #Une operation par client touche depuis la derniere sauvegarde, avec son etat actuel complet
+        for client_id, op in self._en_attente.items():
+            if op == "suppr":
+                yield {"op" : "suppr", "id" : client_id}
+            else:
+                yield {"op" : op, "client" : client_vers_json(self._par_id[client_id])}
+
+    def _marquer_sauvegarde(self, path, signature=None):
+        self._source = os.path.abspath(path)
+        self._signature = signature
+        self._en_attente = {}
+        self._base = {}
+        self._achats_en_attente = {}
+        self._oublier_etapes()
+
+    #--- Annuler / refaire ---
+    #Chaque operation note de quoi la defaire et la refaire : (operation, id, avant, apres, suivi avant, suivi apres)
+    # - "ajout" : apres = (client, rang)               - "suppr" : avant = (client, rang)
+    # - "modif" : avant / apres = ({champ: valeur}, version)
+    # - "achat" : avant = version, apres = (date, montant, version)
+    #Le suivi est l'etat de _en_attente, _base et _achats_en_attente pour ce client : il est remis tel quel,
+    #donc un changement annule n'est plus ecrit par la sauvegarde incrementale (modifier puis annuler = rien a ecrire).
+    #Les etapes valent jusqu'a la prochaine sauvegarde ou fusion avec le fichier, qui les oublie
+
+    def _suivi(self, client_id):
+        achats = self._achats_en_attente.get(client_id)
+        return (self._en_attente.get(client_id), self._base.get(client_id), None if achats is None else list(achats))
+
+    def _poser_suivi(self, client_id, suivi):
+        for valeurs, valeur in zip((self._en_attente, self._base, self._achats_en_attente), suivi):
+            if valeur is None:
+                valeurs.pop(client_id, None)
+            else:
+                valeurs[client_id] = list(valeur) if isinstance(valeur, list) else valeur
+
+    def _noter(self, operation, client_id, avant, apres, suivi):
+        changement = (operation, client_id, avant, apres, suivi, self._suivi(client_id))
+        if self._transaction is not None:
+            self._transaction.append(changement)
+            return
+        self._etapes.append([changement])
+        if len(self._etapes) > LIMITE_ANNULATIONS:
+            del self._etapes[0]
+        self._a_refaire = []
+
+    def _oublier_etapes(self):
+        self._etapes = []
+        self._a_refaire = []
+
+    def _poser_champs(self, c, valeurs, version):
+        concernes = [idx for idx in self._index if set(valeurs).intersection(idx.champs)]
+        for idx in concernes:
+            idx.retirer(c)
+        c.update(valeurs)
+        c["version"] = version
+        for idx in concernes:
+            idx.ajouter(c)
+
+    def _retirer_achat(self, c, date, montant, version):
+        #Inverse de _poser_achat : l'achat est le dernier de ce jour (les suivants ont ete annules avant lui)
+        dates = [idx for idx in self._index if "historique_achats" in idx.champs]
+        for idx in dates:
+            idx.retirer(c)
+        hist = c["historique_achats"]
+        del hist[bisect.bisect_right(hist, (date, math.inf)) - 1]
+        c["version"] = version
+        self._totaux[c["id"]] -= montant
+        self._total_general -= montant
+        for idx in dates:
+            idx.ajouter(c)
+
+    def _rejouer(self, changement, annuler):
+        operation, client_id, avant, apres, suivi_avant, suivi_apres = changement
+        etat = avant if annuler else apres
+        if operation in ("ajout", "suppr"):
+            if etat is None:
+                self._oublier(client_id)
+            else:
+                self._inserer(*etat)
+        elif operation == "modif":
+            self._poser_champs(self._par_id[client_id], *etat)
+        elif annuler:
+            date_achat, montant, _ = apres
+            self._retirer_achat(self._par_id[client_id], date_achat, montant, avant)
+        else:
+            date_achat, montant, version = apres
+            c = self._par_id[client_id]
+            self._poser_achat(c, date_achat, montant)
+            c["version"] = version
+        self._poser_suivi(client_id, suivi_avant if annuler else suivi_apres)
+
+    def annuler(self):
+        #Defait la derniere etape (une operation, ou toute une transaction) ; renvoie ses operations [(operation, id)]
+        if self._transaction is not None:
+            raise RuntimeError("Impossible d'annuler pendant une transaction")
+        if not self._etapes:
+            return []
+        etape = self._etapes.pop()
+        for changement in reversed(etape):
+            self._rejouer(changement, annuler=True)
+        self._a_refaire.append(etape)
+        return [(operation, client_id) for operation, client_id, *_ in reversed(etape)]
+
+    def refaire(self):
+        #Refait la derniere etape annulee
+        if self._transaction is not None:
+            raise RuntimeError("Impossible de refaire pendant une transaction")
+        if not self._a_refaire:
+            return []
+        etape = self._a_refaire.pop()
+        for changement in etape:
+            self._rejouer(changement, annuler=False)
+        self._etapes.append(etape)
+        return [(operation, client_id) for operation, client_id, *_ in etape]
+
+    @contextmanager
+    def transaction(self):
+        #with clients.transaction(): toutes les operations du bloc reussissent ensemble ou aucune. A la premiere
+        #exception elles sont defaites dans l'ordre inverse, puis l'exception continue. Le bloc compte pour une
+        #seule etape d'annulation. Une transaction dans une autre ne defait que ses propres operations
+        exterieure = self._transaction is None
+        if exterieure:
+            self._transaction = []
+        debut = len(self._transaction)
+        try:
+            yield self
+        except BaseException:
+            a_defaire = self._transaction[debut:]
+            del self._transaction[debut:]
+            for changement in reversed(a_defaire):
+                self._rejouer(changement, annuler=True)
+            raise
+        finally:
+            if exterieure:
+                etape, self._transaction = self._transaction, None
+        if exterieure and etape:
+            self._etapes.append(etape)
+            if len(self._etapes) > LIMITE_ANNULATIONS:
+                del self._etapes[0]
+            self._a_refaire = []
+
+    def rechercher(self, index, requete):
+        #Recherche "contient" insensible a la casse sur le champ de l'index (index_nom ou index_ville)
+        requete = requete.strip().lower()
+        ids = index.rechercher(requete)
+        if ids is None:
+            #Requete plus courte qu'un trigramme : on parcourt, mais avec les valeurs deja en minuscules
+            return [c for c in self if requete in index.valeur(c["id"])]
+        return self._dans_l_ordre(ids)
+
+    def rechercher_approx(self, index, requete, limite=10):
+        #Meilleures correspondances approchees, de la plus proche a la plus lointaine
+        return [self._par_id[i] for _, i in index.rechercher_approx(requete, limite)]
+
+    def rechercher_tags(self, tous=(), un_de=(), sauf=()):
+        return self._dans_l_ordre(self.index_tags.rechercher(tous, un_de, sauf, self._par_id))
+
+    def _dans_l_ordre(self, ids):
+        #Les clients trouves, dans l'ordre de la liste
+        return sorted((self._par_id[i] for i in ids), key=lambda c: self._rang[c["id"]])
+
+
+#Avant un parcours de tous les achats (statistiques, reecriture complete) sur une base chargee avec paresseux=True :
+#un seul passage sur le fichier au lieu d'une lecture par client. Rien a faire pour une simple liste
+def charger_historiques(clients):
+    if isinstance(clients, ClientStore):
+        clients.charger_historiques()
+
+
+def _copie_champs(c):
+    #Copie des champs d'un client (dict ou modeles.Client), tags et historique compris
+    return {cle : copy.deepcopy(c[cle]) for cle in list(c.keys())}
+
+
+def _remettre_champs(c, champs):
+    #Remet les champs sur l'objet lui meme : les references deja obtenues par l'appelant restent valables
+    if isinstance(c, dict):
+        c.clear()
+    c.update(champs)
+
+
+#Plusieurs operations qui reussissent ensemble ou pas du tout :
+#    with transaction(clients):
+#        c = ajouter_client(clients, "Jean Mbarga", "Yaoundé", "677123456", [])
+#        ajouter_achat(clients, c["id"], "2026-02-01", 15000)
+#Si une exception sort du bloc, les clients sont remis comme avant le bloc et l'exception continue
+@contextmanager
+def transaction(clients):
+    if isinstance(clients, ClientStore):
+        with clients.transaction():
+            yield clients
+        return
+    #Simple liste : on garde les clients presents et une copie de leurs champs, remis sur place en cas d'erreur
+    presents = list(clients)
+    copies = [_copie_champs(c) for c in presents]
+    try:
+        yield clients
+    except BaseException:
+        for c, champs in zip(presents, copies):
+            _remettre_champs(c, champs)
+        clients[:] = presents
+        raise
+
+
+#Annule la derniere operation (ou transaction) faite sur un ClientStore depuis la derniere sauvegarde ;
+#refaire_operation la refait. Renvoient les operations concernees [("ajout"|"modif"|"suppr"|"achat", id)],
+#une liste vide s'il n'y a rien a annuler ou refaire (toujours le cas pour une simple liste)
+@instrumente
+def annuler_operation(clients):
+    if isinstance(clients, ClientStore):
+        return clients.annuler()
+    return []
+
+
+@instrumente
+def refaire_operation(clients):
+    if isinstance(clients, ClientStore):
+        return clients.refaire()
+    return []
+
+
+#Les fonctions ci-dessous gardent leur signature d'origine : si on leur passe un ClientStore elles
+#deleguent a ses methodes O(1), sinon elles travaillent sur une simple liste comme avant
+@instrumente
+def trouver_client(clients, client_id):
+    if isinstance(clients, ClientStore):
+        return clients.get(client_id)
+    for c in clients:
+        if c["id"] == client_id:
+            return c
+    return None
+
+
+#unique=True : refuse un numero deja utilise par un autre client (TelephoneDejaUtilise)
+@instrumente
+def ajouter_client(clients, nom, ville, telephone, tags, unique=False):
+    if isinstance(clients, ClientStore):
+        return clients.ajouter(nom, ville, telephone, tags, unique)
+    if unique:
+        existant = rechercher_par_telephone(clients, telephone)
+        if existant is not None:
+            raise TelephoneDejaUtilise(telephone, existant["id"])
+    #On calcule le nouvel id
+    if len(clients) == 0:
+        new_id = 1
+    else:
+        new_id = max(c["id"] for c in clients) + 1
+    client = _nouveau_client(new_id, nom, ville, telephone, tags)
     #On ajoute le client a la liste et on retourne le client cree
     clients.append(client)
     return client
 
 
+@instrumente
+def ajouter_achat(clients, client_id, date, montant):
+    if isinstance(clients, ClientStore):
+        return clients.ajouter_achat(client_id, date, montant)
+    c = trouver_client(clients, client_id)
+    if c is None:
+        raise KeyError("Client introuvable")
+    _inserer_achat(c, date, montant)
+    return c
+
+
+#Achats de tous les clients entre deux dates incluses ("YYYY-MM-DD"), du plus ancien au plus recent :
+#[(date, id client, montant)]. Avec un ClientStore on ne lit que la tranche concernee de l'index des dates
+@instrumente
+def achats_entre(clients, debut, fin):
+    if isinstance(clients, ClientStore):
+        clients.charger_historiques()
+        return [(date.fromordinal(j).isoformat(), client_id, montant)
+                for j, client_id, montant in clients.index_dates.entre(jour(debut), jour(fin))]
+    achats = [(d, c["id"], montant) for c in clients for d, montant in c.get("historique_achats", []) if debut <= d <= fin]
+    return sorted(achats)
+
+
+@instrumente
+def chiffre_affaires(clients, debut, fin):
+    return sum(montant for _, _, montant in achats_entre(clients, debut, fin))
+
+
+def chiffre_affaires_du_mois(clients, reference=None):
+    #Du premier jour du mois de reference (aujourd'hui par defaut) jusqu'a la fin de ce mois
+    reference = reference or date.today()
+    debut = reference.replace(day=1)
+    fin = (debut.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return chiffre_affaires(clients, debut.isoformat(), fin.isoformat())
+
+
+#Clients ayant au moins un achat dans les `jours` derniers jours (reference comprise), dans l'ordre de la liste
+@instrumente
+def clients_actifs(clients, jours=30, reference=None):
+    reference = reference or date.today()
+    debut = (reference - timedelta(days=jours)).isoformat()
+    ids = {client_id for _, client_id, _ in achats_entre(clients, debut, reference.isoformat())}
+    if isinstance(clients, ClientStore):
+        return clients._dans_l_ordre(ids)
+    return [c for c in clients if c["id"] in ids]
+
+
+@instrumente
+def total_general_depenses(clients):
+    if isinstance(clients, ClientStore):
+        return clients.total_general()
+    return sum(total_depense_client(c) for c in clients)
+
+
+@instrumente
 def rechercher_par_nom(clients, nomRechercher):
+    if isinstance(clients, ClientStore):
+        return clients.rechercher(clients.index_nom, nomRechercher)
+    nomRechercher = nomRechercher.strip().lower() #On prepare la requete une seule fois et non pour chaque client
     clients_trouves = []
     for c in clients:
-        if nomRechercher.strip().lower() in c["nom"].lower():
+        if nomRechercher in c["nom"].lower():
             clients_trouves.append(c)
     return clients_trouves
 
 
+@instrumente
 def rechercher_par_ville(clients, villeRechercher ):
+    if isinstance(clients, ClientStore):
+        return clients.rechercher(clients.index_ville, villeRechercher)
+    villeRechercher = villeRechercher.strip().lower()
     clients_trouves = []
     for c in clients:
-        if villeRechercher.strip().lower() in c["ville"].lower():
+        if villeRechercher in c["ville"].lower():
             clients_trouves.append(c)
     return clients_trouves
             
 
+#Client qui a ce numero ("677 12 34 56", "+237677123456" et "677123456" sont le meme numero), ou None.
+#Avec un ClientStore c'est une lecture dans une table de hachage, O(1)
+@instrumente
+def rechercher_par_telephone(clients, telephone):
+    if isinstance(clients, ClientStore):
+        return clients.par_telephone(telephone)
+    numero = normaliser_telephone(telephone)
+    for c in clients:
+        if normaliser_telephone(c["telephone"]) == numero:
+            return c
+    return None
+
+
+#Numeros partages par plusieurs clients : {numero normalise: [clients dans l'ordre de la liste]}
+@instrumente
+def doublons_telephone(clients):
+    if isinstance(clients, ClientStore):
+        return clients.doublons_telephone()
+    par_numero = {}
+    for c in clients:
+        par_numero.setdefault(normaliser_telephone(c["telephone"]), []).append(c)
+    return {numero : liste for numero, liste in par_numero.items() if len(liste) > 1}
+
+
+#Recherche approchee : sans tenir compte des accents ni des majuscules, et en tolerant quelques fautes
+#("yaounde" trouve "Yaoundé", "mbrga" trouve "Jean Mbarga"). Renvoie au plus `limite` clients, du plus
+#ressemblant au moins ressemblant. La recherche exacte (rechercher_par_nom) reste celle par defaut
+@instrumente
+def rechercher_par_nom_approx(clients, requete, limite=10):
+    if isinstance(clients, ClientStore):
+        return clients.rechercher_approx(clients.index_nom, requete, limite)
+    return _rechercher_approx_liste(clients, "nom", requete, limite)
+
+
+@instrumente
+def rechercher_par_ville_approx(clients, requete, limite=10):
+    if isinstance(clients, ClientStore):
+        return clients.rechercher_approx(clients.index_ville, requete, limite)
+    return _rechercher_approx_liste(clients, "ville", requete, limite)
+
+
+def _rechercher_approx_liste(clients, champ, requete, limite):
+    #Sans index : distance calculee pour chaque client
+    motif = normaliser_texte(requete.strip())
+    if not motif:
+        return []
+    borne = distance_max(motif)
+    scores = ((distance_dans(motif, normaliser_texte(c[champ])), rang, c) for rang, c in enumerate(clients))
+    return [c for _, _, c in heapq.nsmallest(limite, (s for s in scores if s[0] <= borne), key=lambda s: s[:2])]
+
+
+#Recherche par tags avec combinaisons booleennes, sans tenir compte des accents ni des majuscules :
+#tous = le client a tous ces tags (ET), un_de = au moins un de ces tags (OU), sauf = aucun de ces tags (NON)
+#rechercher_par_tags(clients, tous=["vip", "whatsapp"], sauf=["entreprise"])
+@instrumente
+def rechercher_par_tags(clients, tous=(), un_de=(), sauf=()):
+    if isinstance(clients, ClientStore):
+        return clients.rechercher_tags(tous, un_de, sauf)
+    tous = {normaliser_texte(t.strip()) for t in tous}
+    un_de = {normaliser_texte(t.strip()) for t in un_de}
+    sauf = {normaliser_texte(t.strip()) for t in sauf}
+    clients_trouves = []
+    for c in clients:
+        tags = {normaliser_texte(t) for t in c.get("tags", [])}
+        if tous <= tags and (not un_de or un_de & tags) and not sauf & tags:
+            clients_trouves.append(c)
+    return clients_trouves
+
+
+@instrumente
 def trier_par_nom(clients):
     #On cree ue fonction qui renvoie une nouvelle liste trie par ordre alphabetique
     return sorted(clients, key=lambda c: c["nom"].lower() )#lambda est une fonction anonyme et rapide pour trier par nom en ignorant la casse et key attend une fonction qui a partir d'un element renvoie une valeur comparable
 
 
+@instrumente
 def trier_par_total_achat(clients):
+    if isinstance(clients, ClientStore):
+        #La cle de tri est une simple lecture dans le dict des totaux
+        totaux = clients._totaux
+        return sorted(clients, key=lambda c: totaux[c["id"]], reverse=True )
     return sorted(clients, key=lambda c: total_depense_client(c), reverse=True )
 
 
-def supprimer_client(clients, client_id):
+#Les k meilleurs clients sans trier toute la liste : heapq.nlargest garde un tas de taille k (O(n log k))
+#et donne exactement les k premiers de trier_par_total_achat, ex aequo compris (ordre de la liste conserve)
+@instrumente
+def top_clients_par_depense(clients, k):
+    if isinstance(clients, ClientStore):
+        totaux = clients._totaux
+        return heapq.nlargest(k, clients, key=lambda c: totaux[c["id"]])
+    return heapq.nlargest(k, clients, key=total_depense_client)
+
+
+#version (facultatif) : numero de version lu avant la modification ; si le client a change depuis,
+#ConflitVersion est levee et rien n'est modifie
+@instrumente
+def supprimer_client(clients, client_id, version=None):
+    if isinstance(clients, ClientStore):
+        return clients.supprimer(client_id, version)
     for index, c in enumerate(clients):
         if c["id"] == client_id:
+            _verifier_version(c, version)
             del clients[index] #del et remove sont deux methodes pour supprimer un element d'une liste en python, del utilise l'index de l'element a supprimer tandis que remove utilise la valeur de l'element a supprimer.
 
             return
     raise KeyError("Client introuvable") #On affiche ce message si l'id du client n'existe pas 
 
 
-def modifier_client(clients, client_id, nom=None, ville=None, telephone=None, tags=None):
-    for c in clients:
-        if c["id"] == client_id:
-            if nom is not None:#Ceci se fais si l'utilisateur a fourni une nouvelle valeur pour le nom, sinon on laisse le nom actuel
-                c["nom"] = nom.strip()
-            if ville is not None:
-                c["ville"] = ville.strip()
-            if telephone is not None:
-                c["telephone"] = telephone.strip()
-            if tags is not None:
-                c["tags"] = [t.strip() for t in tags]
-            return c
-    raise KeyError("Client introuvable")
-
-
+@instrumente
+def modifier_client(clients, client_id, nom=None, ville=None, telephone=None, tags=None, version=None, unique=False):
+    if isinstance(clients, ClientStore):
+        return clients.modifier(client_id, nom, ville, telephone, tags, version, unique)
+    c = trouver_client(clients, client_id)
+    if c is None:
+        raise KeyError("Client introuvable")
+    _verifier_version(c, version)
+    if unique and telephone is not None:
+        numero = normaliser_telephone(telephone)
+        for autre in clients:
+            if autre["id"] != client_id and normaliser_telephone(autre["telephone"]) == numero:
+                raise TelephoneDejaUtilise(telephone, autre["id"])
+    return _appliquer_modifications(c, nom, ville, telephone, tags)
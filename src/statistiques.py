@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Statistiques sur les achats : chiffre d'affaires par ville, par tag, par mois, panier moyen...
+
+Tous les achats sont mis a plat une seule fois en colonnes NumPy (client, date, montant), puis chaque
+regroupement se fait avec des operations vectorisees (np.unique, np.bincount) au lieu de boucles python.
+NumPy est la seule dependance externe du projet et n'est necessaire que pour ce module.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _jour(date_str):
+    return None if date_str is None else np.datetime64(date_str, "D")
+
+
+class TableAchats:
+
+    def __init__(self, clients):
+        if np is None:
+            raise ImportError("Le module statistiques a besoin de numpy (pip install numpy)")
+        villes, tags = {}, {} #valeur -> code : "Douala" => 0, "Garoua" => 1 ...
+        ville_client, tag_ligne, tag_code, nb_achats = [], [], [], []
+        dates, montants = [], []
+        #Un seul parcours des clients pour tout mettre en colonnes
+        for ligne, c in enumerate(clients):
+            ville_client.append(villes.setdefault(c["ville"], len(villes)))
+            for tag in c.get("tags", []):
+                tag_ligne.append(ligne)
+                tag_code.append(tags.setdefault(tag, len(tags)))
+            hist = c.get("historique_achats", [])
+            nb_achats.append(len(hist))
+            for date_achat, montant in hist:
+                dates.append(date_achat)
+                montants.append(montant)
+        self.nb_clients = len(ville_client)
+        self.villes = list(villes) #code -> nom
+        self.tags = list(tags)
+        self.ville_client = np.array(ville_client, dtype=np.int64) #ligne client -> code ville
+        self.tag_ligne = np.array(tag_ligne, dtype=np.int64) #une entree par couple (client, tag)
+        self.tag_code = np.array(tag_code, dtype=np.int64)
+        #Colonnes des achats : ligne du client, jour (datetime64, un entier de jours), montant
+        self.client = np.repeat(np.arange(self.nb_clients), np.array(nb_achats, dtype=np.int64))
+        self.jour = np.array(dates, dtype="datetime64[D]")
+        self.montant = np.array(montants, dtype=np.int64)
+
+    def _masque(self, debut=None, fin=None):
+        #Achats compris entre debut et fin inclus ("YYYY-MM-DD", None = pas de limite)
+        masque = np.ones(len(self.montant), dtype=bool)
+        if debut is not None:
+            masque &= self.jour >= _jour(debut)
+        if fin is not None:
+            masque &= self.jour <= _jour(fin)
+        return masque
+
+    def _par_client(self, masque):
+        #Somme et nombre d'achats de chaque client (sur les achats retenus)
+        sommes = np.bincount(self.client[masque], weights=self.montant[masque], minlength=self.nb_clients)
+        nombres = np.bincount(self.client[masque], minlength=self.nb_clients)
+        return sommes, nombres
+
+    @staticmethod
+    def _lignes(libelles, sommes, nombres):
+        #[(libelle, somme, nombre, moyenne)] du plus gros chiffre d'affaires au plus petit
+        garder = nombres > 0
+        moyennes = np.divide(sommes, nombres, out=np.zeros(len(sommes)), where=garder)
+        ordre = np.argsort(-sommes[garder], kind="stable")
+        libelles = np.asarray(libelles, dtype=object)[garder][ordre]
+        return [(lib, int(round(s)), int(n), float(m)) for lib, s, n, m in
+                zip(libelles, sommes[garder][ordre], nombres[garder][ordre], moyennes[garder][ordre])]
+
+    def par_ville(self, debut=None, fin=None):
+        masque = self._masque(debut, fin)
+        codes = self.ville_client[self.client[masque]]
+        sommes = np.bincount(codes, weights=self.montant[masque], minlength=len(self.villes))
+        nombres = np.bincount(codes, minlength=len(self.villes))
+        return self._lignes(self.villes, sommes, nombres)
+
+    def par_tag(self, debut=None, fin=None):
+        #Un achat compte pour chacun des tags de son client
+        sommes_client, nombres_client = self._par_client(self._masque(debut, fin))
+        sommes = np.bincount(self.tag_code, weights=sommes_client[self.tag_ligne], minlength=len(self.tags))
+        nombres = np.bincount(self.tag_code, weights=nombres_client[self.tag_ligne], minlength=len(self.tags))
+        return self._lignes(self.tags, sommes, nombres.astype(np.int64))
+
+    def par_mois(self, debut=None, fin=None):
+        masque = self._masque(debut, fin)
+        mois, codes = np.unique(self.jour[masque].astype("datetime64[M]"), return_inverse=True)
+        sommes = np.bincount(codes, weights=self.montant[masque], minlength=len(mois))
+        nombres = np.bincount(codes, minlength=len(mois))
+        lignes = self._lignes([str(m) for m in mois], sommes, nombres)
+        return sorted(lignes) #Ordre chronologique pour les mois
+
+    def resume(self, debut=None, fin=None):
+        masque = self._masque(debut, fin)
+        sommes_client, nombres_client = self._par_client(masque)
+        chiffre = int(self.montant[masque].sum())
+        nb_achats = int(masque.sum())
+        return {
+            "chiffre_affaires" : chiffre,
+            "nb_achats" : nb_achats,
+            "panier_moyen" : chiffre / nb_achats if nb_achats else 0.0,
+            "nb_clients" : self.nb_clients,
+            "clients_actifs" : int((nombres_client > 0).sum()),
+            #Valeur vie client : ce qu'un client rapporte en moyenne sur toute la periode
+            "valeur_vie_client" : chiffre / self.nb_clients if self.nb_clients else 0.0,
+            "meilleure_valeur_vie" : int(round(sommes_client.max())) if self.nb_clients else 0,
+            }
@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistance des clients sur disque : instantane JSON complet + journal des modifications,
+et choix du format de stockage (JSON ou SQLite) selon l'extension du fichier
+"""
+
+import os
+import re
+import json
+import stat
+import tempfile
+import warnings
+from contextlib import contextmanager
+
+#Verrou consultatif entre programmes : fcntl sous Linux/Mac, msvcrt sous Windows
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+#Le journal est un fichier a cote de l'instantane (data/clients.json.journal) ou chaque ligne est
+#un petit objet JSON : {"op": "ajout"|"modif"|"achat", "client": {...}} ou {"op": "suppr", "id": 3}.
+#Chaque ligne contient l'etat complet du client concerne : rejouer deux fois la meme ligne donne le meme
+#resultat, ce qui permet de relire sans risque un journal deja integre a l'instantane (crash pendant la compaction)
+def chemin_journal(path):
+    return path + ".journal"
+
+
+#umask du processus, lu une seule fois au chargement du module (os.umask le remplace : on le remet aussitot)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def copier_mode(temporaire, path):
+    #mkstemp cree le fichier en 0600 et os.replace garde ce mode : on donne au fichier temporaire celui du fichier
+    #qu'il va remplacer, ou le mode d'un nouveau fichier (0666 moins l'umask) s'il n'existe pas encore
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(temporaire, mode)
+
+
+#Nombre de copies precedentes gardees (clients.json.1 = la plus recente ... clients.json.3)
+NB_SAUVEGARDES = 3
+
+
+def chemin_sauvegarde(path, numero):
+    return f"{path}.{numero}"
+
+
+#Fichier d'en-tetes ecrit avec chaque instantane (data/clients.json.entetes) : une ligne par client avec ses
+#champs sauf l'historique, son total d'achats et la position de sa ligne dans l'instantane. Il sert au chargement
+#paresseux : on lit les en-tetes au demarrage, et l'historique d'un client seulement quand on en a besoin
+def chemin_entetes(path):
+    return path + ".entetes"
+
+
+#Au dela de cette taille relative (journal / instantane) on replie le journal dans un nouvel instantane
+RATIO_COMPACTION = 0.5
+TAILLE_MIN_COMPACTION = 64 * 1024
+
+
+def client_vers_json(c):
+    #Etand donnee que json ne lit pas les tuples , il faut qu'on cree une version compatible pour pouvoir sauvergarder
+    hist = c.get("historique_achats", [])
+    donnees = {
+        "id" : c["id"],
+        "nom" : c["nom"],
+        "ville" : c["ville"],
+        "telephone" : c["telephone"],
+        "tags" : c.get("tags", []),
+        "historique_achats" : [list(item) for item in hist], #On convertir les tuples en liste pour les rendre compatibles avec JSON
+        "version" : c.get("version", 1)
+        }
+    if c.get("cree") is not None: #Les clients crees avant l'ajout de ce champ n'en ont pas
+        donnees["cree"] = c["cree"]
+    return donnees
+
+
+def client_depuis_json(c):
+    #pour avoir [date, montant] => (date, montant)
+    hist = c.get("historique_achats", []) #[] permet de recuperer un historique vide ceci permet de ne pas casser la conversion avec le  None
+    c["historique_achats"] = [ tuple(item) for item in hist ]
+    c.setdefault("version", 1) #Les anciens fichiers n'ont pas de numero de version
+    return c
+
+
+def _historique(c):
+    #Historique d'un client lu dans le fichier : tuples (date, montant) tries par date
+    return sorted((tuple(item) for item in c.get("historique_achats", [])), key=lambda achat: achat[0])
+
+
+#Client charge sans son historique d'achats (chargement paresseux). C'est un dict comme les autres, mais
+#"historique_achats" n'est lu sur le disque qu'au premier acces : c["historique_achats"], c.get(...) ou
+#c.setdefault(...). total est le total des achats lu dans les en-tetes, pour l'afficher sans lire l'historique
+class ClientParesseux(dict):
+    __slots__ = ("total", "lecteur", "position")
+
+    def __init__(self, entete, total, lecteur, position=None):
+        super().__init__(entete)
+        self.total = total
+        self.lecteur = lecteur #Sait relire l'historique ; None une fois l'historique lu
+        self.position = position #(debut, longueur) de la ligne du client dans l'instantane JSON
+
+    @property
+    def historique_lu(self):
+        return self.lecteur is None
+
+    def definir_historique(self, historique):
+        self.lecteur = None
+        dict.__setitem__(self, "historique_achats", historique)
+
+    def _lire_historique(self):
+        if self.lecteur is not None:
+            self.definir_historique(self.lecteur.lire(self))
+
+    def __missing__(self, cle):
+        if cle == "historique_achats" and self.lecteur is not None:
+            self._lire_historique()
+            return dict.__getitem__(self, cle)
+        raise KeyError(cle)
+
+    def __contains__(self, cle):
+        return dict.__contains__(self, cle) or (cle == "historique_achats" and self.lecteur is not None)
+
+    def get(self, cle, defaut=None):
+        if cle == "historique_achats":
+            self._lire_historique()
+        return dict.get(self, cle, defaut)
+
+    def setdefault(self, cle, defaut=None):
+        if cle == "historique_achats":
+            self._lire_historique()
+        return dict.setdefault(self, cle, defaut)
+
+    def __setitem__(self, cle, valeur):
+        if cle == "historique_achats":
+            self.lecteur = None
+        dict.__setitem__(self, cle, valeur)
+
+
+def chemin_verrou(path):
+    return path + ".lock"
+
+
+#Verrou sur un fichier a cote des donnees (data/clients.json.lock) pour que deux programmes ne lisent pas
+#un etat a moitie sauvegarde ni n'ecrivent en meme temps. Partage pour lire, exclusif pour ecrire.
+#Il est "consultatif" : seuls les programmes qui le demandent l'attendent (ici charger/sauvegarder_clients)
+@contextmanager
+def verrou(path, exclusif=True):
+    dossier = os.path.dirname(path)
+    try:
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        f = open(chemin_verrou(path), "a+")
+    except OSError:
+        #Dossier en lecture seule : on ne pourra pas ecrire de toute facon, on lit sans verrou
+        yield
+        return
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusif else fcntl.LOCK_SH)
+        elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1) #Pas de verrou partage sous Windows
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def signature_fichiers(*chemins):
+    #Taille et date de modification de chaque fichier : si elle change, quelqu'un a ecrit depuis
+    signature = []
+    for chemin in chemins:
+        try:
+            infos = os.stat(chemin)
+        except OSError:
+            signature.append(None)
+        else:
+            signature.append((infos.st_mtime_ns, infos.st_size))
+    return tuple(signature)
+
+
+_ESPACES = re.compile(r"[ \t\n\r]*")
+TAILLE_BLOC = 1 << 16
+
+
+#Lecture d'un tableau JSON element par element : on ne garde en memoire qu'un bloc du fichier et
+#l'element en cours de decodage, au lieu du texte complet plus tous les objets comme avec json.load
+def _iter_tableau_json(f):
+    decodeur = json.JSONDecoder()
+    tampon = ""
+    pos = 0
+
+    def completer():
+        #On jette ce qui est deja lu et on ajoute un bloc (au moins aussi gros que le reste, pour ne pas
+        #redecoder trop souvent un tres gros client)
+        nonlocal tampon, pos
+        bloc = f.read(max(TAILLE_BLOC, len(tampon) - pos))
+        tampon = tampon[pos:] + bloc
+        pos = 0
+        return bool(bloc)
+
+    def prochain_caractere():
+        nonlocal pos
+        while True:
+            pos = _ESPACES.match(tampon, pos).end()
+            if pos < len(tampon):
+                return tampon[pos]
+            if not completer():
+                raise json.JSONDecodeError("Fin de fichier inattendue", tampon, pos)
+
+    if prochain_caractere() != "[":
+        raise json.JSONDecodeError("Tableau JSON attendu", tampon, pos)
+    pos += 1
+    if prochain_caractere() == "]":
+        return
+    while True:
+        prochain_caractere()
+        try:
+            element, fin = decodeur.raw_decode(tampon, pos)
+        except json.JSONDecodeError:
+            #Element coupe par la fin du bloc : on lit la suite et on recommence
+            if not completer():
+                raise
+            continue
+        pos = fin
+        yield element
+        separateur = prochain_caractere()
+        pos += 1
+        if separateur == "]":
+            return
+        if separateur != ",":
+            raise json.JSONDecodeError("',' ou ']' attendu", tampon, pos - 1)
+
+
+def _iter_fichier(path):
+    #Les tuples (date, montant) sont construits au fil de la lecture : pas de deuxieme passage sur les donnees
+    with open(path, "r", encoding="utf-8") as f:
+        for c in _iter_tableau_json(f):
+            if "id" in c: #Le premier element est le compteur d'ids ({"prochain_id": n}), pas un client
+                yield client_depuis_json(c)
+
+
+def _candidats(path):
+    return [path] + [chemin_sauvegarde(path, n) for n in range(1, NB_SAUVEGARDES + 1)]
+
+
+def _restaure(path, candidat):
+    if candidat != path:
+        warnings.warn(f"{path} illisible, donnees restaurees depuis {candidat}")
+
+
+def lire_instantane(path):
+    #Renvoie la liste des clients du fichier JSON. Si le fichier est absent, vide ou tronque (arret pendant
+    #une ecriture faite par une ancienne version), on reprend la copie de secours valide la plus recente
+    for candidat in _candidats(path):
+        if not os.path.exists(candidat):
+            continue
+        try:
+            data = list(_iter_fichier(candidat))
+        except json.JSONDecodeError:
+            continue
+        _restaure(path, candidat)
+        return data
+    return []
+
+
+def _instantane_valide(path):
+    #Meme choix que lire_instantane, mais en memoire bornee : chaque candidat est d'abord lu en entier sans rien
+    #garder (un client a la fois), pour ne jamais commencer a parcourir un fichier qui s'avere tronque plus loin
+    for candidat in _candidats(path):
+        if not os.path.exists(candidat):
+            continue
+        try:
+            with open(candidat, "r", encoding="utf-8") as f:
+                for _ in _iter_tableau_json(f):
+                    pass
+        except json.JSONDecodeError:
+            continue
+        _restaure(path, candidat)
+        return candidat
+    return None
+
+
+#Le compteur d'ids ne redescend jamais, meme quand on supprime le client au plus grand id : il est sauvegarde en
+#premier element de l'instantane ({"prochain_id": n}), et les ids ecrits dans le journal depuis comptent aussi.
+#Ainsi un id deja donne n'est jamais redonne a un nouveau client, meme apres un redemarrage
+def _meta_instantane(path):
+    #Lit seulement les deux premieres lignes : "[" puis le compteur (absent des fichiers ecrits avant lui)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            f.readline()
+            meta = json.loads(f.readline().rstrip().rstrip(","))
+    except (OSError, ValueError):
+        return None
+    return meta if isinstance(meta, dict) and "id" not in meta else None
+
+
+def lire_prochain_id(path):
+    prochain = 1
+    for candidat in _candidats(path):
+        meta = _meta_instantane(candidat)
+        if meta is not None:
+            prochain = max(prochain, meta.get("prochain_id", 1))
+    for op in lire_journal(path):
+        client_id = op["id"] if op["op"] == "suppr" else op["client"]["id"]
+        prochain = max(prochain, client_id + 1)
+    return prochain
+
+
+def prochain_id_a_sauvegarder(clients, deja=1):
+    #Compteur du ClientStore, ou plus grand id + 1 pour une simple liste ; jamais moins que celui deja sauvegarde
+    prochain = getattr(clients, "prochain_id", None)
+    if prochain is None:
+        prochain = max((c["id"] + 1 for c in clients), default=1)
+    return max(prochain, deja)
+
+
+#Parcours en lecture seule, un client a la fois, dans le meme ordre et avec le meme contenu que charger_clients
+#(journal compris) mais en memoire bornee : ideal pour une recherche, un total ou un export sur un gros fichier
+def iter_clients_json(path):
+    #Le journal est petit devant l'instantane : on le garde en memoire pour l'appliquer au passage.
+    #Un client supprime dans le journal (puis eventuellement recree) quitte sa place dans l'instantane
+    journal = {}
+    supprimes = set()
+    for op in lire_journal(path):
+        if op["op"] == "suppr":
+            journal.pop(op["id"], None)
+            supprimes.add(op["id"])
+        else:
+            client = client_depuis_json(op["client"])
+            journal[client["id"]] = client
+    source = _instantane_valide(path)
+    if source is not None:
+        for c in _iter_fichier(source):
+            if c["id"] in supprimes:
+                continue
+            yield journal.pop(c["id"], c)
+    #Clients crees depuis le dernier instantane
+    yield from journal.values()
+
+
+def _synchroniser_dossier(dossier):
+    #Sous Linux/Mac le renommage n'est durable qu'une fois le dossier lui meme synchronise (impossible sous Windows)
+    try:
+        fd = os.open(dossier, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def ecrire_instantane(clients, path):
+    #On cree le dossier client s'il n'existe pas
+    dossier = os.path.dirname(path)
+    #On evite les potentiels conflits si le dossiers existe deja
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    #On ecrit d'abord dans un fichier temporaire du meme dossier : si le programme s'arrete en plein milieu,
+    #clients.json n'est jamais a moitie ecrit. Un client compact par ligne (JSON valide, sans indentation).
+    #Les en-tetes sont ecrits en meme temps dans un second fichier temporaire
+    fd, temporaire = tempfile.mkstemp(dir=dossier or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    fd_entetes, temporaire_entetes = tempfile.mkstemp(dir=dossier or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        meta = json.dumps({"prochain_id" : prochain_id_a_sauvegarder(clients, lire_prochain_id(path))}).encode("utf-8")
+        with os.fdopen(fd, "wb") as f, os.fdopen(fd_entetes, "w", encoding="utf-8") as entetes:
+            f.write(b"[\n" + meta)
+            position = 2 + len(meta) #On compte les octets ecrits pour connaitre la position de chaque ligne
+            for c in clients:
+                f.write(b",\n")
+                position += 2
+                donnees = client_vers_json(c)
+                ligne = json.dumps(donnees, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                f.write(ligne)
+                total = sum(montant for _, montant in donnees["historique_achats"])
+                entete = [donnees["id"], donnees["nom"], donnees["ville"], donnees["telephone"], donnees["tags"],
+                          donnees["version"], total, position, len(ligne), donnees.get("cree")]
+                entetes.write(json.dumps(entete, ensure_ascii=False, separators=(",", ":")) + "\n")
+                position += len(ligne)
+            f.write(b"\n]\n")
+            f.flush()
+            os.fsync(f.fileno()) #On force l'ecriture sur le disque avant de remplacer l'ancien fichier
+            f.close()
+            #Derniere ligne : taille et date de l'instantane, que le renommage ne change pas. Des en-tetes qui
+            #ne correspondent pas a l'instantane (arret entre les deux renommages) sont ignores a la lecture
+            entetes.write(json.dumps({"instantane" : signature_fichiers(temporaire)[0]}) + "\n")
+        copier_mode(temporaire, path)
+        copier_mode(temporaire_entetes, chemin_entetes(path))
+    except BaseException:
+        os.remove(temporaire)
+        os.remove(temporaire_entetes)
+        raise
+    #Rotation des copies de secours : .2 -> .3, .1 -> .2, clients.json -> .1
+    for n in range(NB_SAUVEGARDES - 1, 0, -1):
+        if os.path.exists(chemin_sauvegarde(path, n)):
+            os.replace(chemin_sauvegarde(path, n), chemin_sauvegarde(path, n + 1))
+    if NB_SAUVEGARDES and os.path.exists(path):
+        os.replace(path, chemin_sauvegarde(path, 1))
+    os.replace(temporaire, path) #Renommage atomique : on voit soit l'ancien fichier soit le nouveau
+    os.replace(temporaire_entetes, chemin_entetes(path))
+    _synchroniser_dossier(dossier or ".")
+    #L'instantane contient maintenant tout : le journal n'a plus de raison d'etre
+    if os.path.exists(chemin_journal(path)):
+        os.remove(chemin_journal(path))
+
+
+#Relit l'historique des clients charges depuis les en-tetes, a leur position dans l'instantane
+class LecteurInstantane:
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature #Taille et date de l'instantane dont viennent les en-tetes
+
+    def _instantane(self):
+        #Si un autre programme a ecrit un nouvel instantane depuis, le notre a ete renomme en clients.json.1
+        #(puis .2, .3) sans changer de taille ni de date : on le retrouve ainsi
+        for candidat in _candidats(self.path):
+            if signature_fichiers(candidat)[0] == self.signature:
+                return candidat
+        return None
+
+    def _version_actuelle(self, clients):
+        #Notre instantane n'existe plus : on prend l'historique actuel du fichier (la prochaine sauvegarde ou
+        #le prochain rafraichissement remettra le reste du client a jour d'apres son numero de version)
+        warnings.warn(f"{self.path} reecrit par un autre programme, historiques relus dans la version actuelle")
+        a_lire = {c["id"] : c for c in clients}
+        for c in iter_clients_json(self.path):
+            client = a_lire.pop(c["id"], None)
+            if client is not None:
+                client.definir_historique(_historique(c))
+        for client in a_lire.values():
+            client.definir_historique([]) #Supprime par l'autre programme
+
+    def lire(self, client):
+        instantane = self._instantane()
+        if instantane is None:
+            self._version_actuelle([client])
+            return client["historique_achats"]
+        debut, longueur = client.position
+        with open(instantane, "rb") as f:
+            f.seek(debut)
+            return _historique(json.loads(f.read(longueur)))
+
+    def lire_tous(self, clients):
+        #Un seul parcours de l'instantane pour beaucoup de clients (au lieu d'une lecture par client)
+        instantane = self._instantane()
+        if instantane is None:
+            self._version_actuelle(clients)
+            return
+        a_lire = {c["id"] : c for c in clients}
+        with open(instantane, "r", encoding="utf-8") as f:
+            for c in _iter_tableau_json(f):
+                client = a_lire.pop(c.get("id"), None)
+                if client is not None:
+                    client.definir_historique(_historique(c))
+                    if not a_lire:
+                        break
+
+
+#Clients du fichier JSON sans leurs historiques (ClientParesseux), journal compris. Renvoie None si les en-tetes
+#manquent ou ne correspondent plus a l'instantane : il faut alors tout lire
+def lire_entetes(path):
+    try:
+        with open(chemin_entetes(path), "r", encoding="utf-8") as f:
+            lignes = f.readlines()
+        signature = tuple(json.loads(lignes[-1])["instantane"])
+        entetes = json.loads("[" + ",".join(lignes[:-1]) + "]") #Un seul appel au decodeur pour tout le fichier
+    except (OSError, IndexError, KeyError, TypeError, ValueError):
+        return None
+    if signature != signature_fichiers(path)[0]:
+        return None
+    lecteur = LecteurInstantane(path, signature)
+    par_id = {}
+    for client_id, nom, ville, telephone, tags, version, total, debut, longueur, *cree in entetes:
+        entete = {"id" : client_id, "nom" : nom, "ville" : ville, "telephone" : telephone, "tags" : tags, "version" : version}
+        if cree and cree[0] is not None: #Les en-tetes ecrits avant l'ajout de "cree" ont une colonne de moins
+            entete["cree"] = cree[0]
+        par_id[client_id] = ClientParesseux(entete, total, lecteur, (debut, longueur))
+    #Les clients du journal sont complets (petits et peu nombreux) : ils remplacent leur en-tete
+    return list(rejouer_journal(par_id, path).values())
+
+
+def lire_journal(path):
+    #Genere les operations du journal dans l'ordre ou elles ont ete ecrites
+    journal = chemin_journal(path)
+    if not os.path.exists(journal):
+        return
+    with open(journal, "r", encoding="utf-8") as f:
+        for ligne in f:
+            try:
+                yield json.loads(ligne)
+            except json.JSONDecodeError:
+                #Derniere ligne tronquee par un arret brutal : l'operation n'a jamais ete confirmee
+                continue
+
+
+def _couper_ligne_tronquee(f):
+    #Si le journal ne finit pas par un retour a la ligne, sa derniere ligne a ete coupee par un arret brutal :
+    #on l'enleve, sinon la prochaine operation serait collee derriere et ignoree avec elle a la lecture
+    fin = f.seek(0, os.SEEK_END)
+    if fin == 0:
+        return
+    f.seek(fin - 1)
+    if f.read(1) == b"\n":
+        return
+    position = fin
+    while position > 0: #On remonte par blocs jusqu'au retour a la ligne precedent
+        debut = max(0, position - 4096)
+        f.seek(debut)
+        bloc = f.read(position - debut)
+        retour = bloc.rfind(b"\n")
+        if retour >= 0:
+            f.truncate(debut + retour + 1)
+            return
+        position = debut
+    f.truncate(0)
+
+
+def ajouter_au_journal(operations, path):
+    #Une ligne compacte par operation, ecrite a la fin du fichier : le cout depend du changement, pas de la base
+    lignes = [json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n" for op in operations]
+    if not lignes:
+        return
+    with open(chemin_journal(path), "a+b") as f:
+        _couper_ligne_tronquee(f)
+        f.write("".join(lignes).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def rejouer_journal(par_id, path):
+    #Applique le journal sur un dict id -> client (ordre d'insertion conserve)
+    for op in lire_journal(path):
+        if op["op"] == "suppr":
+            par_id.pop(op["id"], None)
+        else:
+            client = client_depuis_json(op["client"])
+            par_id[client["id"]] = client #Un id deja present garde sa place, un nouveau va a la fin
+    return par_id
+
+
+def journal_a_compacter(path):
+    journal = chemin_journal(path)
+    if not os.path.exists(journal):
+        return False
+    taille = os.path.getsize(journal)
+    base = os.path.getsize(path) if os.path.exists(path) else 0
+    return taille >= TAILLE_MIN_COMPACTION and taille > RATIO_COMPACTION * base
+
+
+#Chaque format de stockage offre les memes operations :
+# - lire(path) : liste complete des clients (historiques en tuples)
+# - lire_entetes(path) : clients sans historique (ClientParesseux), ou None si ce n'est pas possible
+# - iterer(path) : generateur de clients en memoire bornee
+# - ecrire(clients, path) : reecriture complete
+# - ecrire_operations(operations, path, journal) : sauvegarde des seuls clients modifies ; renvoie False
+#   quand une reecriture complete est necessaire a la place
+# - signature(path) : change des qu'un programme a ecrit dans le stockage
+# - prochain_id(path) : compteur d'ids sauvegarde (plus grand id jamais donne + 1)
+class StockageJSON:
+
+    def lire(self, path):
+        par_id = {}
+        for c in lire_instantane(path):
+            par_id[c["id"]] = c
+        #On rejoue ensuite les modifications ecrites dans le journal depuis le dernier instantane
+        return list(rejouer_journal(par_id, path).values())
+
+    def lire_entetes(self, path):
+        return lire_entetes(path)
+
+    def iterer(self, path):
+        return iter_clients_json(path)
+
+    def ecrire(self, clients, path):
+        ecrire_instantane(clients, path)
+
+    def ecrire_operations(self, operations, path, journal):
+        #Sans journal, le JSON ne sait que se reecrire en entier
+        if not journal or not os.path.exists(path):
+            return False
+        ajouter_au_journal(operations, path)
+        return not journal_a_compacter(path)
+
+    def signature(self, path):
+        return signature_fichiers(path, chemin_journal(path))
+
+    def prochain_id(self, path):
+        return lire_prochain_id(path)
+
+
+FORMATS = {
+    ".json" : "json",
+    ".db" : "sqlite",
+    ".sqlite" : "sqlite",
+    ".sqlite3" : "sqlite",
+    }
+
+
+def choisir_stockage(path, format=None):
+    #Le format est donne explicitement ("json" ou "sqlite") ou deduit de l'extension ; JSON par defaut
+    if format is None:
+        format = FORMATS.get(os.path.splitext(path)[1].lower(), "json")
+    if format == "json":
+        return StockageJSON()
+    if format == "sqlite":
+        from stockage_sqlite import StockageSQLite #Import tardif : stockage_sqlite importe ce module
+        return StockageSQLite()
+    raise ValueError(f"Format de stockage inconnu : {format}")
+
+
+def iter_clients(path, format=None):
+    return choisir_stockage(path, format).iterer(path)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stockage des clients dans une base SQLite locale (module sqlite3 de la bibliotheque standard)
+"""
+
+import os
+import sqlite3
+import warnings
+
+from stockage import signature_fichiers, prochain_id_a_sauvegarder, ClientParesseux
+
+
+#Tables normalisees : un client par ligne, ses tags et ses achats dans des tables a part.
+#rang garde l'ordre de la liste (un client modifie garde sa place, un nouveau va a la fin).
+#meta garde le compteur d'ids (cle "prochain_id") : un id supprime n'est pas redonne apres un redemarrage
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY,
+    rang INTEGER NOT NULL,
+    nom TEXT NOT NULL,
+    ville TEXT NOT NULL,
+    telephone TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    cree TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    client_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS achats (
+    client_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    montant INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    cle TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_clients_rang ON clients (rang);
+CREATE INDEX IF NOT EXISTS idx_clients_nom ON clients (nom);
+CREATE INDEX IF NOT EXISTS idx_clients_ville ON clients (ville);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags (tag);
+CREATE INDEX IF NOT EXISTS idx_tags_client ON tags (client_id, position);
+CREATE INDEX IF NOT EXISTS idx_achats_client ON achats (client_id, position);
+"""
+
+
+def connecter(path):
+    dossier = os.path.dirname(path)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    connexion = sqlite3.connect(path)
+    connexion.executescript(SCHEMA)
+    #Base creee avant l'ajout des numeros de version ou de la date de creation : on ajoute les colonnes
+    colonnes = {ligne[1] for ligne in connexion.execute("PRAGMA table_info(clients)")}
+    if "version" not in colonnes:
+        with connexion:
+            connexion.execute("ALTER TABLE clients ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    if "cree" not in colonnes:
+        with connexion:
+            connexion.execute("ALTER TABLE clients ADD COLUMN cree TEXT")
+    return connexion
+
+
+def _inserer_details(connexion, c):
+    connexion.executemany(
+        "INSERT INTO tags (client_id, position, tag) VALUES (?, ?, ?)",
+        [(c["id"], i, tag) for i, tag in enumerate(c.get("tags", []))])
+    connexion.executemany(
+        "INSERT INTO achats (client_id, position, date, montant) VALUES (?, ?, ?, ?)",
+        [(c["id"], i, date, montant) for i, (date, montant) in enumerate(c.get("historique_achats", []))])
+
+
+def _lire_prochain_id(connexion):
+    #Compteur sauvegarde, ou plus grand id + 1 pour une base ecrite avant lui
+    ligne = connexion.execute("SELECT valeur FROM meta WHERE cle = 'prochain_id'").fetchone()
+    (dernier,) = connexion.execute("SELECT COALESCE(MAX(id), 0) FROM clients").fetchone()
+    return max(ligne[0] if ligne else 1, dernier + 1)
+
+
+def _noter_prochain_id(connexion, prochain):
+    #Le compteur ne fait que monter
+    connexion.execute(
+        "INSERT INTO meta (cle, valeur) VALUES ('prochain_id', ?) "
+        "ON CONFLICT (cle) DO UPDATE SET valeur = MAX(valeur, excluded.valeur)", (prochain,))
+
+
+def _supprimer_details(connexion, client_id):
+    connexion.execute("DELETE FROM tags WHERE client_id = ?", (client_id,))
+    connexion.execute("DELETE FROM achats WHERE client_id = ?", (client_id,))
+
+
+def _client(ligne, tags, achats):
+    client_id, nom, ville, telephone, version, cree = ligne
+    c = {
+        "id" : client_id,
+        "nom" : nom,
+        "ville" : ville,
+        "telephone" : telephone,
+        "tags" : tags,
+        "historique_achats" : achats,
+        "version" : version
+        }
+    if cree is not None: #Meme forme que le JSON : pas de cle "cree" pour les clients qui n'en ont pas
+        c["cree"] = cree
+    return c
+
+
+#Relit l'historique des clients charges sans (chargement paresseux) grace a l'index sur achats.client_id
+class LecteurSQLite:
+
+    def __init__(self, path):
+        self.path = path
+        self.versions = {} #Version de chaque client au chargement (la version en memoire augmente avec nos modifications)
+
+    def _verifier_version(self, client, version):
+        if version != self.versions.get(client["id"], client["version"]):
+            #Modifie par un autre programme depuis le chargement : la prochaine sauvegarde ou le prochain
+            #rafraichissement remettra le reste du client a jour d'apres son numero de version
+            warnings.warn(f"Client {client['id']} modifie par un autre programme, historique relu dans sa version actuelle")
+
+    def lire(self, client):
+        connexion = connecter(self.path)
+        try:
+            ligne = connexion.execute("SELECT version FROM clients WHERE id = ?", (client["id"],)).fetchone()
+            achats = connexion.execute("SELECT date, montant FROM achats WHERE client_id = ? ORDER BY position", (client["id"],)).fetchall()
+        finally:
+            connexion.close()
+        self._verifier_version(client, ligne[0] if ligne else None)
+        return sorted(achats, key=lambda achat: achat[0])
+
+    def lire_tous(self, clients):
+        #Une seule lecture de la table des achats pour beaucoup de clients
+        a_lire = {c["id"] : c for c in clients}
+        historiques = {client_id : [] for client_id in a_lire}
+        connexion = connecter(self.path)
+        try:
+            versions = dict(connexion.execute("SELECT id, version FROM clients"))
+            for client_id, date, montant in connexion.execute("SELECT client_id, date, montant FROM achats ORDER BY client_id, position"):
+                if client_id in historiques:
+                    historiques[client_id].append((date, montant))
+        finally:
+            connexion.close()
+        for client_id, c in a_lire.items():
+            self._verifier_version(c, versions.get(client_id))
+            c.definir_historique(sorted(historiques[client_id], key=lambda achat: achat[0]))
+
+
+class StockageSQLite:
+
+    def lire(self, path):
+        if not os.path.exists(path):
+            return []
+        connexion = connecter(path)
+        try:
+            #Trois lectures completes regroupees par client plutot qu'une requete par client
+            tags = {}
+            for client_id, tag in connexion.execute("SELECT client_id, tag FROM tags ORDER BY client_id, position"):
+                tags.setdefault(client_id, []).append(tag)
+            achats = {}
+            for client_id, date, montant in connexion.execute("SELECT client_id, date, montant FROM achats ORDER BY client_id, position"):
+                achats.setdefault(client_id, []).append((date, montant))
+            lignes = connexion.execute("SELECT id, nom, ville, telephone, version, cree FROM clients ORDER BY rang")
+            return [_client(ligne, tags.get(ligne[0], []), achats.get(ligne[0], [])) for ligne in lignes]
+        finally:
+            connexion.close()
+
+    def lire_entetes(self, path):
+        #Clients sans historique : le total vient d'une somme calculee par SQLite, les achats restent sur le disque
+        if not os.path.exists(path):
+            return None
+        connexion = connecter(path)
+        try:
+            tags = {}
+            for client_id, tag in connexion.execute("SELECT client_id, tag FROM tags ORDER BY client_id, position"):
+                tags.setdefault(client_id, []).append(tag)
+            totaux = dict(connexion.execute("SELECT client_id, SUM(montant) FROM achats GROUP BY client_id"))
+            lecteur = LecteurSQLite(path)
+            clients = []
+            for client_id, nom, ville, telephone, version, cree in connexion.execute("SELECT id, nom, ville, telephone, version, cree FROM clients ORDER BY rang"):
+                entete = {"id" : client_id, "nom" : nom, "ville" : ville, "telephone" : telephone,
+                          "tags" : tags.get(client_id, []), "version" : version}
+                if cree is not None:
+                    entete["cree"] = cree
+                lecteur.versions[client_id] = version
+                clients.append(ClientParesseux(entete, totaux.get(client_id, 0), lecteur))
+            return clients
+        finally:
+            connexion.close()
+
+    def iterer(self, path):
+        if not os.path.exists(path):
+            return
+        connexion = connecter(path)
+        try:
+            #Un client a la fois : ses tags et achats sont lus grace aux index sur client_id
+            for ligne in connexion.execute("SELECT id, nom, ville, telephone, version, cree FROM clients ORDER BY rang"):
+                tags = [t for (t,) in connexion.execute("SELECT tag FROM tags WHERE client_id = ? ORDER BY position", (ligne[0],))]
+                achats = connexion.execute("SELECT date, montant FROM achats WHERE client_id = ? ORDER BY position", (ligne[0],)).fetchall()
+                yield _client(ligne, tags, achats)
+        finally:
+            connexion.close()
+
+    def ecrire(self, clients, path):
+        connexion = connecter(path)
+        try:
+            with connexion: #Une seule transaction : en cas d'erreur la base garde son ancien contenu
+                _noter_prochain_id(connexion, prochain_id_a_sauvegarder(clients, _lire_prochain_id(connexion)))
+                connexion.execute("DELETE FROM clients")
+                connexion.execute("DELETE FROM tags")
+                connexion.execute("DELETE FROM achats")
+                for rang, c in enumerate(clients):
+                    connexion.execute(
+                        "INSERT INTO clients (id, rang, nom, ville, telephone, version, cree) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (c["id"], rang, c["nom"], c["ville"], c["telephone"], c.get("version", 1), c.get("cree")))
+                    _inserer_details(connexion, c)
+        finally:
+            connexion.close()
+
+    def ecrire_operations(self, operations, path, journal):
+        #SQLite sait mettre a jour ligne par ligne : seuls les clients touches sont reecrits
+        if not os.path.exists(path):
+            return False
+        connexion = connecter(path)
+        try:
+            with connexion:
+                for op in operations:
+                    _noter_prochain_id(connexion, (op["id"] if op["op"] == "suppr" else op["client"]["id"]) + 1)
+                    if op["op"] == "suppr":
+                        connexion.execute("DELETE FROM clients WHERE id = ?", (op["id"],))
+                        _supprimer_details(connexion, op["id"])
+                        continue
+                    c = op["client"]
+                    connexion.execute(
+                        "INSERT INTO clients (id, rang, nom, ville, telephone, version, cree) "
+                        "VALUES (?, (SELECT COALESCE(MAX(rang), -1) + 1 FROM clients), ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET nom = excluded.nom, ville = excluded.ville, "
+                        "telephone = excluded.telephone, version = excluded.version, cree = excluded.cree",
+                        (c["id"], c["nom"], c["ville"], c["telephone"], c["version"], c.get("cree")))
+                    _supprimer_details(connexion, c["id"])
+                    _inserer_details(connexion, c)
+        finally:
+            connexion.close()
+        return True
+
+    def signature(self, path):
+        return signature_fichiers(path, path + "-wal")
+
+    def prochain_id(self, path):
+        if not os.path.exists(path):
+            return 1
+        connexion = connecter(path)
+        try:
+            return _lire_prochain_id(connexion)
+        finally:
+            connexion.close()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Configuration commune des tests et base de test partagee (lancer depuis la racine du projet : python -m pytest)
+"""
+
+import os
+import sys
+
+import pytest
+
+#Comme pour les benchmarks : les modules de src/ deviennent importables
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+from services import charger_clients, sauvegarder_clients, ajouter_client, ajouter_achat
+
+
+#Nom du fichier de la base de test : un test le remplace par
+#@pytest.mark.parametrize("nom_base", ["clients.json", "clients.db"]) pour passer aussi par SQLite
+@pytest.fixture
+def nom_base():
+    return "clients.json"
+
+
+@pytest.fixture
+def _base_sauvegardee(tmp_path, nom_base):
+    path = str(tmp_path / nom_base)
+    clients = charger_clients(path)
+    ajouter_client(clients, "Jean Mbarga", "Yaoundé", "677000001", ["vip"])
+    ajouter_client(clients, "Awa Bello", "Douala", "699000002", [])
+    ajouter_client(clients, "Éric Ngo", "Kribi", "655000003", ["fidèle"])
+    ajouter_achat(clients, 1, "2026-01-10", 1000)
+    ajouter_achat(clients, 1, "2026-02-10", 2000)
+    ajouter_achat(clients, 3, "2026-02-11", 3000)
+    sauvegarder_clients(clients, path)
+    return path, [dict(c) for c in clients]
+
+
+#Base commune des tests : trois clients (Awa, le 2, sans achat) sauvegardes une fois
+@pytest.fixture
+def base(_base_sauvegardee):
+    return _base_sauvegardee[0]
+
+
+#Les memes clients tels qu'ils etaient en memoire au moment de la sauvegarde
+@pytest.fixture
+def clients_base(_base_sauvegardee):
+    return _base_sauvegardee[1]
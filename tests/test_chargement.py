@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Chargement complet ou paresseux, en JSON et en SQLite : on doit retrouver les memes clients
+que ceux qu'on a sauvegardes
+"""
+
+import warnings
+
+import pytest
+
+from services import (
+    charger_clients, sauvegarder_clients, migrer_clients, charger_clients_compacts, ajouter_achat,
+    modifier_client, supprimer_client, total_depense_client, total_general_depenses, achats_entre
+)
+from stockage import ClientParesseux, iter_clients
+
+
+@pytest.mark.parametrize("nom_base", ["clients.json", "clients.db"])
+def test_relecture_identique(base, clients_base):
+    assert [dict(c) for c in charger_clients(base)] == clients_base
+    assert list(iter_clients(base)) == clients_base
+    assert [c.vers_dict() for c in charger_clients_compacts(base)] == clients_base
+
+
+@pytest.mark.parametrize("nom_base", ["clients.json", "clients.db"])
+def test_chargement_paresseux(base, clients_base):
+    clients = charger_clients(base, paresseux=True)
+    assert all(isinstance(c, ClientParesseux) and not c.historique_lu for c in clients)
+    #Les totaux viennent des en-tetes, sans lire les historiques
+    assert total_general_depenses(clients) == 6000
+    assert total_depense_client(clients.get(1), clients) == 3000
+    assert not clients.get(1).historique_lu
+    assert clients.get(1)["historique_achats"] == clients_base[0]["historique_achats"]
+    assert clients.get(1).historique_lu and not clients.get(3).historique_lu
+    assert [{**c, "historique_achats" : c["historique_achats"]} for c in clients] == clients_base
+
+
+@pytest.mark.parametrize("nom_base", ["clients.json", "clients.db"])
+def test_modifications_paresseuses_sauvegardees(base):
+    clients = charger_clients(base, paresseux=True)
+    ajouter_achat(clients, 3, "2026-04-01", 200)
+    modifier_client(clients, 2, ville="Garoua")
+    supprimer_client(clients, 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error") #Nos propres modifications ne sont pas celles d'un autre programme
+        assert sauvegarder_clients(clients, base, journal=True) == []
+    relus = charger_clients(base)
+    assert [c["id"] for c in relus] == [2, 3]
+    assert relus.get(2)["ville"] == "Garoua"
+    assert achats_entre(relus, "2026-01-01", "2026-12-31") == [("2026-02-11", 3, 3000), ("2026-04-01", 3, 200)]
+
+
+def test_migration_json_sqlite_aller_retour(base, clients_base, tmp_path):
+    sqlite, retour = str(tmp_path / "clients.db"), str(tmp_path / "retour.json")
+    assert migrer_clients(base, sqlite) == 3
+    assert migrer_clients(sqlite, retour) == 3
+    assert [dict(c) for c in charger_clients(retour)] == clients_base
+
+
+def test_format_inconnu(tmp_path):
+    with pytest.raises(ValueError):
+        charger_clients(str(tmp_path / "clients.json"), format="xml")
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Diagnostics : decorateur instrumente, interrupteur GESTIONNAIRE_DIAGNOSTICS et profil cProfile
+"""
+
+import os
+import sys
+import json
+import pstats
+import subprocess
+
+import diagnostics
+
+SRC_DIR = os.path.dirname(os.path.abspath(diagnostics.__file__))
+
+
+def test_instrumente_mesure_les_appels(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ACTIF", True)
+    monkeypatch.setattr(diagnostics, "_mesures", {})
+
+    @diagnostics.instrumente
+    def compter(clients):
+        return len(clients)
+
+    assert compter.__name__ == "compter"
+    compter([1, 2, 3])
+    compter([1, 2, 3, 4])
+    (nom, appels, cumul, moyenne, maximum, taille), = diagnostics.statistiques()
+    assert (nom, appels, taille) == ("compter", 2, 4)
+    assert cumul >= maximum >= moyenne >= 0
+
+
+def test_exception_comptee(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ACTIF", True)
+    monkeypatch.setattr(diagnostics, "_mesures", {})
+
+    @diagnostics.instrumente
+    def echouer(clients):
+        raise KeyError("Client introuvable")
+
+    try:
+        echouer([])
+    except KeyError:
+        pass
+    assert [ligne[:2] for ligne in diagnostics.statistiques()] == [("echouer", 1)]
+
+
+def test_desactive_sans_surcout(monkeypatch):
+    monkeypatch.setattr(diagnostics, "ACTIF", False)
+
+    def fonction():
+        pass
+
+    assert diagnostics.instrumente(fonction) is fonction
+
+
+def _lancer(code, **environnement):
+    env = {cle : valeur for cle, valeur in os.environ.items() if not cle.startswith("GESTIONNAIRE_")}
+    env.update(PYTHONPATH=SRC_DIR, **environnement)
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+
+
+CODE = """
+import json, diagnostics
+from services import ajouter_client, trouver_client
+clients = []
+ajouter_client(clients, "Jean", "Douala", "677000001", [])
+trouver_client(clients, 1)
+print(json.dumps([ligne[:2] for ligne in diagnostics.statistiques()]))
+"""
+
+
+def test_variable_d_environnement():
+    actif = json.loads(_lancer(CODE, GESTIONNAIRE_DIAGNOSTICS="1").stdout)
+    assert sorted(actif) == [["ajouter_client", 1], ["trouver_client", 1]]
+    assert json.loads(_lancer(CODE, GESTIONNAIRE_DIAGNOSTICS="0").stdout) == []
+
+
+def test_profil_ecrit_en_quittant(tmp_path):
+    chemin = str(tmp_path / "session.prof")
+    resultat = _lancer(CODE, GESTIONNAIRE_PROFIL=chemin)
+    assert chemin in resultat.stderr
+    fonctions = {nom for _, _, nom in pstats.Stats(chemin).stats}
+    assert {"ajouter_client", "trouver_client"} <= fonctions
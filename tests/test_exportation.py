@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Extraits pour la comptabilite : tables, formats, filtres et mode incremental
+"""
+
+import csv
+import json
+
+import pytest
+
+from exportation import extraire, lire_colonnes
+from services import charger_clients, sauvegarder_clients, ajouter_client, ajouter_achat, modifier_client, supprimer_client
+
+
+def _csv(chemin):
+    with open(chemin, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_formats_identiques(base, tmp_path):
+    extraire(base, str(tmp_path / "a.csv"), "achats")
+    extraire(base, str(tmp_path / "a.jsonl"), "achats")
+    extraire(base, str(tmp_path / "a.colonnes"), "achats")
+    lignes_csv = _csv(tmp_path / "a.csv")
+    with open(tmp_path / "a.jsonl", encoding="utf-8") as f:
+        lignes_jsonl = [json.loads(ligne) for ligne in f]
+    lignes_colonnes = list(lire_colonnes(str(tmp_path / "a.colonnes")))
+    assert [l["montant"] for l in lignes_csv] == ["1000", "2000", "3000"]
+    assert lignes_jsonl == lignes_colonnes
+    assert [l["date"] for l in lignes_jsonl] == [l["date"] for l in lignes_csv]
+
+
+def test_filtres(base, tmp_path):
+    sortie = str(tmp_path / "c.csv")
+    extraire(base, sortie, "clients", villes=["yaounde"], tags=["VIP"])
+    assert [l["nom"] for l in _csv(sortie)] == ["Jean Mbarga"]
+    extraire(base, sortie, "clients", debut="2026-02-01", fin="2026-02-28")
+    assert [(l["id"], l["nb_achats"], l["total_depense"]) for l in _csv(sortie)] == [("1", "1", "2000"), ("3", "1", "3000")]
+
+
+def test_incremental(base, tmp_path):
+    repere = str(tmp_path / "achats.repere")
+    sortie = str(tmp_path / "a.csv")
+    assert extraire(base, sortie, "achats", repere=repere)["lignes"] == 3
+    assert extraire(base, sortie, "achats", repere=repere)["lignes"] == 0
+    clients = charger_clients(base)
+    ajouter_achat(clients, 1, "2025-12-31", 500) #Achat saisi en retard, date anterieure aux autres
+    ajouter_achat(clients, 3, "2026-02-11", 700) #Meme jour qu'un achat deja exporte
+    sauvegarder_clients(clients, base, journal=True)
+    assert extraire(base, sortie, "achats", repere=repere)["lignes"] == 2
+    assert [(l["client_id"], l["montant"]) for l in _csv(sortie)] == [("1", "500"), ("3", "700")]
+
+    repere_clients = str(tmp_path / "clients.repere")
+    extraire(base, sortie, "clients", repere=repere_clients)
+    clients = charger_clients(base)
+    modifier_client(clients, 2, ville="Kribi")
+    sauvegarder_clients(clients, base, journal=True)
+    extraire(base, sortie, "clients", repere=repere_clients)
+    assert [l["ville"] for l in _csv(sortie)] == ["Kribi"]
+    with pytest.raises(ValueError):
+        extraire(base, sortie, "clients", repere=repere) #Repere d'une autre table
+
+
+@pytest.mark.parametrize("table", ["clients", "achats"])
+def test_incremental_id_repris_par_un_nouveau_client(base, tmp_path, table):
+    repere = str(tmp_path / f"{table}.repere")
+    sortie = str(tmp_path / "c.csv")
+    extraire(base, sortie, table, repere=repere)
+    clients = charger_clients(base)
+    supprimer_client(clients, 3) #Le client au plus grand id
+    sauvegarder_clients(clients, base)
+    clients = charger_clients(base)
+    nouveau = ajouter_client(clients, "Paul Ngo", "Kribi", "622000005", [])
+    ajouter_achat(clients, nouveau["id"], "2026-02-11", 3000) #Meme jour et montant que l'achat du client supprime
+    sauvegarder_clients(clients, base)
+    assert extraire(base, sortie, table, repere=repere)["lignes"] == 1
+    assert [l.get("nom") for l in _csv(sortie)] == ["Paul Ngo"]
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Deux programmes sur le meme fichier : versions, fusion a la sauvegarde et conflits signales
+"""
+
+import pytest
+
+from services import (
+    charger_clients, sauvegarder_clients, rafraichir_clients, ajouter_client, modifier_client,
+    ajouter_achat, ConflitVersion, ClientRenumerote
+)
+
+
+def test_achats_des_deux_cotes_additionnes(base):
+    a, b = charger_clients(base), charger_clients(base)
+    ajouter_achat(a, 2, "2026-02-01", 1000)
+    ajouter_achat(b, 2, "2026-02-02", 2000)
+    assert sauvegarder_clients(a, base, journal=True) == []
+    assert sauvegarder_clients(b, base, journal=True) == []
+    assert charger_clients(base).get(2)["historique_achats"] == [("2026-02-01", 1000), ("2026-02-02", 2000)]
+
+
+def test_modification_concurrente_signalee(base):
+    a, b = charger_clients(base), charger_clients(base)
+    modifier_client(a, 1, ville="Douala")
+    modifier_client(b, 1, ville="Kribi")
+    assert sauvegarder_clients(a, base, journal=True) == []
+    assert sauvegarder_clients(b, base, journal=True) == [1]
+    assert charger_clients(base).get(1)["ville"] == "Douala"
+    assert b.get(1)["ville"] == "Douala"
+
+
+def test_version_attendue(base):
+    clients = charger_clients(base)
+    with pytest.raises(ConflitVersion):
+        modifier_client(clients, 1, ville="Kribi", version=5)
+    assert clients.get(1)["ville"] == "Yaoundé"
+
+
+def test_nouvel_id_signale(base):
+    a, b = charger_clients(base), charger_clients(base)
+    ajouter_client(a, "Marie Atangana", "Douala", "699000004", [])
+    client_b = ajouter_client(b, "Paul Ngo", "Kribi", "622000005", [])
+    assert sauvegarder_clients(a, base, journal=True) == []
+    assert sauvegarder_clients(b, base, journal=True) == [ClientRenumerote(4, 5)]
+    assert client_b["id"] == 5
+    relu = charger_clients(base)
+    assert [(c["id"], c["nom"]) for c in relu][3:] == [(4, "Marie Atangana"), (5, "Paul Ngo")]
+
+
+def test_rafraichir_signale_aussi(base):
+    a, b = charger_clients(base), charger_clients(base)
+    ajouter_client(a, "Marie Atangana", "Douala", "699000004", [])
+    ajouter_client(b, "Paul Ngo", "Kribi", "622000005", [])
+    sauvegarder_clients(a, base, journal=True)
+    assert rafraichir_clients(b, base) == [ClientRenumerote(4, 5)]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Import en lot : doublons par numero de telephone et rejet des lignes invalides sans arreter l'import
+"""
+
+from importation import importer_dans, lire_lignes
+from services import ClientStore, ajouter_client
+
+
+def test_lignes_invalides_rejetees(tmp_path):
+    source = tmp_path / "flux.jsonl"
+    source.write_text("\n".join([
+        '{"nom": "Jean", "ville": "Yaoundé", "telephone": "677000001", "historique_achats": 5}',
+        '{"nom": 5, "ville": "Douala", "telephone": "677000002"}',
+        '{"nom": "Awa", "ville": "Douala", "telephone": "677000003", "tags": 3}',
+        '{"nom": "Paul", "ville": "Kribi", "telephone": "677000004", "historique_achats": [["2026-02-01", "x"]]}',
+        'pas du json',
+        '{"nom": "Eric", "ville": "Garoua", "telephone": "677000005", "historique_achats": [["2026-02-01", 500]]}',
+        ]), encoding="utf-8")
+    clients = ClientStore()
+    rapport = importer_dans(clients, lire_lignes(str(source)))
+    assert rapport["lignes"] == 6
+    assert [numero for numero, _ in rapport["rejets"]] == [1, 2, 3, 4, 5]
+    assert [c["nom"] for c in clients] == ["Eric"]
+    assert rapport["achats_ajoutes"] == 1
+
+
+def test_doublons_par_numero_normalise(tmp_path):
+    source = tmp_path / "flux.csv"
+    source.write_text("\n".join([
+        "nom,ville,telephone,tags,date,montant",
+        "Paul Ngo,Kribi,677 00 00 01,,2026-02-01,1000",
+        "Autre,Douala,+237 699 00 00 02,,2026-02-02,2000",
+        ",,699000002,,2026-02-03,3000",
+        ]), encoding="utf-8")
+    for clients in (ClientStore(), []):
+        ajouter_client(clients, "Jean Mbarga", "Yaoundé", "677000001", [])
+        rapport = importer_dans(clients, lire_lignes(str(source)))
+        assert rapport["rejets"] == []
+        assert rapport["clients_ajoutes"] == 1
+        assert [c["telephone"] for c in clients] == ["677000001", "699000002"]
+        assert [len(c["historique_achats"]) for c in clients] == [1, 2]
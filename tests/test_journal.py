@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Journal des modifications (stockage JSON) : ajout, relecture et reprise apres un arret brutal
+"""
+
+from services import charger_clients, sauvegarder_clients, modifier_client, ajouter_achat
+from stockage import chemin_journal, lire_journal
+
+
+def test_journal_relu_au_chargement(base):
+    clients = charger_clients(base)
+    modifier_client(clients, 1, ville="Kribi")
+    ajouter_achat(clients, 2, "2026-02-01", 15000)
+    assert sauvegarder_clients(clients, base, journal=True) == []
+    assert [op["op"] for op in lire_journal(base)] == ["modif", "achat"]
+    relu = charger_clients(base)
+    assert relu.get(1)["ville"] == "Kribi"
+    assert relu.get(2)["historique_achats"] == [("2026-02-01", 15000)]
+
+
+def test_ligne_tronquee_coupee_avant_ajout(base):
+    clients = charger_clients(base)
+    modifier_client(clients, 1, ville="Kribi")
+    sauvegarder_clients(clients, base, journal=True)
+    #Arret brutal pendant l'ecriture : la ligne de la modification est coupee en plein milieu
+    with open(chemin_journal(base), "rb") as f:
+        contenu = f.read()
+    with open(chemin_journal(base), "wb") as f:
+        f.write(contenu[:-20])
+
+    clients = charger_clients(base)
+    assert clients.get(1)["ville"] == "Yaoundé" #Modification jamais confirmee
+    ajouter_achat(clients, 2, "2026-02-01", 15000)
+    assert sauvegarder_clients(clients, base, journal=True) == []
+
+    relu = charger_clients(base)
+    assert relu.get(2)["historique_achats"] == [("2026-02-01", 15000)]
+    with open(chemin_journal(base), "rb") as f:
+        assert f.read().endswith(b"\n")
+    assert [op["op"] for op in lire_journal(base)] == ["achat"]
+
+
+def test_journal_reduit_a_une_ligne_tronquee(base):
+    with open(chemin_journal(base), "wb") as f:
+        f.write(b'{"op":"modif","client":{"id":1')
+    clients = charger_clients(base)
+    ajouter_achat(clients, 2, "2026-02-01", 500)
+    sauvegarder_clients(clients, base, journal=True)
+    assert charger_clients(base).get(2)["historique_achats"] == [("2026-02-01", 500)]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Mode parallele : avec le pool de processus force (SEUIL_PARALLELE = 0), memes resultats que les fonctions
+sequentielles de services.py, dans le meme ordre
+"""
+
+import json
+
+import pytest
+
+import parallele
+from cli import main
+from parallele import valider_parallele, totaux_paralleles, rechercher_par_nom_parallele, rechercher_par_ville_parallele
+from services import (
+    sauvegarder_clients, valider_client, total_depense_client, total_general_depenses,
+    rechercher_par_nom, rechercher_par_ville
+)
+
+
+@pytest.fixture
+def clients():
+    villes = ["Yaoundé", "Douala", "Kribi"]
+    return [{"id" : i, "nom" : f"Client {i} {'Mbarga' if i % 3 else 'Bello'}", "ville" : villes[i % 3],
+             "telephone" : "677000000" if i % 7 else "12345", "tags" : [],
+             "historique_achats" : [("2026-01-01", i * 10), ("2026-13-01" if i % 11 == 0 else "2026-02-01", i)],
+             "version" : 1} for i in range(1, 60)]
+
+
+@pytest.fixture(autouse=True)
+def pool_force(monkeypatch):
+    monkeypatch.setattr(parallele, "SEUIL_PARALLELE", 0)
+
+
+def test_valider(clients):
+    attendus = [(c["id"], valider_client(c)) for c in clients if valider_client(c)]
+    assert attendus
+    assert valider_parallele(clients, workers=2, taille_bloc=7) == attendus
+
+
+def test_totaux(clients):
+    totaux, total = totaux_paralleles(clients, workers=2, taille_bloc=7)
+    assert totaux == {c["id"] : total_depense_client(c) for c in clients}
+    assert total == total_general_depenses(clients)
+
+
+def test_recherche(clients):
+    for requete in ("bello", " MBARGA ", "client 1", "introuvable"):
+        assert rechercher_par_nom_parallele(clients, requete, workers=2, taille_bloc=7) == rechercher_par_nom(clients, requete)
+    for requete in ("douala", "y"):
+        trouves = rechercher_par_ville_parallele(clients, requete, workers=2, taille_bloc=7)
+        assert trouves == rechercher_par_ville(clients, requete)
+        assert all(any(t is c for c in clients) for t in trouves) #Les clients d'origine, pas des copies
+
+
+def _sortie(capsys, argv):
+    assert main(argv) == 0
+    return json.loads(capsys.readouterr().out)
+
+
+@pytest.mark.parametrize("commande", [["chercher", "--nom", "bello"], ["chercher", "--ville", "kribi"],
+                                      ["trier", "depenses"], ["trier", "depenses", "--limite", "5"]])
+def test_commandes_avec_workers(clients, tmp_path, capsys, commande):
+    path = str(tmp_path / "clients.json")
+    sauvegarder_clients(clients, path)
+    argv = ["--data", path] + commande + ["--json"]
+    assert _sortie(capsys, argv + ["--workers", "2"]) == _sortie(capsys, argv)
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Recherches : exacte (index trigrammes), par tags, par telephone et approchee, comparees a la simple liste
+"""
+
+import json
+
+import pytest
+
+import indexation
+from indexation import distance_dans, distance_max
+from services import (
+    ClientStore, ajouter_client, rechercher_par_nom, rechercher_par_ville, rechercher_par_tags,
+    rechercher_par_nom_approx, rechercher_par_ville_approx, rechercher_par_telephone, sauvegarder_clients
+)
+from cli import main
+
+CLIENTS = [
+    ("Jean Mbarga", "Yaoundé", "677000001", ["vip", "Fidèle"]),
+    ("Awa Bello", "Douala", "699000002", ["whatsapp"]),
+    ("Éric Fotso", "Bafoussam", "655000003", ["vip"]),
+    ("Paul Ngo", "Kribi", "622000004", []),
+    ]
+
+
+def _bases():
+    liste, store = [], ClientStore()
+    for clients in (liste, store):
+        for nom, ville, telephone, tags in CLIENTS:
+            ajouter_client(clients, nom, ville, telephone, tags)
+    return liste, store
+
+
+def _noms(clients):
+    return [c["nom"] for c in clients]
+
+
+@pytest.mark.parametrize("requete", ["mba", "a", "BE", "o", " ngo ", "zzz", "éric"])
+def test_recherche_exacte_comme_la_liste(requete):
+    liste, store = _bases()
+    assert _noms(rechercher_par_nom(store, requete)) == _noms(rechercher_par_nom(liste, requete))
+    assert _noms(rechercher_par_ville(store, requete)) == _noms(rechercher_par_ville(liste, requete))
+
+
+def test_tags_et_telephone():
+    liste, store = _bases()
+    for clients in (liste, store):
+        assert _noms(rechercher_par_tags(clients, tous=["VIP"], sauf=["fidele"])) == ["Éric Fotso"]
+        assert _noms(rechercher_par_tags(clients, un_de=["whatsapp", "fidèle"])) == ["Jean Mbarga", "Awa Bello"]
+        assert rechercher_par_telephone(clients, "+237 699 00 00 02")["nom"] == "Awa Bello"
+        assert rechercher_par_telephone(clients, "600000000") is None
+
+
+def test_distance():
+    assert distance_dans("mbrga", "jean mbarga") == 1
+    assert distance_dans("jaen", "jean") == 1 #Inversion de deux lettres
+    assert distance_max("a") == 0 and distance_max("mb") == 0
+    assert distance_max("jaen") == 1
+
+
+@pytest.mark.parametrize("grande_base", [False, True])
+def test_approx_requetes_courtes(grande_base, monkeypatch):
+    if grande_base:
+        #Au dela du seuil, plus de parcours complet : seul l'index donne les candidats
+        monkeypatch.setattr(indexation, "SEUIL_PARCOURS_APPROX", 0)
+    liste, store = _bases()
+    for clients in (liste, store):
+        assert sorted(_noms(rechercher_par_nom_approx(clients, "b"))) == ["Awa Bello", "Jean Mbarga"]
+        assert _noms(rechercher_par_nom_approx(clients, "ng")) == ["Paul Ngo"]
+        assert rechercher_par_nom_approx(clients, "x") == []
+        assert _noms(rechercher_par_ville_approx(clients, "yaounde")) == ["Jean Mbarga"]
+    if not grande_base: #"jaen" n'a aucun trigramme en commun avec "jean" : trouve seulement par parcours
+        assert _noms(rechercher_par_nom_approx(store, "jaen")) == ["Jean Mbarga"]
+    assert _noms(rechercher_par_nom_approx(liste, "jaen")) == ["Jean Mbarga"]
+
+
+@pytest.mark.parametrize("options, attendus", [
+    (["--un-de", "whatsapp,fidèle"], ["Jean Mbarga", "Awa Bello"]),
+    (["--sauf", "vip"], ["Awa Bello", "Paul Ngo"]),
+    (["--tags", "vip", "--sauf", "fidèle"], ["Éric Fotso"]),
+    (["--ville", "o", "--un-de", "vip"], ["Jean Mbarga", "Éric Fotso"]), #Les tags filtrent le resultat de --ville
+    ])
+def test_commande_chercher_par_tags(tmp_path, capsys, options, attendus):
+    path = str(tmp_path / "clients.json")
+    sauvegarder_clients(_bases()[0], path)
+    assert main(["--data", path, "chercher", "--json"] + options) == 0
+    assert _noms(json.loads(capsys.readouterr().out)) == attendus
+
+
+def test_commande_chercher_sans_critere(tmp_path, capsys):
+    assert main(["--data", str(tmp_path / "clients.json"), "chercher"]) == 1
+    assert "au moins un critère" in capsys.readouterr().err
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Serveur HTTP/JSON : ecritures par l'ecrivain unique, sauvegarde par lots et reprise apres un echec
+"""
+
+import json
+import asyncio
+import http.client
+
+import serveur
+from serveur import ServeurClients
+from services import charger_clients, sauvegarder_clients, ajouter_client
+
+
+def _requete(port, methode, chemin, corps=None):
+    connexion = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connexion.request(methode, chemin, body=None if corps is None else json.dumps(corps))
+        reponse = connexion.getresponse()
+        return reponse.status, json.loads(reponse.read())
+    finally:
+        connexion.close()
+
+
+def _lancer(base, scenario):
+    #Demarre le serveur sur un port libre, joue le scenario (requetes dans un thread) puis arrete le serveur
+    async def principal():
+        srv = ServeurClients(base)
+        port = await srv.demarrer(port=0)
+        boucle = asyncio.get_running_loop()
+        try:
+            return await scenario(srv, lambda *args: boucle.run_in_executor(None, _requete, port, *args))
+        finally:
+            await srv.arreter()
+    return asyncio.run(principal())
+
+
+def test_ajout_sauvegarde(base, monkeypatch):
+    monkeypatch.setattr(serveur, "DELAI_SAUVEGARDE", 0.05)
+
+    async def scenario(srv, requete):
+        statut, client = await requete("POST", "/clients", {"nom" : "Marie", "ville" : "Douala", "telephone" : "699000004"})
+        assert statut == 201
+        return client["id"]
+    client_id = _lancer(base, scenario)
+    assert charger_clients(base).get(client_id)["nom"] == "Marie"
+
+
+def test_echec_de_sauvegarde_retente(base, monkeypatch):
+    monkeypatch.setattr(serveur, "DELAI_SAUVEGARDE", 0.05)
+    echecs = []
+
+    def sauvegarde_capricieuse(*args, **kwargs):
+        if len(echecs) < 2:
+            echecs.append(1)
+            raise OSError("disque plein")
+        return sauvegarder_clients(*args, **kwargs)
+    monkeypatch.setattr(serveur, "sauvegarder_clients", sauvegarde_capricieuse)
+
+    async def scenario(srv, requete):
+        statut, _ = await requete("POST", "/clients/2/achats", {"date" : "2026-02-01", "montant" : 500})
+        assert statut == 201
+        await asyncio.sleep(0.3) #Plusieurs essais de sauvegarde
+        #L'ecrivain est toujours vivant : une nouvelle ecriture recoit sa reponse
+        statut, _ = await requete("POST", "/clients/2/achats", {"date" : "2026-02-02", "montant" : 700})
+        assert statut == 201
+        await asyncio.sleep(0.2)
+        return srv.nb_sauvegardes
+    assert _lancer(base, scenario) >= 1
+    assert len(echecs) == 2
+    assert charger_clients(base).get(2)["historique_achats"] == [("2026-02-01", 500), ("2026-02-02", 700)]
+
+
+def test_fusion_avec_un_autre_programme(base, monkeypatch):
+    monkeypatch.setattr(serveur, "DELAI_SAUVEGARDE", 0.05)
+
+    async def scenario(srv, requete):
+        #Un autre programme ajoute un client pendant que le serveur tourne
+        autre = charger_clients(base)
+        ajouter_client(autre, "Paul Ngo", "Kribi", "622000005", [])
+        sauvegarder_clients(autre, base, journal=True)
+        statut, _ = await requete("POST", "/clients", {"nom" : "Marie", "ville" : "Douala", "telephone" : "699000004"})
+        assert statut == 201
+        await asyncio.sleep(0.3)
+    _lancer(base, scenario)
+    assert sorted(c["nom"] for c in charger_clients(base)) == sorted(["Jean Mbarga", "Awa Bello", "Éric Ngo", "Paul Ngo", "Marie"])
+
+
+def test_types_invalides_refuses(base):
+
+    async def scenario(srv, requete):
+        statuts = [
+            (await requete("PATCH", "/clients/2", {"nom" : 5}))[0],
+            (await requete("PATCH", "/clients/2", {"ville" : ["Douala"]}))[0],
+            (await requete("PATCH", "/clients/2", {"telephone" : 677000001}))[0],
+            (await requete("PATCH", "/clients/2", {"tags" : 3}))[0],
+            (await requete("POST", "/clients/2/achats", {"date" : 20260201, "montant" : 500}))[0],
+            (await requete("POST", "/clients/2/achats", {"montant" : "500"}))[0],
+            (await requete("POST", "/clients/2/achats", {"montant" : 5.5}))[0],
+            (await requete("POST", "/clients", {"nom" : 5, "ville" : "Douala", "telephone" : "699000002"}))[0],
+            ]
+        statut, client = await requete("GET", "/clients/2")
+        return statuts, client
+    statuts, client = _lancer(base, scenario)
+    assert statuts == [400] * 8
+    assert client["nom"] == "Awa Bello" and client["historique_achats"] == []
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Statistiques NumPy (TableAchats) comparees aux totaux en python pur de services.py
+"""
+
+from collections import defaultdict
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from statistiques import TableAchats
+from services import total_depense_client, total_general_depenses, achats_entre, trouver_client
+
+CLIENTS = [
+    {"id" : 1, "nom" : "Jean", "ville" : "Yaoundé", "telephone" : "677000001", "tags" : ["vip", "fidèle"],
+     "historique_achats" : [("2026-01-05", 1500), ("2026-02-10", 500), ("2026-02-28", 250)]},
+    {"id" : 2, "nom" : "Awa", "ville" : "Douala", "telephone" : "699000002", "tags" : ["vip"],
+     "historique_achats" : [("2026-01-31", 4000)]},
+    {"id" : 3, "nom" : "Éric", "ville" : "Yaoundé", "telephone" : "655000003", "tags" : [],
+     "historique_achats" : [("2026-03-01", 800), ("2026-03-15", 200)]},
+    {"id" : 4, "nom" : "Paul", "ville" : "Kribi", "telephone" : "677000004", "tags" : ["fidèle"],
+     "historique_achats" : []},
+    ]
+PERIODES = [(None, None), ("2026-02-01", None), (None, "2026-01-31"), ("2026-02-01", "2026-02-28")]
+
+
+def _achats(debut, fin):
+    return achats_entre(CLIENTS, debut or "0001-01-01", fin or "9999-12-31")
+
+
+def _lignes(groupes):
+    #Meme forme que TableAchats : (libelle, somme, nombre, moyenne), groupes sans achat exclus
+    return {cle : (sum(montants), len(montants), sum(montants) / len(montants)) for cle, montants in groupes.items() if montants}
+
+
+def _resultat(lignes):
+    return {libelle : (somme, nombre, pytest.approx(moyenne)) for libelle, somme, nombre, moyenne in lignes}
+
+
+@pytest.mark.parametrize("debut, fin", PERIODES)
+def test_par_ville(debut, fin):
+    groupes = defaultdict(list)
+    for _, client_id, montant in _achats(debut, fin):
+        groupes[trouver_client(CLIENTS, client_id)["ville"]].append(montant)
+    lignes = TableAchats(CLIENTS).par_ville(debut, fin)
+    assert _resultat(lignes) == _lignes(groupes)
+    assert [somme for _, somme, _, _ in lignes] == sorted((somme for _, somme, _, _ in lignes), reverse=True)
+
+
+@pytest.mark.parametrize("debut, fin", PERIODES)
+def test_par_tag(debut, fin):
+    groupes = defaultdict(list)
+    for _, client_id, montant in _achats(debut, fin):
+        for tag in trouver_client(CLIENTS, client_id)["tags"]:
+            groupes[tag].append(montant)
+    assert _resultat(TableAchats(CLIENTS).par_tag(debut, fin)) == _lignes(groupes)
+
+
+@pytest.mark.parametrize("debut, fin", PERIODES)
+def test_par_mois(debut, fin):
+    groupes = defaultdict(list)
+    for date_achat, _, montant in _achats(debut, fin):
+        groupes[date_achat[:7]].append(montant)
+    lignes = TableAchats(CLIENTS).par_mois(debut, fin)
+    assert _resultat(lignes) == _lignes(groupes)
+    assert [mois for mois, *_ in lignes] == sorted(groupes) #Ordre chronologique
+
+
+def test_resume():
+    resume = TableAchats(CLIENTS).resume()
+    totaux = [total_depense_client(c) for c in CLIENTS]
+    nb_achats = sum(len(c["historique_achats"]) for c in CLIENTS)
+    assert resume["chiffre_affaires"] == total_general_depenses(CLIENTS)
+    assert resume["nb_achats"] == nb_achats
+    assert resume["panier_moyen"] == pytest.approx(total_general_depenses(CLIENTS) / nb_achats)
+    assert resume["nb_clients"] == len(CLIENTS)
+    assert resume["clients_actifs"] == 3
+    assert resume["valeur_vie_client"] == pytest.approx(sum(totaux) / len(CLIENTS))
+    assert resume["meilleure_valeur_vie"] == max(totaux)
+
+
+def test_resume_sur_une_periode():
+    resume = TableAchats(CLIENTS).resume("2026-02-01", "2026-02-28")
+    assert resume["chiffre_affaires"] == sum(m for _, _, m in _achats("2026-02-01", "2026-02-28")) == 750
+    assert resume["clients_actifs"] == 1
+    assert resume["meilleure_valeur_vie"] == 750
+
+
+def test_base_vide():
+    resume = TableAchats([]).resume()
+    assert resume["chiffre_affaires"] == 0 and resume["panier_moyen"] == 0.0
+    assert TableAchats([]).par_ville() == []
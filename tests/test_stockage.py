@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Instantane JSON : ecriture atomique, copies de secours et droits du fichier
+"""
+
+import os
+import stat
+
+import pytest
+
+from services import charger_clients, sauvegarder_clients, ajouter_client
+from stockage import chemin_sauvegarde, chemin_entetes, iter_clients
+from exportation import extraire
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def _sauvegarder(path, nom):
+    clients = charger_clients(path)
+    ajouter_client(clients, nom, "Douala", "699000002", [])
+    sauvegarder_clients(clients, path)
+
+
+def test_copies_de_secours(base):
+    for nom in ("A", "B", "C"):
+        _sauvegarder(base, nom)
+    assert len(charger_clients(base)) == 6
+    assert len(charger_clients(chemin_sauvegarde(base, 1))) == 5
+    assert len(charger_clients(chemin_sauvegarde(base, 2))) == 4
+
+
+@pytest.mark.skipif(os.name != "posix", reason="droits Unix")
+def test_mode_du_fichier_conserve(base):
+    masque = os.umask(0)
+    os.umask(masque)
+    assert _mode(base) == 0o666 & ~masque #Comme un fichier cree par open(), et non 0600 comme mkstemp
+    assert _mode(chemin_entetes(base)) == 0o666 & ~masque
+    os.chmod(base, 0o640)
+    _sauvegarder(base, "B")
+    assert _mode(base) == 0o640 #Le mode choisi par l'utilisateur survit a la sauvegarde
+
+
+@pytest.mark.parametrize("contenu", [None, b"", b'[\n{"prochain_id":3},\n{"id":1,"nom":"A","vi'])
+def test_instantane_illisible_parcours_depuis_la_copie(base, clients_base, tmp_path, contenu):
+    _sauvegarder(base, "A")
+    if contenu is None:
+        os.remove(base)
+    else:
+        with open(base, "wb") as f: #Arret brutal pendant une ecriture par une ancienne version
+            f.write(contenu)
+    with pytest.warns(UserWarning, match="illisible"):
+        attendus = [c["nom"] for c in charger_clients(base)]
+    assert attendus == [c["nom"] for c in clients_base] #Copie clients.json.1
+    with pytest.warns(UserWarning, match="illisible"):
+        assert [c["nom"] for c in iter_clients(base)] == attendus
+    with pytest.warns(UserWarning, match="illisible"):
+        assert extraire(base, str(tmp_path / "c.csv"), "clients")["lignes"] == 3
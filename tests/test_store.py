@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+ClientStore compare a la simple liste de dictionnaires : memes resultats pour les memes operations,
+index construits a la demande, index des dates, annuler / refaire et transactions
+"""
+
+import copy
+import random
+
+import pytest
+
+from services import (
+    ClientStore, ajouter_client, modifier_client, supprimer_client, ajouter_achat, trouver_client,
+    total_depense_client, total_general_depenses, trier_par_nom, trier_par_total_achat, top_clients_par_depense,
+    rechercher_par_nom, rechercher_par_ville, rechercher_par_tags, rechercher_par_telephone, doublons_telephone,
+    achats_entre, clients_actifs, transaction, annuler_operation, refaire_operation, TelephoneDejaUtilise,
+    charger_clients, sauvegarder_clients, ClientRenumerote
+)
+from modeles import Client
+
+VILLES = ["Yaoundé", "Douala", "Garoua", "Kribi"]
+TAGS = ["vip", "fidèle", "whatsapp"]
+
+
+def _client(hasard, client_id):
+    return {
+        "id" : client_id,
+        "nom" : hasard.choice(["Jean", "Awa", "Éric", "Paul"]) + " " + hasard.choice(["Mbarga", "Bello", "Ngo"]),
+        "ville" : hasard.choice(VILLES),
+        "telephone" : f"6{hasard.randrange(10 ** 8):08d}",
+        "tags" : hasard.sample(TAGS, hasard.randrange(3)),
+        "historique_achats" : sorted((f"2026-0{hasard.randint(1, 9)}-1{hasard.randint(0, 9)}", hasard.randrange(100, 5000))
+                                     for _ in range(hasard.randrange(4))),
+        "version" : 1,
+        }
+
+
+def _ids(clients):
+    return [c["id"] for c in clients]
+
+
+def _comparer(liste, store):
+    assert list(store) == liste
+    assert len(store) == len(liste)
+    assert [store[i] for i in range(len(store))] == liste
+    assert total_general_depenses(store) == total_general_depenses(liste)
+    for c in liste:
+        assert trouver_client(store, c["id"]) == c
+        assert total_depense_client(c, store) == total_depense_client(c)
+    assert _ids(trier_par_nom(store)) == _ids(trier_par_nom(liste))
+    assert _ids(trier_par_total_achat(store)) == _ids(trier_par_total_achat(liste))
+    assert _ids(top_clients_par_depense(store, 5)) == _ids(top_clients_par_depense(liste, 5))
+    for requete in ("mba", "o", "éric"):
+        assert _ids(rechercher_par_nom(store, requete)) == _ids(rechercher_par_nom(liste, requete))
+    for requete in ("dou", "yaoun"):
+        assert _ids(rechercher_par_ville(store, requete)) == _ids(rechercher_par_ville(liste, requete))
+    assert _ids(rechercher_par_tags(store, tous=["vip"], sauf=["fidele"])) == _ids(rechercher_par_tags(liste, tous=["vip"], sauf=["fidele"]))
+    assert achats_entre(store, "2026-01-01", "2026-12-31") == achats_entre(liste, "2026-01-01", "2026-12-31")
+    assert achats_entre(store, "2026-03-10", "2026-05-15") == achats_entre(liste, "2026-03-10", "2026-05-15")
+
+
+@pytest.mark.parametrize("graine", range(5))
+def test_store_comme_la_liste(graine):
+    hasard = random.Random(graine)
+    depart = [_client(hasard, i) for i in range(1, 31)]
+    liste, store = copy.deepcopy(depart), ClientStore(copy.deepcopy(depart))
+    if graine % 2:
+        _comparer(liste, store) #Index construits des le debut, puis tenus a jour
+    for _ in range(300):
+        tirage = hasard.random()
+        ids = _ids(liste)
+        if tirage < 0.3 and ids:
+            client_id, date, montant = hasard.choice(ids), f"2026-0{hasard.randint(1, 9)}-15", hasard.randrange(100, 900)
+            ajouter_achat(liste, client_id, date, montant)
+            ajouter_achat(store, client_id, date, montant)
+        elif tirage < 0.45:
+            args = ("Nouveau Client", hasard.choice(VILLES), "677000000", hasard.sample(TAGS, 1))
+            nouveau = ajouter_client(liste, *args)
+            cree = ajouter_client(store, *args)
+            nouveau.update(id=cree["id"], cree=cree["cree"]) #Le store ne reutilise pas un id supprime
+            assert store.get(nouveau["id"]) == nouveau
+        elif tirage < 0.6 and ids:
+            client_id = hasard.choice(ids)
+            supprimer_client(liste, client_id)
+            supprimer_client(store, client_id)
+        elif ids:
+            client_id, ville, tags = hasard.choice(ids), hasard.choice(VILLES), hasard.sample(TAGS, 2)
+            modifier_client(liste, client_id, ville=ville, tags=tags)
+            modifier_client(store, client_id, ville=ville, tags=tags)
+    _comparer(liste, store)
+    with pytest.raises(KeyError):
+        supprimer_client(store, 10 ** 6)
+    with pytest.raises(KeyError):
+        supprimer_client(liste, 10 ** 6)
+
+
+def test_index_construits_a_la_demande():
+    hasard = random.Random(1)
+    store = ClientStore([_client(hasard, i) for i in range(1, 11)])
+    assert store._index == [] #Le chargement ne construit aucun index
+    ajouter_client(store, "Awa Fotso", "Douala", "699000002", [])
+    assert store._index == []
+    assert _ids(rechercher_par_nom(store, "fotso")) == [11]
+    assert store._index == [store.index_nom]
+    modifier_client(store, 11, nom="Awa Tchoumi")
+    assert _ids(rechercher_par_nom(store, "tchoumi")) == [11]
+    assert rechercher_par_nom(store, "fotso") == []
+
+
+def test_telephone_unique_et_doublons():
+    for clients in ([], ClientStore()):
+        ajouter_client(clients, "Jean", "Douala", "677000001", [])
+        ajouter_client(clients, "Awa", "Douala", "677 00 00 01", [])
+        with pytest.raises(TelephoneDejaUtilise):
+            ajouter_client(clients, "Paul", "Kribi", "+237677000001", [], unique=True)
+        assert rechercher_par_telephone(clients, "677000001")["nom"] == "Jean"
+        assert {numero : _ids(liste) for numero, liste in doublons_telephone(clients).items()} == {"677000001" : [1, 2]}
+
+
+def test_suppression_apres_ajout_direct_dans_l_historique():
+    store = ClientStore([{"id" : 1, "nom" : "A", "ville" : "B", "telephone" : "677000001", "tags" : []}])
+    achats_entre(store, "2026-01-01", "2026-12-31") #Index des dates construit
+    store[0]["historique_achats"].append(("2026-01-01", 99)) #Sans passer par ajouter_achat
+    supprimer_client(store, 1)
+    assert len(store) == 0
+    assert total_general_depenses(store) == 0
+    assert achats_entre(store, "2026-01-01", "2026-12-31") == []
+
+
+def test_suppression_retire_les_achats_sur_place():
+    hasard = random.Random(2)
+    store = ClientStore([_client(hasard, i) for i in range(1, 201)])
+    index = store.index_dates
+    index.entre(0, 10 ** 6) #Tout est fusionne
+    achats = index._achats
+    for client_id in range(1, 51):
+        ajouter_achat(store, client_id, "2026-05-05", 100) #En attente de fusion
+        supprimer_client(store, client_id)
+        #Les entrees du client sont enlevees de la liste triee elle meme, rien n'est a reconstruire
+        assert index._achats is achats
+        assert all(i != client_id for _, i, _ in index._achats)
+        assert achats_entre(store, "2026-01-01", "2026-12-31") == sorted(achats_entre(list(store), "2026-01-01", "2026-12-31"))
+        assert index._achats is achats and not index._nouveaux and not index._retires
+    assert all(client_id > 50 for _, client_id, _ in achats_entre(store, "2026-01-01", "2026-12-31"))
+
+
+def test_clients_actifs():
+    from datetime import date
+    for clients in ([], ClientStore()):
+        ajouter_client(clients, "Jean", "Douala", "677000001", [])
+        ajouter_client(clients, "Awa", "Douala", "677000002", [])
+        ajouter_achat(clients, 2, "2026-02-01", 100)
+        ajouter_achat(clients, 1, "2025-01-01", 100)
+        assert _ids(clients_actifs(clients, 30, date(2026, 2, 15))) == [2]
+
+
+def test_annuler_refaire():
+    store = ClientStore()
+    ajouter_client(store, "Jean", "Douala", "677000001", ["vip"])
+    ajouter_achat(store, 1, "2026-02-01", 500)
+    modifier_client(store, 1, ville="Kribi")
+    supprimer_client(store, 1)
+    assert len(store) == 0
+    assert annuler_operation(store) == [("suppr", 1)]
+    assert store.get(1)["ville"] == "Kribi"
+    assert annuler_operation(store) == [("modif", 1)]
+    assert rechercher_par_ville(store, "douala")[0]["id"] == 1
+    assert annuler_operation(store) == [("achat", 1)]
+    assert total_general_depenses(store) == 0 and store.get(1)["historique_achats"] == []
+    assert refaire_operation(store) == [("achat", 1)]
+    assert total_general_depenses(store) == 500
+    assert achats_entre(store, "2026-01-01", "2026-12-31") == [("2026-02-01", 1, 500)]
+    ajouter_achat(store, 1, "2026-02-02", 100) #Une nouvelle operation efface ce qu'on pouvait refaire
+    assert refaire_operation(store) == []
+    assert annuler_operation([]) == []
+
+
+def test_transaction_tout_ou_rien():
+    for clients in ([], ClientStore()):
+        ajouter_client(clients, "Jean", "Douala", "677000001", [])
+        with pytest.raises(KeyError):
+            with transaction(clients):
+                ajouter_client(clients, "Awa", "Douala", "677000002", [])
+                ajouter_achat(clients, 1, "2026-02-01", 500)
+                ajouter_achat(clients, 99, "2026-02-01", 500) #Client inexistant : tout est defait
+        assert _ids(clients) == [1]
+        assert clients[0]["historique_achats"] == []
+        assert total_general_depenses(clients) == 0
+    store = ClientStore()
+    with transaction(store):
+        ajouter_client(store, "Jean", "Douala", "677000001", [])
+        ajouter_achat(store, 1, "2026-02-01", 500)
+    assert annuler_operation(store) == [("achat", 1), ("ajout", 1)] #Le bloc s'annule en une fois
+    assert len(store) == 0
+
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_transaction_annulee_garde_les_memes_objets(compact):
+    clients = [{"id" : 1, "nom" : "Jean", "ville" : "Douala", "telephone" : "677000001", "tags" : ["vip"],
+                "historique_achats" : [("2026-01-05", 1500)], "version" : 1},
+               {"id" : 2, "nom" : "Awa", "ville" : "Kribi", "telephone" : "677000002", "tags" : [],
+                "historique_achats" : [], "version" : 1}]
+    if compact:
+        clients = [Client.depuis_dict(c) for c in clients]
+    jean, awa = clients
+    avant = [dict(jean.vers_dict() if compact else jean), dict(awa.vers_dict() if compact else awa)]
+    with pytest.raises(KeyError, match="introuvable"):
+        with transaction(clients):
+            modifier_client(clients, 1, nom="Jean Mbarga", tags=["fidèle"])
+            supprimer_client(clients, 2)
+            modifier_client(clients, 99, nom="Personne")
+    #Les references gardees par l'appelant sont toujours celles de la liste, remises dans leur etat d'avant
+    assert clients[0] is jean and clients[1] is awa and len(clients) == 2
+    assert trouver_client(clients, 1) is jean
+    assert [c.vers_dict() if compact else c for c in clients] == avant
+
+
+
+def _operations(clients):
+    ajouter_achat(clients, 3, "2026-01-15", 700)
+    ajouter_achat(clients, 3, "2026-09-30", 50)
+    modifier_client(clients, 5, ville="Bafoussam", tags=["vip"])
+    with pytest.raises(KeyError, match="introuvable"):
+        with transaction(clients):
+            ajouter_achat(clients, 1, "2026-05-05", 900)
+            modifier_client(clients, 2, nom="Paul Ngo")
+            ajouter_achat(clients, 99, "2026-05-05", 900)
+
+
+def test_clients_compacts_modifiables():
+    hasard = random.Random(7)
+    depart = [_client(hasard, i) for i in range(1, 9)]
+    liste = copy.deepcopy(depart)
+    _operations(liste)
+    for clients in ([Client.depuis_dict(c) for c in depart], ClientStore(Client.depuis_dict(c) for c in depart)):
+        _operations(clients)
+        assert [c.vers_dict() for c in clients] == liste
+        assert total_general_depenses(clients) == total_general_depenses(liste)
+        assert achats_entre(clients, "2026-01-01", "2026-12-31") == achats_entre(liste, "2026-01-01", "2026-12-31")
+        assert _ids(rechercher_par_tags(clients, ["vip"])) == _ids(rechercher_par_tags(liste, ["vip"]))
+    store = ClientStore(Client.depuis_dict(c) for c in depart)
+    ajouter_achat(store, 3, "2026-01-15", 700)
+    assert annuler_operation(store) == [("achat", 3)]
+    assert store[2].vers_dict() == depart[2]
+
+
+@pytest.mark.parametrize("nom", ["clients.json", "clients.db"])
+@pytest.mark.parametrize("journal", [False, True])
+@pytest.mark.parametrize("paresseux", [False, True])
+def test_id_supprime_jamais_redonne_apres_rechargement(tmp_path, nom, journal, paresseux):
+    path = str(tmp_path / nom)
+    clients = charger_clients(path)
+    for numero in range(3):
+        ajouter_client(clients, f"Client {numero}", "Douala", f"67700000{numero}", [])
+    sauvegarder_clients(clients, path, journal=journal)
+    clients = charger_clients(path, paresseux=paresseux)
+    supprimer_client(clients, 3) #Le plus grand id
+    sauvegarder_clients(clients, path, journal=journal)
+    clients = charger_clients(path, paresseux=paresseux)
+    assert ajouter_client(clients, "Nouveau", "Kribi", "655000009", [])["id"] == 4
+    sauvegarder_clients(clients, path, journal=journal)
+    clients = charger_clients(path, paresseux=paresseux)
+    supprimer_client(clients, 4)
+    sauvegarder_clients(clients, path) #Reecriture complete : le compteur du fichier est garde
+    assert ajouter_client(charger_clients(path, paresseux=paresseux), "Autre", "Kribi", "655000008", [])["id"] == 5
+
+
+def test_compteur_repris_pendant_la_fusion(tmp_path):
+    path = str(tmp_path / "clients.json")
+    nous, autre = charger_clients(path), charger_clients(path)
+    ajouter_client(autre, "Awa", "Douala", "699000002", [])
+    sauvegarder_clients(autre, path, journal=True)
+    supprimer_client(autre, 1)
+    sauvegarder_clients(autre, path, journal=True) #L'id 1 a ete donne puis supprime par l'autre programme
+    ajouter_client(nous, "Jean", "Douala", "677000001", [])
+    assert sauvegarder_clients(nous, path, journal=True) == [ClientRenumerote(1, 2)]
+    assert _ids(charger_clients(path)) == [2]